@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+allocation.py
+
+Per-request portfolio weights for a handful of picks.
+
+  * equal        → 1/n (the old /api/simulate behaviour)
+  * min_variance → minimise w'Σw
+  * max_sharpe   → maximise (w·μ − rf) / sqrt(w'Σw)
+  * risk_parity  → equal risk contribution w_i (Σw)_i
+
+All methods are long-only, fully invested and respect a per-name cap
+(`max_weight`).  Unconstrained closed forms are used when they already land
+inside the constraints; otherwise a projected-gradient loop on the capped
+simplex finishes the job.  Everything is plain NumPy on n×n matrices, so a
+call costs a few milliseconds at most for dashboard-sized pick sets.
+
+μ is the model's return over one horizon (LOOKAHEAD_DAYS unless the caller
+passes the horizon it used) and Σ is daily —
+either a covariance_engine snapshot or diag(vol30²) from top_n_per_category.csv.
+"""
+
+import numpy as np
+
+LOOKAHEAD_DAYS = 90      # horizon of pred_return
+MAX_ITER       = 500
+VAR_FLOOR      = np.finfo(float).eps   # smallest variance used: a flat price series has 0
+METHODS        = ("equal", "min_variance", "max_sharpe", "risk_parity")
+
+
+def project_capped_simplex(v: np.ndarray, cap: float = 1.0) -> np.ndarray:
+    """
+    Exact Euclidean projection of v onto {w : 0 ≤ w ≤ cap, Σw = 1}.
+    Σ clip(v − τ, 0, cap) is piecewise linear in τ with kinks at v_i and
+    v_i − cap, so evaluate it at every kink at once and interpolate.
+    """
+    n = len(v)
+    cap = max(cap, 1.0 / n)                       # otherwise infeasible
+    kinks = np.sort(np.concatenate([v, v - cap]))
+    sums = np.clip(v[None, :] - kinks[:, None], 0.0, cap).sum(axis=1)   # decreasing in τ
+    k = np.searchsorted(-sums, -1.0)              # first kink with sum ≤ 1
+    if k == 0:
+        tau = kinks[0]
+    else:
+        t0, t1, s0, s1 = kinks[k - 1], kinks[k], sums[k - 1], sums[k]
+        tau = t0 if s0 == s1 else t0 + (s0 - 1.0) * (t1 - t0) / (s0 - s1)
+    return np.clip(v - tau, 0.0, cap)
+
+
+def floor_variances(cov: np.ndarray) -> np.ndarray:
+    """Copy of Σ with its diagonal floored at VAR_FLOOR, so no method divides by a zero variance."""
+    cov = np.array(cov, dtype=float)
+    i = np.diag_indices_from(cov)
+    cov[i] = np.maximum(cov[i], VAR_FLOOR)
+    return cov
+
+
+def _feasible(w, cap):
+    return np.all(w >= -1e-12) and np.all(w <= cap + 1e-12)
+
+
+def _projected_gradient(f, grad, w, cap, step=1.0):
+    """Projected gradient descent on the capped simplex with Armijo backtracking."""
+    fw = f(w)
+    for _ in range(MAX_ITER):
+        g = grad(w)
+        while True:
+            w_new = project_capped_simplex(w - step * g, cap)
+            f_new = f(w_new)
+            if f_new <= fw + g @ (w_new - w) + (w_new - w) @ (w_new - w) / (2 * step) or step < 1e-12:
+                break
+            step *= 0.5
+        if np.abs(w_new - w).max() < 1e-9:
+            return w_new
+        w, fw = w_new, f_new
+        step *= 2.0                                # let the step grow back
+    return w
+
+
+def min_variance(cov: np.ndarray, cap: float = 1.0) -> np.ndarray:
+    n = len(cov)
+    try:
+        x = np.linalg.solve(cov, np.ones(n))
+        w = x / x.sum()
+        if _feasible(w, cap):
+            return w
+        w0 = project_capped_simplex(w, cap)
+    except np.linalg.LinAlgError:
+        w0 = np.full(n, 1.0 / n)
+    step = 1.0 / (2 * np.linalg.eigvalsh(cov)[-1])
+    return _projected_gradient(lambda w: w @ cov @ w, lambda w: 2 * cov @ w, w0, cap, step)
+
+
+def max_sharpe(mu: np.ndarray, cov: np.ndarray, cap: float = 1.0, rf: float = 0.0) -> np.ndarray:
+    excess = mu - rf
+    if np.all(excess <= 0):
+        # no name beats the risk-free rate → least risky portfolio
+        return min_variance(cov, cap)
+    try:
+        x = np.linalg.solve(cov, excess)
+        if x.sum() > 0:
+            w = x / x.sum()
+            if _feasible(w, cap):
+                return w
+    except np.linalg.LinAlgError:
+        pass
+
+    def neg_sharpe(w):
+        return -(w @ excess) / np.sqrt(w @ cov @ w)
+
+    def neg_sharpe_grad(w):
+        var = w @ cov @ w
+        return -(excess * var - (w @ excess) * (cov @ w)) / var ** 1.5
+
+    pos = np.clip(excess, 0, None)
+    w0 = project_capped_simplex(pos / pos.sum(), cap)
+    return _projected_gradient(neg_sharpe, neg_sharpe_grad, w0, cap)
+
+
+def risk_parity(cov: np.ndarray, cap: float = 1.0) -> np.ndarray:
+    """
+    Equal risk contributions via cyclical coordinate descent on the convex
+    form min ½ y'Σy − Σ log y_i (y > 0), then w = y / Σy.
+    """
+    n = len(cov)
+    diag = np.maximum(np.diag(cov), VAR_FLOOR)
+    y = 1.0 / np.sqrt(diag)                       # exact when Σ is diagonal
+    for _ in range(MAX_ITER):
+        y_old = y.copy()
+        for i in range(n):
+            c = cov[i] @ y - diag[i] * y[i]
+            y[i] = (-c + np.sqrt(c * c + 4 * diag[i])) / (2 * diag[i])
+        if np.abs(y - y_old).max() < 1e-10 * y.max():
+            break
+    w = y / y.sum()
+    return w if _feasible(w, cap) else project_capped_simplex(w, cap)
+
+
+def allocate(method: str, mu, cov, max_weight: float = 1.0) -> np.ndarray:
+    """Weights for `method` (one of METHODS)."""
+    mu = np.asarray(mu, dtype=float)
+    cov = floor_variances(cov)
+    n = len(mu)
+    if method == "equal":
+        return np.full(n, 1.0 / n)
+    if method == "min_variance":
+        return min_variance(cov, max_weight)
+    if method == "max_sharpe":
+        return max_sharpe(mu, cov, max_weight)
+    if method == "risk_parity":
+        return risk_parity(cov, max_weight)
+    raise ValueError(f"unknown allocation method {method!r}; expected one of {METHODS}")
+
+
+def portfolio_stats(w, mu, cov, days: int, horizon: int = LOOKAHEAD_DAYS) -> dict:
+    """Expected return / volatility / Sharpe of weights w over `days` days (μ is a `horizon`-day return)."""
+    w = np.asarray(w, dtype=float)
+    ret = float(w @ np.asarray(mu, dtype=float)) * days / horizon
+    vol = float(np.sqrt(max(w @ np.asarray(cov, dtype=float) @ w, 0.0) * days))
+    return {
+        "expected_return_pct": ret * 100,
+        "vol_pct": vol * 100,
+        "sharpe": ret / vol if vol > 0 else None,
+    }
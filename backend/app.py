@@ -1,55 +1,235 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify
 import pandas as pd
 import joblib
 from flask_cors import CORS
-import io
+import os
+import numpy as np
+from concurrent.futures import TimeoutError as FuturesTimeout
+
+from nfcs_data import FEATURE_COLS
+from user_store import UserStore, file_version
+from covariance_engine import CovSnapshot, OUTPUT_FILE as COV_FILE
+from allocation import METHODS, allocate, portfolio_stats
+from return_scorer import HORIZONS, LOOKAHEAD_DAYS, ReturnScorer, artifacts_available, pred_column
+from http_cache import BodyCache, compress_response, stream_rows
+from batcher import MicroBatcher, Overloaded
+from nfcs_schema import SCHEMA
+from explainer import ReturnExplainer, RiskExplainer, supports as explainable
+import stock_bucketer
 
 app = Flask(__name__)
-CORS(app, resources={r"/api/*": {"origins": "http://localhost:3000"}})
+CORS(app, resources={r"/api/*": {"origins": "http://localhost:3000"}}, expose_headers=["ETag"])
 
 # 載入模型與資料
-risk_pipe = joblib.load("risk_pipeline.joblib")
-risk_le = joblib.load("risk_label_encoder.joblib")
-picks_df = pd.read_csv("top_n_per_category.csv", index_col="ticker")
+RISK_PIPELINE = "risk_pipeline.joblib"
+RISK_ENCODER  = "risk_label_encoder.joblib"
+PICKS_FILE    = "top_n_per_category.csv"
+PREDICT_TIMEOUT = 5.0          # 秒；排隊 + 推論超過就回 503
 
-@app.route("/api/predict", methods=["POST"])
-def predict():
-    feature_cols = ["Age Group","Ethnicity","Education Level","Marital Status",
-        "Financially dependent children","Annual Household Income",
-        "Spending vs Income Past Year","Difficulty covering expenses",
-        "Emergency fund to cover 3 Months expenses",
-        "Current financial condition satisfaction",
-        "Thinking about FC frequency","Account ownership check",
-        "Savings/Money market/CD account ownership",
-        "Employer-sponsored retirement plan ownership","Homeownership",
-        "Regular contribution to a retirement account",
-        "Non-retirement investments in stocks, bonds, mutual funds",
-        "Self-efficacy","Self-rated overall financial knowledge"]  # 與你原本相同，略過細節
-    data = {col: request.form.get(col) for col in feature_cols}
-    X_user = pd.DataFrame([data])
-
-    # 數值欄轉換
-    numeric_feats = ["Age Group","Education Level",
-        "Financially dependent children","Annual Household Income",
-        "Spending vs Income Past Year","Difficulty covering expenses",
-        "Emergency fund to cover 3 Months expenses",
-        "Current financial condition satisfaction",
-        "Thinking about FC frequency","Account ownership check",
-        "Savings/Money market/CD account ownership",
-        "Employer-sponsored retirement plan ownership",
-        "Homeownership",
-        "Regular contribution to a retirement account",
-        "Non-retirement investments in stocks, bonds, mutual funds",
-        "Self-efficacy","Self-rated overall financial knowledge"]  # 同上略
-    for col in numeric_feats:
-        X_user[col] = pd.to_numeric(X_user[col], errors="coerce")
+risk_pipe = joblib.load(RISK_PIPELINE)
+risk_le = joblib.load(RISK_ENCODER)
+MODEL_VERSION = file_version(RISK_PIPELINE, RISK_ENCODER)
+# 樹路徑貢獻：整個森林攤平成陣列，一次向量化走完（hist_gb 引擎不支援 → None）
+risk_explainer = RiskExplainer(risk_pipe, risk_le) if explainable(risk_pipe) else None
+
+def load_picks():
+    """(Re)load everything refresh_daemon.py republishes."""
+    global picks_df, cov_snap, scorer, pick_explanations, bucketer, PICKS_VERSION
+    picks_df = pd.read_csv(PICKS_FILE, index_col="ticker")
+    # 共變異數快照（covariance_engine.py 產生）；沒有就退回 vol30 對角矩陣
+    cov_snap = CovSnapshot.load(COV_FILE) if os.path.exists(COV_FILE) else None
+    # 線上報酬評分：imputer → scaler → forest（top_n_stocks_final.py 匯出 + feature_store）
+    scorer = ReturnScorer() if artifacts_available() else None
+    # 任意股票的風險等級：最近的 KMeans 中心（stock_classifier.joblib + price_cache.pkl）
+    bucketer = stock_bucketer.StockBucketer() if stock_bucketer.available() else None
+    # picks 的解釋在載入時一次算好，請求時直接查表
+    pick_explanations = None
+    if scorer is not None and explainable(scorer.model):
+        pick_explanations = ReturnExplainer(scorer.imputer, scorer.scaler, scorer.model) \
+            .explain(picks_df[~picks_df.index.duplicated()])
+    # picks 版本變動時使用者快取會重算
+    PICKS_VERSION = file_version(PICKS_FILE)
+
+load_picks()
+
+# 使用者快取：profile / risk bucket / picks 只在 profile 或模型版本變動時重算
+store = UserStore()
+# picks 衍生的回應：每個 PICKS_VERSION 只產生一次，並快取壓縮後的內容
+body_cache = BodyCache()
+DOWNLOAD_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
 
+@app.after_request
+def compress(response):
+    return compress_response(response, request)
+
+def parse_profile(form):
+    """
+    Form fields → (profile, errors).  profile 是 SCHEMA.coerce 後的數值
+    {欄位: float}，驗證與評分用的是同一份；errors 不為 None 時回 400。
+    """
+    data = {col: form.get(col) for col in FEATURE_COLS}
+    X, unparsable = SCHEMA.coerce([data])
+    check = SCHEMA.validate(X, unparsable)
+    if not check.ok()[0]:
+        return None, check.errors(0)
+    return dict(zip(FEATURE_COLS, X[0].tolist())), None
+
+def request_tickers():
+    """
+    Tickers from repeated `ticker` form fields or a JSON {"tickers": [...]} body
+    → (tickers, body, error)；格式不對時 error 是要直接回傳的 400 response。
+    """
+    body = request.get_json(silent=True)
+    if body is None:
+        body = {}
+    if not isinstance(body, dict):
+        return None, None, (jsonify({"error": "JSON body must be an object"}), 400)
+    tickers = request.form.getlist("ticker") or body.get("tickers", [])
+    # 字串也可迭代，不檢查的話 "AAPL" 會被拆成 A、A、P、L
+    if not isinstance(tickers, list) or not all(isinstance(t, str) for t in tickers):
+        return None, None, (jsonify({"error": "tickers must be a list of strings"}), 400)
+    tickers = [t.strip().upper() for t in tickers if t.strip()]
+    if not tickers:
+        return None, None, (jsonify({"error": "no tickers given"}), 400)
+    return tickers, body, None
+
+def profile_frame(profiles):
+    """Parsed profiles → risk pipeline input (predict 與 explain 共用)."""
+    # 與訓練資料相同的數值欄（類別欄也是數字代碼，OneHotEncoder 才認得）
+    return pd.DataFrame(profiles, columns=FEATURE_COLS, dtype=np.float64)
+
+def score_profiles(profiles):
+    """Run the risk pipeline on a batch of parsed profiles → bucket strings."""
     # 預測風險等級
-    lbl_idx = risk_pipe.predict(X_user)[0]
-    risk_bucket = risk_le.inverse_transform([lbl_idx])[0]
+    lbl_idx = risk_pipe.predict(profile_frame(profiles))
+    return list(risk_le.inverse_transform(lbl_idx))
+
+# 併發的 /api/predict 在幾毫秒內合併成一次向量化 predict（batcher.py）
+predict_batcher = MicroBatcher(score_profiles, name="risk-predict")
+
+def score_profile(profile):
+    """One parsed profile → bucket string, micro-batched with concurrent requests."""
+    return predict_batcher(profile, timeout=PREDICT_TIMEOUT)
+
+def busy(reason):
+    return jsonify({"error": "server busy", "reason": reason}), 503, {"Retry-After": "1"}
+
+def store_user():
+    """username 且 X-User-Token 驗證通過才回傳，否則 None（不讀寫使用者快取）。"""
+    username = request.form.get("username") or request.args.get("username")
+    token = request.headers.get("X-User-Token")
+    return username if store.authenticate(username, token) else None
+
+def top_picks(bucket_str):
+    df = picks_df[picks_df["risk_label"] == bucket_str].nlargest(5, "pred_return").reset_index()
+    return [{"ticker": r.ticker, "pred_return": r.pred_return}
+            for r in df.itertuples(index=False)]
+
+@app.route("/api/predict", methods=["POST"])
+def predict():
+    # 先以 nfcs_schema 驗證，缺漏或不在代碼表內的欄位直接回 400，不進模型；
+    # 通過的話模型拿到的就是驗證過的數值
+    profile, errors = parse_profile(request.form)
+    if errors is not None:
+        return jsonify({"error": "invalid profile", "fields": errors}), 400
+    # 只有驗證過的使用者才寫入快取；其他請求照常評分但不碰 user_store
+    username = store_user()
+    try:
+        if username:
+            risk_bucket, _ = store.risk_bucket(username, profile, MODEL_VERSION, score_profile)
+        else:
+            risk_bucket = score_profile(profile)
+    except Overloaded as e:
+        return busy(str(e))
+    except FuturesTimeout:
+        return busy(f"no prediction within {PREDICT_TIMEOUT}s")
 
     return jsonify({"risk_bucket": risk_bucket})
 
+@app.route("/api/users", methods=["POST"])
+def create_user():
+    # 建立帳號（Next.js /api/submit/create 在伺服器端呼叫）：使用者名稱沒被用過才建立，
+    # 回傳的 token 之後放在 X-User-Token，/api/predict 與 /api/dashboard 才會用快取
+    username = request.form.get("username")
+    if not username:
+        return jsonify({"error": "username required"}), 400
+    profile, errors = parse_profile(request.form)
+    if errors is not None:
+        return jsonify({"error": "invalid profile", "fields": errors}), 400
+    try:
+        created = store.create(username, profile, MODEL_VERSION, score_profile)
+    except Overloaded as e:
+        return busy(str(e))
+    except FuturesTimeout:
+        return busy(f"no prediction within {PREDICT_TIMEOUT}s")
+    if created is None:
+        return jsonify({"error": f"username {username!r} is taken"}), 409
+    risk_bucket, token = created
+    return jsonify({"risk_bucket": risk_bucket, "user_token": token}), 201
+
+@app.route("/api/explain/profile", methods=["POST"])
+def explain_profile():
+    # 與 /api/predict 相同的解析與模型輸入，解釋的 bucket 才會和預測一致
+    profile, errors = parse_profile(request.form)
+    if errors is not None:
+        return jsonify({"error": "invalid profile", "fields": errors}), 400
+    if risk_explainer is None:
+        return jsonify({"error": "explanations need the forest risk model"}), 501
+    # 各欄位對預測風險等級機率的貢獻（base + Σ contribution = probability）
+    return jsonify(risk_explainer.explain(profile_frame([profile]))[0])
+
+@app.route("/api/explain/pick/<ticker>")
+def explain_pick(ticker):
+    if pick_explanations is None:
+        return jsonify({"error": "explanations need the forest return model"}), 501
+    expl = pick_explanations.get(ticker.upper())
+    if expl is None:
+        return jsonify({"error": f"{ticker} is not a current pick"}), 404
+    return jsonify(expl)
+
+@app.route("/api/metrics")
+def metrics():
+    # 佇列深度等指標；serve_async.py 執行時另含伺服器層的併發數
+    server = app.extensions.get("serve_async")
+    return jsonify({
+        "predict": predict_batcher.stats(),
+        "server": server.stats() if server is not None else None
+    })
+
+def pick_covariance(tickers):
+    """Daily covariance of the picks: snapshot if it covers them all, else diag(vol30²)."""
+    if cov_snap is not None:
+        try:
+            idx = cov_snap.index_of(tickers)
+            return cov_snap.cov[np.ix_(idx, idx)], cov_snap.date.strftime("%Y-%m-%d")
+        except KeyError:
+            pass
+    vol = picks_df["vol30"].reindex(tickers)
+    vol = vol.fillna(picks_df["vol30"].median()).to_numpy(dtype=float)
+    return np.diag(vol ** 2), "vol30"
+
+def horizon_returns(tickers, returns, days):
+    """
+    Each pick's server-side forecast over the trained horizon closest to
+    `days`: the picks file's pred_return / pred_return_<h> columns, else the
+    return scorer.  The LOOKAHEAD_DAYS numbers sent by the client are only a
+    fallback for tickers the server has no forecast for.
+    """
+    available = [h for h in HORIZONS if pred_column(h) in picks_df.columns]
+    if not available:
+        return returns, LOOKAHEAD_DAYS
+    h = min(available, key=lambda h: (abs(h - days), h))
+    col = picks_df[pred_column(h)]
+    vals = col[~col.index.duplicated()].reindex(tickers)
+    if vals.isna().any() and scorer is not None:
+        # 不在 picks 裡的股票用線上評分補上同一個 horizon
+        results, _ = scorer.score(vals.index[vals.isna()].tolist())
+        for r in results:
+            vals[r["ticker"]] = r["horizons"].get(str(h), np.nan)
+    if vals.isna().any():
+        return returns, LOOKAHEAD_DAYS
+    return vals.tolist(), h
+
 @app.route("/api/simulate", methods=["POST"])
 def simulate():
     risk = request.form["risk"]
@@ -57,57 +237,130 @@ def simulate():
     returns = [float(r) for r in request.form.getlist("pred_return")]
     amount = float(request.form["amount"])
     days = int(request.form["days"])
+    method = request.form.get("method", "equal")
+    max_weight = float(request.form.get("max_weight", 1.0))
+    if method not in METHODS:
+        return jsonify({"error": f"method must be one of {list(METHODS)}"}), 400
+
+    # 使用最接近投資天數的預測期間，而非將 90 天報酬線性縮放
+    returns, horizon = horizon_returns(tickers, returns, days)
 
-    per_stock = amount / len(tickers)
+    # 配置權重：equal / min_variance / max_sharpe / risk_parity
+    cov, cov_source = pick_covariance(tickers)
+    weights = allocate(method, returns, cov, max_weight)
     results = []
 
-    for sym, r in zip(tickers, returns):
-        pct90 = r
-        pct_d = pct90 * (days / 90.0)
-        gain = per_stock * pct_d
+    for sym, r, w in zip(tickers, returns, weights):
+        pct_d = r * (days / horizon)
+        invested = amount * w
+        gain = invested * pct_d
         results.append({
             "ticker": sym,
-            "invested": per_stock,
+            "weight": w,
+            "invested": invested,
             "return_pct": pct_d * 100,
             "gain_usd": gain
         })
 
+    # 組合層級報酬與風險（含個股相關性）
+    stats = portfolio_stats(weights, returns, cov, days, horizon)
+    stats.update({
+        "gain_usd": amount * stats["expected_return_pct"] / 100,
+        "vol_usd": amount * stats["vol_pct"] / 100,
+        "cov_source": cov_source,
+    })
+
     return jsonify({
         "risk": risk,
         "amount": amount,
         "days": days,
-        "results": results
+        "horizon_days": horizon,
+        "method": method,
+        "results": results,
+        "portfolio": stats
     })
 
-@app.route("/api/dashboard", methods=["POST"])
+@app.route("/api/dashboard")
 def dashboard():
-    bucket_str = request.form["risk_bucket"]
-    df = picks_df[picks_df["risk_label"] == bucket_str].nlargest(5, "pred_return").reset_index()
-    recs = [{"ticker": r.ticker, "pred_return": r.pred_return}
-            for r in df.itertuples(index=False)]
+    # GET /api/dashboard?risk_bucket=…&username=…：唯讀且可快取，If-None-Match 才能回 304
+    bucket_str = request.args["risk_bucket"]
+    username = store_user()
+    recs = None
+    if username:
+        recs, _ = store.picks(username, bucket_str, PICKS_VERSION, top_picks)
+    if recs is None:
+        recs = top_picks(bucket_str)
+
+    # 同一版本的 picks 內容相同 → strong ETag，前端可用 If-None-Match 重新驗證
+    return body_cache.respond(
+        request, ("dashboard", bucket_str, PICKS_VERSION),
+        lambda: app.json.dumps({"bucket": bucket_str, "picks": recs}).encode(),
+        "application/json",
+    )
 
+@app.route("/api/score", methods=["POST"])
+def score():
+    if scorer is None:
+        return jsonify({"error": "return model artifacts or feature store not found"}), 503
+    tickers, _, error = request_tickers()
+    if error:
+        return error
+
+    # 同一交易日的同一檔股票只評分一次
+    results, missing = scorer.score(tickers)
+    return jsonify({
+        "scores": results,
+        "missing": missing
+    })
+
+@app.route("/api/stock-risk", methods=["POST"])
+def stock_risk():
+    if bucketer is None:
+        return jsonify({"error": f"{stock_bucketer.CLASSIFIER_FILE} not found"}), 503
+    tickers, body, error = request_tickers()
+    if error:
+        return error
+    fetch = str(request.form.get("fetch", body.get("fetch", ""))).lower() in ("1", "true", "yes")
+
+    # 快取內的股票直接查表；fetch=1 時不在快取的股票向 Stooq 抓價格再分類
+    results, missing = bucketer.bucket(tickers, fetch=fetch)
     return jsonify({
-        "bucket": bucket_str,
-        "picks": recs
+        "buckets": results,
+        "missing": missing
+    })
+
+@app.route("/api/reload", methods=["POST"])
+def reload_picks():
+    # 只接受本機的 refresh_daemon.py 通知
+    if request.remote_addr not in ("127.0.0.1", "::1"):
+        return jsonify({"error": "forbidden"}), 403
+    load_picks()
+    return jsonify({
+        "picks_version": PICKS_VERSION,
+        "scorer": scorer is not None
     })
 
 @app.route("/api/download/<bucket>")
 def download_csv(bucket):
-    
+    fmt = request.args.get("format", "csv")
+    if fmt not in DOWNLOAD_FORMATS:
+        return jsonify({"error": f"format must be one of {list(DOWNLOAD_FORMATS)}"}), 400
+
     # Filter the DataFrame
-    df = picks_df[picks_df["risk_label"] == bucket]
-    print(bucket)
-    # Convert DataFrame to CSV in memory
-    csv_buffer = io.StringIO()
-    df.to_csv(csv_buffer, index=False)
-    csv_buffer.seek(0)
-
-    # Convert to BytesIO for send_file
-    return send_file(
-        io.BytesIO(csv_buffer.read().encode('utf-8')),
-        mimetype="text/csv",
-        as_attachment=True,
-        download_name=f"{bucket.lower()}_picks.csv"
+    df = picks_df[picks_df["risk_label"] == bucket].reset_index()
+    name = f"{bucket.lower()}_picks.{fmt}"
+
+    # 大檔案：逐塊串流（壓縮由 after_request 處理）
+    if request.args.get("stream"):
+        return Response(
+            stream_rows(df, fmt), mimetype=DOWNLOAD_FORMATS[fmt],
+            headers={"Content-Disposition": f'attachment; filename="{name}"'},
+        )
+
+    return body_cache.respond(
+        request, ("download", bucket, fmt, PICKS_VERSION),
+        lambda: "".join(stream_rows(df, fmt)).encode("utf-8"),
+        DOWNLOAD_FORMATS[fmt], download_name=name,
     )
 
 if __name__ == "__main__":
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+batch_score.py
+
+Score every NFCS respondent with risk_pipeline.joblib, for population-level
+analytics (bucket mix by age / income / ethnicity, drift between model
+versions) rather than the handful of examples profiles.py pulls.
+
+The rows are read in CHUNK_ROWS chunks (record batches of a Parquet
+nfcs_data cache, or a CSV read with `chunksize`) and sent to a process pool.
+Each worker loads the pipeline once in its initializer and is pinned to one
+thread, so the pool scales by processes instead of oversubscribing cores.  At
+most 2 × workers chunks are in flight, and each scored chunk is appended to
+the output in input order as soon as its result arrives.
+
+The output is one columnar table: row, the 19 fields, observed risk_level
+(when known), pred_bucket, one p_<bucket> probability per class, `valid`
+(nfcs_schema: no invalid codes) and `model` (short SHA-256 of the pipeline
+file, so runs of different model versions can be stacked and compared).
+With pyarrow it is a Parquet file written chunk by chunk, so memory stays at
+a window of chunks whatever the population size.  Without pyarrow the NFCS
+cache is a pickle that is loaded whole, and the scored chunks are kept until
+a single pickle is written at the end.
+
+    python batch_score.py                          # → nfcs_scores.parquet
+    python batch_score.py --workers 4 --chunk 2000
+    python batch_score.py --csv wave2.csv --out wave2_scores
+"""
+
+import argparse
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from nfcs_data import FEATURE_COLS, RISK_LEVELS, iter_nfcs
+from nfcs_schema import SCHEMA
+
+# PARAMETERS
+PIPELINE_FILE = "risk_pipeline.joblib"
+ENCODER_FILE  = "risk_label_encoder.joblib"
+OUT_STEM      = "nfcs_scores"
+CHUNK_ROWS    = 5000
+WORKERS       = os.cpu_count() or 1
+
+_worker = {}                    # per-process model, filled by _init_worker
+
+
+# ─── Worker side ───────────────────────────────────────────────────────────────
+def _init_worker(pipeline_file: str):
+    import joblib
+    from threadpoolctl import threadpool_limits
+
+    pipe = joblib.load(pipeline_file)
+    # parallelism comes from the pool: no joblib workers (forest) or OpenMP threads (hist_gb)
+    if hasattr(pipe[-1], "n_jobs"):
+        pipe[-1].n_jobs = 1
+    threadpool_limits(1)
+    _worker["pipe"] = pipe
+
+
+def _score_chunk(X: np.ndarray):
+    """float32 (rows, FEATURE_COLS) → (bucket codes into classes, float32 probabilities)."""
+    pipe = _worker["pipe"]
+    proba = pipe.predict_proba(pd.DataFrame(X, columns=FEATURE_COLS))
+    return proba.argmax(axis=1).astype(np.int8), proba.astype(np.float32)
+
+
+def _model_classes() -> np.ndarray:
+    """Encoded classes in predict_proba column order."""
+    return _worker["pipe"][-1].classes_
+
+
+# ─── Input ─────────────────────────────────────────────────────────────────────
+def iter_chunks(csv_path: str = None, chunk_rows: int = CHUNK_ROWS):
+    """Yield DataFrame chunks with FEATURE_COLS (float32) and risk_level when known."""
+    if csv_path is None:
+        yield from iter_nfcs(chunk_rows)
+        return
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+        out = pd.DataFrame({c: pd.to_numeric(chunk[c], errors="coerce").astype("float32")
+                            for c in FEATURE_COLS}, index=chunk.index)
+        if "risk_level" in chunk:
+            out["risk_level"] = chunk["risk_level"]
+        yield out
+
+
+def _features(chunk: pd.DataFrame) -> np.ndarray:
+    return chunk[FEATURE_COLS].to_numpy(dtype=np.float32, na_value=np.nan)
+
+
+def _ordered(pool, fn, chunks, window: int):
+    """(chunk, fn(features)) in input order, at most `window` chunks submitted ahead."""
+    pending = []
+    for chunk in chunks:
+        pending.append((chunk, pool.submit(fn, _features(chunk))))
+        if len(pending) >= window:
+            chunk, fut = pending.pop(0)
+            yield chunk, fut.result()
+    for chunk, fut in pending:
+        yield chunk, fut.result()
+
+
+# ─── Output ────────────────────────────────────────────────────────────────────
+class TableWriter:
+    """
+    Appends scored chunks to `stem`.parquet through a pyarrow ParquetWriter, or
+    collects them for one `stem`.pkl when pyarrow is missing.  The file appears
+    under its final name only on close().
+    """
+
+    def __init__(self, stem: str):
+        stem = os.path.splitext(stem)[0]
+        try:
+            import pyarrow  # noqa: F401
+            self.path = stem + ".parquet"
+        except ImportError:
+            self.path = stem + ".pkl"
+        self._tmp = self.path + ".tmp"
+        self._writer = None
+        self._schema = None
+        self._parts = []
+
+    def write(self, df: pd.DataFrame):
+        if self.path.endswith(".pkl"):
+            self._parts.append(df)
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+        if self._writer is None:
+            self._schema = table.schema
+            self._writer = pq.ParquetWriter(self._tmp, self._schema)
+        self._writer.write_table(table)
+
+    def close(self) -> str:
+        if self._writer is not None:
+            self._writer.close()
+        else:
+            pd.concat(self._parts, ignore_index=True).to_pickle(self._tmp)
+        os.replace(self._tmp, self.path)
+        return self.path
+
+
+# ─── Scoring ───────────────────────────────────────────────────────────────────
+def _output_frame(chunk: pd.DataFrame, codes: np.ndarray, proba: np.ndarray,
+                  first_row: int, classes: list, model: str) -> pd.DataFrame:
+    """One chunk of the output table."""
+    out = pd.DataFrame({"row": np.arange(first_row, first_row + len(chunk), dtype=np.int64)})
+    for c in FEATURE_COLS:
+        out[c] = chunk[c].to_numpy(dtype=np.float32)
+    if "risk_level" in chunk:
+        out["risk_level"] = pd.Categorical(chunk["risk_level"].astype(str).to_numpy(),
+                                           categories=RISK_LEVELS)
+    out["pred_bucket"] = pd.Categorical(np.asarray(classes)[codes], categories=RISK_LEVELS)
+    for j, name in enumerate(classes):
+        out[f"p_{name}"] = proba[:, j]
+    out["valid"] = SCHEMA.validate_frame(chunk).ok(allow_missing=True)
+    out["model"] = pd.Categorical([model] * len(out), categories=[model])
+    return out
+
+
+def score_population(csv_path: str = None, out_stem: str = OUT_STEM,
+                     workers: int = WORKERS, chunk_rows: int = CHUNK_ROWS,
+                     pipeline_file: str = PIPELINE_FILE, encoder_file: str = ENCODER_FILE) -> str:
+    """Score all rows → columnar file; returns its path."""
+    import joblib
+
+    with open(pipeline_file, "rb") as f:
+        model = hashlib.sha256(f.read()).hexdigest()[:12]
+    le = joblib.load(encoder_file)
+    writer = TableWriter(out_stem)
+    t0 = time.perf_counter()
+
+    def run(scored, classes):
+        rows, n_chunks, counts = 0, 0, np.zeros(len(classes), dtype=np.int64)
+        for chunk, (codes, proba) in scored:
+            writer.write(_output_frame(chunk, codes, proba, rows, classes, model))
+            counts += np.bincount(codes, minlength=len(classes))
+            rows += len(chunk)
+            n_chunks += 1
+        return rows, n_chunks, counts
+
+    if workers > 1:
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(pipeline_file,)) as pool:
+            classes = list(le.inverse_transform(pool.submit(_model_classes).result()))
+            rows, n_chunks, counts = run(_ordered(pool, _score_chunk,
+                                                  iter_chunks(csv_path, chunk_rows), 2 * workers),
+                                         classes)
+    else:
+        _init_worker(pipeline_file)
+        classes = list(le.inverse_transform(_model_classes()))
+        rows, n_chunks, counts = run(((chunk, _score_chunk(_features(chunk)))
+                                      for chunk in iter_chunks(csv_path, chunk_rows)), classes)
+    t_score = time.perf_counter() - t0
+    path = writer.close()
+    total = time.perf_counter() - t0
+    print(f"✅ {rows} rows in {n_chunks} chunks × {workers} worker(s): "
+          f"scored and written in {t_score:.2f}s ({rows / t_score:,.0f} rows/s), "
+          f"{total:.2f}s incl. closing → {path}")
+    print(pd.Series(counts, index=pd.Index(classes, name="pred_bucket"))
+          .reindex(RISK_LEVELS).to_string())
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score the NFCS population with the risk pipeline")
+    parser.add_argument("--csv", help="Score this CSV (FEATURE_COLS headers) instead of the NFCS cache")
+    parser.add_argument("--out", default=OUT_STEM,
+                        help="Output path without extension (.parquet, or .pkl without pyarrow)")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help="Scoring processes (1 = in-process; default all cores)")
+    parser.add_argument("--chunk", type=int, default=CHUNK_ROWS, help="Rows per chunk")
+    args = parser.parse_args()
+    score_population(args.csv, args.out, args.workers, args.chunk)
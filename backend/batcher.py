@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+batcher.py
+
+Micro-batching for CPU-bound model calls shared by concurrent requests.
+
+Request threads submit one item each and block on a Future.  A collector
+thread waits up to MAX_WAIT_MS after the oldest pending item (or until
+MAX_BATCH items are queued) and hands the whole batch to a sized worker pool,
+so N concurrent /api/predict requests cost one vectorised predict instead of N.
+
+Backpressure: at most WORKERS batches run at once (the queue absorbs bursts
+while they do) and submit() raises Overloaded once MAX_QUEUE items are
+waiting, which the app turns into a 503.  stats() reports queue depth,
+batches in flight, batch sizes, queue wait and rejections.
+
+    batcher = MicroBatcher(lambda rows: model.predict(pd.DataFrame(rows)))
+    label = batcher.submit(row).result(timeout=2)
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# PARAMETERS
+MAX_BATCH   = 64
+MAX_WAIT_MS = 5
+MAX_QUEUE   = 256
+WORKERS     = 2
+
+
+class Overloaded(RuntimeError):
+    """The batch queue is full; the caller should shed the request."""
+
+
+class MicroBatcher:
+    """Merge items submitted within MAX_WAIT_MS of each other into one fn(list) call."""
+
+    def __init__(self, fn, max_batch: int = MAX_BATCH, max_wait_ms: float = MAX_WAIT_MS,
+                 max_queue: int = MAX_QUEUE, workers: int = WORKERS, name: str = "batcher"):
+        self._fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self.workers = workers
+
+        self._queue = deque()                          # (item, future, enqueued_at)
+        self._cond = threading.Condition()
+        self._slots = threading.BoundedSemaphore(workers)
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix=name)
+        self._stats = dict(submitted=0, rejected=0, batches=0, rows=0, failed=0,
+                           in_flight=0, max_queue_depth=0, max_batch_size=0, wait_s=0.0)
+        threading.Thread(target=self._collect, name=f"{name}-collector", daemon=True).start()
+
+    def submit(self, item) -> Future:
+        fut = Future()
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise Overloaded(f"{len(self._queue)} items queued (limit {self.max_queue})")
+            self._queue.append((item, fut, time.perf_counter()))
+            self._stats["submitted"] += 1
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], len(self._queue))
+            self._cond.notify()
+        return fut
+
+    def __call__(self, item, timeout: float = None):
+        return self.submit(item).result(timeout)
+
+    # ─── Collector / workers ──────────────────────────────────────────────────
+    def _collect(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                deadline = self._queue[0][2] + self.max_wait
+                while len(self._queue) < self.max_batch:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            # wait for a free worker before taking the batch, so items keep
+            # accumulating (and later batches grow) while every worker is busy
+            self._slots.acquire()
+            with self._cond:
+                batch = [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+                now = time.perf_counter()
+                self._stats["in_flight"] += 1
+                self._stats["batches"] += 1
+                self._stats["rows"] += len(batch)
+                self._stats["max_batch_size"] = max(self._stats["max_batch_size"], len(batch))
+                self._stats["wait_s"] += sum(now - t for _, _, t in batch)
+            self._pool.submit(self._run, batch)
+
+    def _call(self, items) -> list:
+        results = list(self._fn(items))
+        if len(results) != len(items):
+            raise ValueError(f"{len(results)} results for a batch of {len(items)}")
+        return results
+
+    def _run(self, batch):
+        try:
+            try:
+                results = self._call([item for item, _, _ in batch])
+            except Exception:
+                if len(batch) == 1:
+                    raise
+                # one bad item (or a short result list) must not fail its neighbours:
+                # retry them one by one
+                for entry in batch:
+                    self._run_one(entry)
+            else:
+                for (_, fut, _), res in zip(batch, results):
+                    fut.set_result(res)
+        except Exception as e:
+            with self._cond:
+                self._stats["failed"] += 1
+            # nobody may be left waiting on an unresolved future
+            for _, fut, _ in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+        finally:
+            with self._cond:
+                self._stats["in_flight"] -= 1
+            self._slots.release()
+
+    def _run_one(self, entry):
+        item, fut, _ = entry
+        try:
+            fut.set_result(self._call([item])[0])
+        except Exception as e:
+            with self._cond:
+                self._stats["failed"] += 1
+            fut.set_exception(e)
+
+    # ─── Metrics ──────────────────────────────────────────────────────────────
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def stats(self) -> dict:
+        with self._cond:
+            s = dict(self._stats, queue_depth=len(self._queue))
+        wait_s = s.pop("wait_s")
+        s.update({
+            "mean_batch_size": round(s["rows"] / s["batches"], 2) if s["batches"] else 0.0,
+            "mean_queue_wait_ms": round(1000 * wait_s / s["rows"], 3) if s["rows"] else 0.0,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "max_queue": self.max_queue,
+            "workers": self.workers,
+        })
+        return s
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+cli.py
+
+Single entry point for the backend scripts.  Only argparse is imported up
+front; pandas, scikit-learn, yfinance, Flask … are imported inside the
+subcommand that needs them, so `--help` and light commands start instantly.
+
+    python cli.py train-risk [--tune] [--engine forest|hist_gb]
+    python cli.py classify-stocks [--variant risk-level|kmeans]
+    python cli.py train-returns [--incremental] [--sampling all] [--engine forest|hist_gb]
+    python cli.py compare-engines [--model risk|returns|all]
+    python cli.py profiles mapped|show|numeric [--n 5]
+    python cli.py serve [--async] [--port 5050]
+    python cli.py stock-risk AAPL NVDA [--fetch]
+    python cli.py score-population [--workers 4] [--chunk 5000]
+    python cli.py loadtest [--start async] [--concurrency 1,8,32]
+    python cli.py check-startup          # import-time budget for the above (tests/test_cli.py)
+
+Run it from backend/, like the scripts: artifacts are read and written
+relative to the working directory.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+# PARAMETERS
+HELP_BUDGET_S  = 0.5           # wall time for `cli.py [<command>] --help`, interpreter included
+HEAVY_MODULES  = ("numpy", "pandas", "sklearn", "joblib", "yfinance",
+                  "pandas_datareader", "flask", "aiohttp")
+HERE           = os.path.dirname(os.path.abspath(__file__))
+# copies of engines.ENGINES / sampling.STRATEGIES, kept import-free; tests/test_cli.py
+# fails when they drift from the originals
+ENGINES        = ("forest", "hist_gb")
+STRATEGIES     = ("all", "stride", "non_overlapping", "uniqueness")
+
+CLASSIFIERS = {
+    # writes stock_risk_kmeans_robust.csv, the universe train-returns reads
+    "risk-level": "stock_risk_level_classifier.py",
+    # writes sp500_features.csv
+    "kmeans":     "stock_classifier_kmeans.py",
+}
+
+
+# ─── Commands ──────────────────────────────────────────────────────────────────
+def cmd_train_risk(args):
+    import train_risk_model
+
+    train_risk_model.ENGINE = args.engine
+    if args.tune:
+        train_risk_model.tune(search=args.search, n_iter=args.n_iter, n_jobs=args.n_jobs)
+    else:
+        train_risk_model.main()
+
+
+def cmd_classify_stocks(args):
+    import runpy
+
+    # both classifiers are top-level scripts: run them as __main__
+    runpy.run_path(os.path.join(HERE, CLASSIFIERS[args.variant]), run_name="__main__")
+
+
+def cmd_train_returns(args):
+    import top_n_stocks_final as tn
+
+    if args.sampling:
+        tn.SAMPLING = args.sampling
+    tn.ENGINE = args.engine
+    tn.main(args.incremental, args.compare_sampling)
+
+
+def cmd_compare_engines(args):
+    # same splits per model for every engine: held-out NFCS rows / embargoed calendar tail
+    if args.model in ("risk", "all"):
+        import train_risk_model
+
+        train_risk_model.compare_engines()
+    if args.model in ("returns", "all"):
+        import top_n_stocks_final as tn
+
+        if args.sampling:
+            tn.SAMPLING = args.sampling
+        tn.main(compare_models=True)
+
+
+def cmd_profiles(args):
+    import profiles
+
+    if args.mode == "show":
+        profiles.show_profiles()
+    elif args.mode == "numeric":
+        profiles.extract_numeric(n=args.n, replace=args.replace)
+    else:
+        profiles.extract_mapped(n=args.n, replace=args.replace)
+        if args.n <= profiles.PREVIEW_N:
+            profiles.show_profiles()
+
+
+def cmd_serve(args):
+    from app import app
+
+    if args.use_async:
+        from aiohttp import web
+        from serve_async import make_app
+
+        web.run_app(make_app(app, host=args.host, port=args.port, workers=args.workers,
+                             max_inflight=args.max_inflight),
+                    host=args.host, port=args.port)
+    else:
+        app.run(debug=args.debug, host=args.host, port=args.port)
+
+
+def cmd_stock_risk(args):
+    import pandas as pd
+    from stock_bucketer import StockBucketer
+
+    bucketer = StockBucketer()
+    results, missing = bucketer.bucket([t.upper() for t in args.tickers], fetch=args.fetch)
+    if results:
+        print(pd.DataFrame(results).set_index("ticker").to_string())
+    if missing:
+        print(f"⚠️  no features for: {', '.join(missing)}")
+
+
+def cmd_score_population(args):
+    import batch_score
+
+    batch_score.score_population(args.csv, args.out, args.workers, args.chunk)
+
+
+def cmd_loadtest(args):
+    import loadtest
+
+    loadtest.run(args)
+
+
+def cmd_check_startup(args):
+    """Run tests/test_cli.py (import-time budget, no heavy imports, choice lists in sync)."""
+    env = dict(os.environ, CLI_HELP_BUDGET_S=str(args.budget))
+    proc = subprocess.run([sys.executable, "-m", "pytest", "-q",
+                           os.path.join(HERE, "tests", "test_cli.py")], cwd=HERE, env=env)
+    sys.exit(proc.returncode)
+
+
+COMMANDS = {
+    "train-risk":      cmd_train_risk,
+    "classify-stocks": cmd_classify_stocks,
+    "train-returns":   cmd_train_returns,
+    "compare-engines": cmd_compare_engines,
+    "profiles":        cmd_profiles,
+    "serve":           cmd_serve,
+    "stock-risk":      cmd_stock_risk,
+    "score-population": cmd_score_population,
+    "loadtest":        cmd_loadtest,
+    "check-startup":   cmd_check_startup,
+}
+
+
+# ─── Parser ────────────────────────────────────────────────────────────────────
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="AI4INVEST backend commands")
+    sub = parser.add_subparsers(dest="command", metavar="command", required=True)
+
+    p = sub.add_parser("train-risk", help="Train (or tune) the NFCS risk classifier")
+    p.add_argument("--tune", action="store_true",
+                   help="Run a hyper-parameter search instead of training the default model")
+    p.add_argument("--search", choices=["halving", "random"], default="halving")
+    p.add_argument("--n-iter", type=int, default=30, help="Candidates to sample (default 30)")
+    p.add_argument("--n-jobs", type=int, default=-1, help="Parallel CV workers (default all cores)")
+    p.add_argument("--engine", choices=ENGINES, default="forest", help="Classifier engine")
+
+    p = sub.add_parser("classify-stocks", help="Cluster the top-volume S&P 500 names into risk levels")
+    p.add_argument("--variant", choices=list(CLASSIFIERS), default="risk-level",
+                   help="risk-level → stock_risk_kmeans_robust.csv, kmeans → sp500_features.csv")
+
+    p = sub.add_parser("train-returns", help="Train the return model and export top-N picks")
+    p.add_argument("--incremental", action="store_true",
+                   help="Update the saved forest with new samples instead of refitting")
+    p.add_argument("--sampling", choices=STRATEGIES,
+                   help="Training-set reduction for overlapping target windows "
+                        "(default: top_n_stocks_final.SAMPLING)")
+    p.add_argument("--compare-sampling", action="store_true",
+                   help="Report fit time, memory and out-of-sample MSE per sampling strategy")
+    p.add_argument("--engine", choices=ENGINES,
+                   help="Regressor engine (default: the saved model's, else forest)")
+
+    p = sub.add_parser("compare-engines",
+                       help="Fit time, predict throughput, artifact size and accuracy per engine")
+    p.add_argument("--model", choices=["risk", "returns", "all"], default="all")
+    p.add_argument("--sampling", choices=STRATEGIES,
+                   help="Return-model training rows (see train-returns)")
+
+    p = sub.add_parser("profiles", help="Extract or show risk-profile examples")
+    p.add_argument("mode", nargs="?", choices=["mapped", "show", "numeric"], default="mapped",
+                   help="mapped (UI strings), show (print CSV), numeric (raw numbers)")
+    p.add_argument("--n", type=int, default=5, help="How many per bucket (default 5)")
+    p.add_argument("--replace", action="store_true",
+                   help="Sample with replacement so every bucket gets exactly --n rows")
+
+    p = sub.add_parser("serve", help="Run the Flask API")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=5050)
+    p.add_argument("--async", dest="use_async", action="store_true",
+                   help="Serve on an asyncio event loop (serve_async.py)")
+    p.add_argument("--workers", type=int, default=32, help="--async: threads running handlers")
+    p.add_argument("--max-inflight", type=int, default=128,
+                   help="--async: requests admitted at once; more get 503")
+    p.add_argument("--debug", action="store_true", help="Flask debug mode (sync server only)")
+
+    p = sub.add_parser("stock-risk", help="Risk bucket per ticker by nearest KMeans centroid")
+    p.add_argument("tickers", nargs="+")
+    p.add_argument("--fetch", action="store_true", help="Fetch prices for tickers outside the cache")
+
+    # defaults mirror batch_score.py without importing pandas
+    p = sub.add_parser("score-population",
+                       help="Score every NFCS row in a process pool → nfcs_scores.parquet")
+    p.add_argument("--csv", help="Score this CSV (form-field headers) instead of the NFCS cache")
+    p.add_argument("--out", default="nfcs_scores",
+                   help="Output path without extension (.parquet, or .pkl without pyarrow)")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                   help="Scoring processes (1 = in-process; default all cores)")
+    p.add_argument("--chunk", type=int, default=5000, help="Rows per chunk")
+
+    from loadtest import add_arguments        # stdlib-only at import time
+
+    p = sub.add_parser("loadtest", help="Drive a local server with a request mix, report JSON")
+    add_arguments(p)
+
+    p = sub.add_parser("check-startup", help="Check --help stays within the import-time budget")
+    p.add_argument("--budget", type=float, default=HELP_BUDGET_S, help="Seconds per --help")
+
+    for name, fn in COMMANDS.items():
+        sub.choices[name].set_defaults(func=fn)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
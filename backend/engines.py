@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+engines.py
+
+Model engines shared by the risk classifier (train_risk_model.py) and the
+return regressor (top_n_stocks_final.py), selected with each script's ENGINE
+parameter or --engine:
+
+  * "forest"  → RandomForestClassifier / RandomForestRegressor (the original
+                models; the only engine explainer.py and incremental updates
+                support)
+  * "hist_gb" → HistGradientBoostingClassifier / -Regressor: features are
+                binned into ≤255 buckets once, so fitting scales with bins
+                instead of rows, and the saved model is a few hundred small
+                trees instead of a forest of deep ones.
+
+A regressor for several horizons is one model per horizon
+(MaskedMultiOutputRegressor), each fitted on the rows where its own target is
+known: a long horizon's missing labels on the newest dates do not cost the
+shorter horizons those rows.
+
+Engine parameters stay in the training scripts next to the forest defaults.
+
+    model = make_regressor("hist_gb", n_outputs=len(HORIZONS), **HGB_PARAMS)
+    model.fit(X, y)                            # y (n, H) may hold NaN per horizon
+    engine_of(model)                           # "hist_gb"
+    rows_per_second(model.predict, X_test)     # batch predict throughput
+"""
+
+import pickle
+import time
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.multioutput import MultiOutputRegressor
+
+# PARAMETERS
+ENGINES        = ("forest", "hist_gb")
+THROUGHPUT_S   = 0.5           # minimum wall time per throughput measurement
+
+
+def make_classifier(engine: str, **params):
+    if engine == "forest":
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(**params)
+    if engine == "hist_gb":
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        return HistGradientBoostingClassifier(**params)
+    raise ValueError(f"unknown engine {engine!r}; expected one of {ENGINES}")
+
+
+class MaskedMultiOutputRegressor(MultiOutputRegressor):
+    """MultiOutputRegressor whose fit gives each output only the rows where its target is finite."""
+
+    def fit(self, X, y, sample_weight=None, **fit_params):
+        X, y = np.asarray(X), np.asarray(y)
+        self.estimators_ = []
+        for k in range(y.shape[1]):
+            rows = np.isfinite(y[:, k])
+            if not rows.any():
+                raise ValueError(f"no finite targets for output {k}")
+            est = clone(self.estimator)
+            if sample_weight is None:
+                est.fit(X[rows], y[rows, k], **fit_params)
+            else:
+                est.fit(X[rows], y[rows, k], sample_weight=np.asarray(sample_weight)[rows],
+                        **fit_params)
+            self.estimators_.append(est)
+        self.n_features_in_ = X.shape[1]
+        return self
+
+
+def make_regressor(engine: str, n_outputs: int = 1, **params):
+    if engine == "forest":
+        from sklearn.ensemble import RandomForestRegressor
+        model = RandomForestRegressor(**params)
+    elif engine == "hist_gb":
+        from sklearn.ensemble import HistGradientBoostingRegressor
+        model = HistGradientBoostingRegressor(**params)
+    else:
+        raise ValueError(f"unknown engine {engine!r}; expected one of {ENGINES}")
+    return MaskedMultiOutputRegressor(model) if n_outputs > 1 else model
+
+
+def per_output(model) -> list:
+    """The per-horizon estimators of a multi-output wrapper, else [model]."""
+    return list(model.estimators_) if isinstance(model, MultiOutputRegressor) else [model]
+
+
+def engine_of(model) -> str:
+    """Engine name of a fitted or unfitted model (a Pipeline is judged by its last step)."""
+    if hasattr(model, "steps"):
+        model = model.steps[-1][1]
+    if isinstance(model, MultiOutputRegressor):
+        model = model.estimator
+    name = type(model).__name__
+    if name.startswith("RandomForest"):
+        return "forest"
+    if name.startswith("HistGradientBoosting"):
+        return "hist_gb"
+    return name
+
+
+def model_mb(model) -> float:
+    """Pickled size, which is what joblib.dump writes (uncompressed)."""
+    return len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)) / 1e6
+
+
+def rows_per_second(predict, X, min_time: float = THROUGHPUT_S) -> float:
+    """Batch predict throughput: repeat predict(X) for at least min_time seconds."""
+    predict(X)                                               # warm-up
+    n, t0 = 0, time.perf_counter()
+    while True:
+        predict(X)
+        n += 1
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time:
+            return n * len(X) / elapsed
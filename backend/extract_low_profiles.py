@@ -1,15 +1,9 @@
 #!/usr/bin/env python3
-import pandas as pd
+from nfcs_data import load_nfcs
+from nfcs_schema import validate_frame
 
-# 1) load & map risk
-def map_risk(x):
-    if x <= 3:   return 'Low'
-    elif x <= 7: return 'Medium'
-    else:        return 'High'
-
-df = pd.read_excel('risk_profiling_data.xlsx', engine='openpyxl')
-df = df[df['Take Risk'].notnull()].copy()
-df['risk_level'] = df['Take Risk'].apply(map_risk)
+# 1) load (risk_level is mapped & numerics coerced in the cached frame)
+df = load_nfcs()
 
 # 2) all the features we coerce‐to‐numeric in train_risk_model.py
 feats = [
@@ -34,40 +28,15 @@ feats = [
     'Marital Status'
 ]
 
-# 3) coerce & drop any rows with NaN
-for c in feats:
-    df[c] = pd.to_numeric(df[c], errors='coerce')
-df = df.dropna(subset=feats + ['risk_level'])
-
-# 4) enforce plausible ranges
-ranges = {
-    'Age Group':             (1, 6),
-    'Education Level':       (1, 4),
-    'Financially dependent children': (0, 10),
-    'Annual Household Income':        (1, 9),
-    'Spending vs Income Past Year':   (1, 3),
-    'Difficulty covering expenses':   (1, 3),
-    'Emergency fund to cover 3 Months expenses': (0, 3),
-    'Current financial condition satisfaction':   (1, 5),
-    'Thinking about FC frequency':    (1, 4),
-    'Account ownership check':        (0, 10),
-    'Savings/Money market/CD account ownership': (0, 10),
-    'Employer-sponsored retirement plan ownership': (0, 10),
-    'Homeownership': (0, 1),
-    'Regular contribution to a retirement account': (0, 1),
-    'Non-retirement investments in stocks, bonds, mutual funds': (0, 1),
-    'Self-efficacy':                (1, 7),
-    'Self-rated overall financial knowledge': (1, 7),
-    'Ethnicity': (1, 5),
-    'Marital Status': (1, 4),
-}
+# 3) drop rows with a missing field or a code outside the NFCS codebook
+#    (nfcs_schema: one vectorised pass over all 19 fields)
+df = df.dropna(subset=['risk_level'])
+df = df[validate_frame(df).ok()]
 
-clean = df[df['risk_level']=='Low'].copy()
-for col, (lo, hi) in ranges.items():
-    clean = clean[ clean[col].between(lo, hi) ]
+clean = df[df['risk_level']=='Low']
 
 # 5) grab five examples and print as dicts
-sample = clean[feats].head(5).to_dict(orient='records')
+sample = clean[feats].head(5).astype(int).to_dict(orient='records')
 
 print("\nHere are 5 *clean* Low-risk profiles. Copy one dict into your sanity_check or Flask mapping:\n")
 for rec in sample:
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+feature_store.py
+
+Point-in-time feature store: one memory-mapped float32 tensor shaped
+(ticker × date × feature) plus ticker / date / feature index maps.
+
+    feature_store/
+        values.f32    raw C-ordered float32, NaN where a value is undefined
+        index.json    {"tickers": [...], "dates": ["YYYY-MM-DD", ...], "features": [...]}
+
+Because tickers are the outer axis, a ticker's history is one contiguous
+block and an as-of cross-section is a single strided view; both are O(1)
+NumPy slices of the mmap, so training, backtests and the Flask app can read
+the same file without copying it into object-indexed frames.
+
+    store = FeatureStore.from_panels("feature_store", engine.compute(["vol30", "mom30"]))
+    store.cross_section("2024-06-28")      # (tickers, features) as of that date
+    store.history("AAPL", start="2024-01-01")
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# PARAMETERS
+STORE_DIR   = "feature_store"
+VALUES_FILE = "values.f32"
+INDEX_FILE  = "index.json"
+DTYPE       = np.float32
+
+
+class FeatureStore:
+    """Memory-mapped (ticker × date × feature) float32 tensor with index maps."""
+
+    def __init__(self, path: str = STORE_DIR, mode: str = "r"):
+        with open(os.path.join(path, INDEX_FILE)) as f:
+            index = json.load(f)
+        self.path = path
+        self.tickers = index["tickers"]
+        self.features = index["features"]
+        self.dates = np.array(index["dates"], dtype="datetime64[D]")
+        self.values = np.memmap(
+            os.path.join(path, VALUES_FILE), dtype=DTYPE, mode=mode,
+            shape=(len(self.tickers), len(self.dates), len(self.features)),
+        )
+        self._ticker_pos = {t: i for i, t in enumerate(self.tickers)}
+        self._feature_pos = {f: i for i, f in enumerate(self.features)}
+
+    # ─── Construction ─────────────────────────────────────────────────────────
+    @classmethod
+    def create(cls, path, tickers, dates, features, fill=None) -> "FeatureStore":
+        """
+        Allocate an all-NaN store, let `fill(store)` write into it, and open it
+        read/write.  An existing store at `path` is never rewritten in place:
+        the new one is built in `path`.next and swapped in with renames, so
+        readers holding the old mmap keep a consistent (if stale) view.
+        """
+        staging = path.rstrip(os.sep) + ".next"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        dates = pd.DatetimeIndex(dates).strftime("%Y-%m-%d").tolist()
+        shape = (len(tickers), len(dates), len(features))
+        values = np.memmap(os.path.join(staging, VALUES_FILE), dtype=DTYPE, mode="w+", shape=shape)
+        values[:] = np.nan
+        values.flush()
+        del values
+        with open(os.path.join(staging, INDEX_FILE), "w") as f:
+            json.dump({"tickers": list(tickers), "dates": dates, "features": list(features)}, f)
+        if fill is not None:
+            nxt = cls(staging, mode="r+")
+            fill(nxt)
+            nxt.flush()
+            del nxt
+        _swap_in(staging, path)
+        return cls(path, mode="r+")
+
+    @classmethod
+    def from_panels(cls, path, panels: dict) -> "FeatureStore":
+        """Build a store from {feature: DataFrame(dates × tickers)} (e.g. FeatureEngine.compute)."""
+        first = next(iter(panels.values()))
+        return cls.create(path, list(first.columns), first.index, list(panels),
+                          fill=lambda store: store.write(panels))
+
+    def write(self, panels: dict):
+        """
+        Overwrite the rows covered by {feature: DataFrame(dates × tickers)}.
+        Every date must already be in the store (see extend) and every ticker known.
+        """
+        for name, panel in panels.items():
+            j = self._feature_pos[name]
+            dpos = np.searchsorted(self.dates, panel.index.values.astype("datetime64[D]"))
+            tpos = np.array([self._ticker_pos[t] for t in panel.columns], dtype=np.intp)
+            if len(dpos) and (dpos[-1] >= len(self.dates) or np.any(
+                    self.dates[dpos] != panel.index.values.astype("datetime64[D]"))):
+                raise KeyError(f"{name}: panel has dates missing from the store")
+            arr = panel.to_numpy(dtype=DTYPE).T                   # (tickers, dates)
+            if len(dpos) and dpos[-1] - dpos[0] + 1 == len(dpos):   # contiguous: slice assignment
+                self.values[tpos, dpos[0]:dpos[-1] + 1, j] = arr
+            else:
+                self.values[np.ix_(tpos, dpos, [j])] = arr[:, :, None]
+        self.values.flush()
+
+    def extend(self, new_dates) -> "FeatureStore":
+        """
+        Append dates (NaN-filled) and return the reopened store, rebuilt and
+        swapped in by create.
+        """
+        new_dates = pd.DatetimeIndex(new_dates).values.astype("datetime64[D]")
+        new_dates = np.setdiff1d(new_dates, self.dates)
+        if not len(new_dates):
+            return self
+        if new_dates[0] <= self.dates[-1]:
+            raise ValueError("extend only appends dates after the last stored date")
+
+        def copy_old(nxt):
+            nxt.values[:, :len(self.dates)] = self.values
+
+        return FeatureStore.create(self.path, self.tickers, np.concatenate([self.dates, new_dates]),
+                                   self.features, fill=copy_old)
+
+    def flush(self):
+        self.values.flush()
+
+    # ─── Index maps ───────────────────────────────────────────────────────────
+    def ticker_pos(self, ticker: str) -> int:
+        return self._ticker_pos[ticker]
+
+    def feature_idx(self, features=None):
+        """Slice (no copy) for all features, else an index array."""
+        if features is None:
+            return slice(None)
+        return np.array([self._feature_pos[f] for f in features], dtype=np.intp)
+
+    def date_pos(self, date=None) -> int:
+        """Position of the last stored date on/before `date` (point-in-time)."""
+        if date is None:
+            return len(self.dates) - 1
+        pos = int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(date), "D"), side="right")) - 1
+        if pos < 0:
+            raise KeyError(f"no data on or before {date}")
+        return pos
+
+    # ─── Slices ───────────────────────────────────────────────────────────────
+    def cross_section(self, date=None, features=None) -> np.ndarray:
+        """(tickers × features) as of `date`; a view of the mmap when features is None."""
+        return self.values[:, self.date_pos(date), self.feature_idx(features)]
+
+    def history(self, ticker, start=None, end=None, features=None) -> np.ndarray:
+        """(dates × features) for one ticker between start and end (inclusive)."""
+        lo = 0 if start is None else int(np.searchsorted(
+            self.dates, np.datetime64(pd.Timestamp(start), "D")))
+        hi = self.date_pos(end) + 1
+        return self.values[self.ticker_pos(ticker), lo:hi, self.feature_idx(features)]
+
+    def cross_section_frame(self, date=None, features=None) -> pd.DataFrame:
+        return pd.DataFrame(self.cross_section(date, features), index=pd.Index(self.tickers, name="ticker"),
+                            columns=features or self.features, copy=False)
+
+    def history_frame(self, ticker, start=None, end=None, features=None) -> pd.DataFrame:
+        block = self.history(ticker, start, end, features)
+        lo = self.date_pos(end) + 1 - len(block)
+        dates = pd.DatetimeIndex(self.dates[lo:lo + len(block)], name="date")
+        return pd.DataFrame(block, index=dates, columns=features or self.features, copy=False)
+
+    def latest(self, features=None, date=None) -> pd.DataFrame:
+        """
+        Per ticker, the last row on/before `date` where every requested feature
+        is defined (the store equivalent of dropna().groupby(level=0).tail(1)).
+        """
+        fidx = self.feature_idx(features)
+        block = self.values[:, :self.date_pos(date) + 1, fidx]
+        ok = np.isfinite(block).all(axis=2)                      # (tickers, dates)
+        has = ok.any(axis=1)
+        last = ok.shape[1] - 1 - np.argmax(ok[:, ::-1], axis=1)
+        t = np.flatnonzero(has)
+        index = pd.MultiIndex.from_arrays(
+            [np.array(self.tickers, dtype=object)[t], pd.DatetimeIndex(self.dates[last[t]])],
+            names=["ticker", "date"],
+        )
+        return pd.DataFrame(block[t, last[t]], index=index, columns=features or self.features)
+
+    def to_frame(self, features=None, dropna=True) -> pd.DataFrame:
+        """Long (ticker, date) frame, for code that still wants pandas."""
+        fidx = self.feature_idx(features)
+        data = self.values[:, :, fidx].reshape(-1, len(features or self.features))
+        index = pd.MultiIndex.from_product(
+            [self.tickers, pd.DatetimeIndex(self.dates)], names=["ticker", "date"])
+        df = pd.DataFrame(data, index=index, columns=features or self.features)
+        return df.dropna() if dropna else df
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes
+
+    def __repr__(self):
+        t, d, f = self.values.shape
+        return (f"FeatureStore({self.path!r}, {t} tickers × {d} dates × {f} features, "
+                f"{self.nbytes / 1e6:.1f} MB)")
+
+
+def _swap_in(staging: str, path: str):
+    """Replace the store directory `path` with `staging` (two renames; no in-place rewrite)."""
+    old_path = path.rstrip(os.sep) + ".old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(staging, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect a feature store")
+    parser.add_argument("path", nargs="?", default=STORE_DIR)
+    parser.add_argument("--date", help="As-of date for the cross-section (default: latest)")
+    parser.add_argument("--ticker", help="Show this ticker's history instead")
+    args = parser.parse_args()
+
+    store = FeatureStore(args.path)
+    print(store)
+    if args.ticker:
+        print(store.history_frame(args.ticker, end=args.date).tail(10).to_string())
+    else:
+        print(store.cross_section_frame(args.date).head(20).to_string())
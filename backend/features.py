@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+features.py
+
+Lazy feature registry for the price-based models.
+
+Every feature is registered with the lookback window it needs and the names
+it depends on (other features or shared intermediates such as daily returns
+and rolling means).  A FeatureEngine is built over wide panels
+(dates × tickers) and computes a requested column only when asked, memoising
+every intermediate, so
+
+    FeatureEngine(close, market=spy_close).frame(["vol30", "mom30", "beta60"])
+
+computes daily returns once, the 30/60-day rolling moments once, and nothing
+for RSI, drawdown or volume features nobody asked for.
+
+Inputs available to features: "close", "volume" (optional), "market_close"
+(optional, needed for beta).
+"""
+
+import numpy as np
+import pandas as pd
+
+REGISTRY = {}
+INPUTS = ("close", "volume", "market_close")
+
+
+class Feature:
+    """A registered column: how to compute it, its window and its dependencies."""
+
+    def __init__(self, name, fn, window, deps):
+        self.name = name
+        self.fn = fn
+        self.window = window
+        self.deps = tuple(deps)
+
+    def __repr__(self):
+        return f"Feature({self.name!r}, window={self.window}, deps={self.deps})"
+
+
+def register(name, window=0, deps=()):
+    """Decorator: fn(*dep_panels) → panel, registered under `name`."""
+    def deco(fn):
+        if name in REGISTRY or name in INPUTS:
+            raise ValueError(f"feature {name!r} already registered")
+        REGISTRY[name] = Feature(name, fn, window, deps)
+        return fn
+    return deco
+
+
+# ─── Shared intermediates ──────────────────────────────────────────────────────
+register("ret", 1, ["close"])(lambda close: close.pct_change(fill_method=None))
+register("market_ret", 1, ["market_close"])(lambda m: m.pct_change(fill_method=None))
+register("ret_sq", 0, ["ret"])(lambda r: r ** 2)
+register("price_diff", 1, ["close"])(lambda close: close.diff())
+
+
+def _mean_name(base, w):
+    return f"{base}_mean{w}"
+
+
+def rolling_mean(base, w):
+    """Register (once) and return the name of the `w`-day rolling mean of `base`."""
+    name = _mean_name(base, w)
+    if name not in REGISTRY:
+        register(name, w, [base])(lambda x: x.rolling(w, min_periods=w).mean())
+    return name
+
+
+# ─── Volatility / momentum / beta ──────────────────────────────────────────────
+def _register_vol(w):
+    @register(f"vol{w}", w, [rolling_mean("ret", w), rolling_mean("ret_sq", w)])
+    def vol(m1, m2):
+        # sample std (ddof=1) from the shared rolling first/second moments
+        return np.sqrt(((m2 - m1 ** 2) * w / (w - 1)).clip(lower=0))
+
+
+def _register_mom(w):
+    register(f"mom{w}", w, ["close"])(lambda close: close / close.shift(w) - 1)
+
+
+for _w in (10, 30, 60):
+    _register_vol(_w)
+for _w in (10, 30, 90):
+    _register_mom(_w)
+
+register("vol30_log", 0, ["vol30"])(np.log1p)
+
+
+@register("ret_x_market", 0, ["ret", "market_ret"])
+def _ret_x_market(ret, mkt):
+    return ret.mul(mkt, axis=0)
+
+
+register("market_ret_sq", 0, ["market_ret"])(lambda m: m ** 2)
+
+
+@register("beta60", 60, [rolling_mean("ret", 60), rolling_mean("market_ret", 60),
+                         rolling_mean("ret_x_market", 60), rolling_mean("market_ret_sq", 60)])
+def _beta60(r_mean, m_mean, rm_mean, m2_mean):
+    cov = rm_mean.sub(r_mean.mul(m_mean, axis=0))
+    var = m2_mean - m_mean ** 2
+    return cov.div(var.where(var > 0), axis=0)
+
+
+# ─── Oscillators / drawdown ────────────────────────────────────────────────────
+@register("rsi14", 14, ["price_diff"])
+def _rsi14(diff):
+    gain = diff.clip(lower=0).ewm(alpha=1 / 14, min_periods=14, adjust=False).mean()
+    loss = (-diff).clip(lower=0).ewm(alpha=1 / 14, min_periods=14, adjust=False).mean()
+    return 100 - 100 / (1 + gain / loss)
+
+
+@register("drawdown252", 252, ["close"])
+def _drawdown252(close):
+    return close / close.rolling(252, min_periods=1).max() - 1
+
+
+# ─── Volume-based ──────────────────────────────────────────────────────────────
+@register("volume_ratio20", 20, ["volume"])
+def _volume_ratio20(volume):
+    return volume / volume.rolling(20, min_periods=20).mean()
+
+
+@register("dollar_volume20", 20, ["close", "volume"])
+def _dollar_volume20(close, volume):
+    return (close * volume).rolling(20, min_periods=20).mean()
+
+
+# ─── Engine ────────────────────────────────────────────────────────────────────
+class FeatureEngine:
+    """Computes registered features on demand over aligned wide panels."""
+
+    def __init__(self, close: pd.DataFrame, volume: pd.DataFrame = None,
+                 market: pd.Series = None):
+        close = close.sort_index()
+        self._cache = {"close": close}
+        if volume is not None:
+            self._cache["volume"] = volume.reindex_like(close)
+        if market is not None:
+            if isinstance(market, pd.DataFrame):    # yf.download("SPY")["Close"]
+                market = market.squeeze(axis=1)
+            self._cache["market_close"] = market.reindex(close.index)
+        self.computed = []          # order in which features were materialised
+
+    def add(self, name: str, panel: pd.DataFrame):
+        """Attach a precomputed panel (e.g. a target) so frame() can stack it too."""
+        self._cache[name] = panel
+
+    def get(self, name: str, _stack=()):
+        if name in self._cache:
+            return self._cache[name]
+        if name in INPUTS:
+            raise KeyError(f"input {name!r} was not provided to FeatureEngine")
+        if name not in REGISTRY:
+            raise KeyError(f"unknown feature {name!r}")
+        if name in _stack:
+            raise ValueError(f"dependency cycle: {' → '.join(_stack + (name,))}")
+        feat = REGISTRY[name]
+        args = [self.get(d, _stack + (name,)) for d in feat.deps]
+        self._cache[name] = feat.fn(*args)
+        self.computed.append(name)
+        return self._cache[name]
+
+    def compute(self, names) -> dict:
+        return {n: self.get(n) for n in names}
+
+    def frame(self, names) -> pd.DataFrame:
+        """Long frame indexed by (ticker, date) with one column per requested feature."""
+        close = self._cache["close"]
+        index = pd.MultiIndex.from_product([close.columns, close.index],
+                                           names=["ticker", "date"])
+        # panels are (dates × tickers); transposing before ravel gives ticker-major rows
+        return pd.DataFrame({
+            n: p.reindex(columns=close.columns).to_numpy().T.ravel()
+            for n, p in self.compute(names).items()
+        }, index=index)
+
+    def latest(self, names) -> pd.DataFrame:
+        """Per ticker, the last date on which every requested feature is defined."""
+        df = self.frame(names).dropna()
+        return df.groupby(level="ticker").tail(1).droplevel("date")
+
+
+def lookback(names) -> int:
+    """Rows of history needed before `names` are all defined (longest dependency chain)."""
+    def depth(n):
+        if n in INPUTS:
+            return 0
+        f = REGISTRY[n]
+        return max(f.window, max((depth(d) for d in f.deps), default=0))
+    return max(depth(n) for n in names)
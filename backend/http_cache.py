@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+http_cache.py
+
+Response helpers for the Flask app:
+
+  * negotiate()         → pick br / gzip / identity from Accept-Encoding
+  * BodyCache.respond() → picks-derived bodies rendered once per data version,
+                          with a strong ETag (304 on If-None-Match) and the
+                          gzip / brotli variants compressed once and cached
+  * compress_response() → after_request hook that compresses JSON bodies and
+                          streamed downloads on the fly when the client accepts it
+  * stream_rows()       → CSV / NDJSON generators for streamed downloads
+
+Brotli is optional: "br" is only offered when the `brotli` package imports.
+"""
+
+import csv
+import gzip
+import hashlib
+import io
+import threading
+import zlib
+from collections import OrderedDict
+
+from flask import Response
+
+# PARAMETERS
+MIN_COMPRESS_BYTES = 1024      # smaller bodies are not worth the CPU / headers
+GZIP_LEVEL         = 6
+BROTLI_QUALITY     = 5         # cached bodies are compressed once, streams per request
+CACHE_ENTRIES      = 256
+STREAM_CHUNK_ROWS  = 1000
+
+try:
+    import brotli
+except ImportError:            # optional dependency
+    brotli = None
+
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: str):
+    """Best supported content-coding for an Accept-Encoding header, or None."""
+    prefs = {}
+    for part in (accept_encoding or "").split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        for p in params.split(";"):
+            k, _, v = p.strip().partition("=")
+            if k == "q":
+                try:
+                    q = float(v)
+                except ValueError:
+                    q = 0.0
+        if token:
+            prefs[token.lower()] = q
+    best = None
+    for enc in ENCODINGS:                       # server preference breaks ties
+        q = prefs.get(enc, prefs.get("*", 0.0))
+        if q > 0 and (best is None or q > best[1]):
+            best = (enc, q)
+    return best[0] if best else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _stream_compressor(encoding: str):
+    """(compress, flush) callables for incremental encoding of a streamed body."""
+    if encoding == "br":
+        c = brotli.Compressor(quality=BROTLI_QUALITY)
+        return c.process, c.finish
+    c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)      # 31 → gzip container
+    return c.compress, c.flush
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (t.strip() for t in if_none_match.split(","))
+
+
+class BodyCache:
+    """LRU of rendered bodies keyed by (endpoint, args…, data version)."""
+
+    def __init__(self, max_entries: int = CACHE_ENTRIES):
+        self._entries = OrderedDict()
+        self._max = max_entries
+        self._lock = threading.Lock()
+
+    def _entry(self, key, render):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        body = render()
+        entry = {
+            "identity": body,
+            "etag": '"' + hashlib.sha1(body).hexdigest()[:20] + '"',
+        }
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self._max:
+                self._entries.popitem(last=False)
+        return entry
+
+    def respond(self, request, key, render, mimetype, download_name=None) -> Response:
+        """
+        Conditional, content-negotiated response for a cacheable body.
+        `render()` → bytes is only called on a cache miss.  If-None-Match is
+        only honoured for GET / HEAD (RFC 9110 §13.1.2: a failed condition on
+        other methods is 412, not 304), so a POST always gets its body.
+        """
+        entry = self._entry(key, render)
+        encoding = negotiate(request.headers.get("Accept-Encoding", ""))
+        if len(entry["identity"]) < MIN_COMPRESS_BYTES:
+            encoding = None
+        # one strong validator per representation
+        etag = entry["etag"] if encoding is None else entry["etag"][:-1] + f'-{encoding}"'
+
+        headers = {
+            "ETag": etag,
+            "Vary": "Accept-Encoding",
+            "Cache-Control": "no-cache",        # always revalidate, 304 is cheap
+        }
+        if request.method in ("GET", "HEAD") and \
+                _etag_matches(request.headers.get("If-None-Match"), etag):
+            return Response(status=304, headers=headers)
+
+        if encoding is None:
+            body = entry["identity"]
+        else:
+            body = entry.get(encoding)
+            if body is None:
+                body = entry[encoding] = compress(entry["identity"], encoding)
+            headers["Content-Encoding"] = encoding
+        if download_name:
+            headers["Content-Disposition"] = f'attachment; filename="{download_name}"'
+        return Response(body, mimetype=mimetype, headers=headers)
+
+
+def compress_response(response: Response, request) -> Response:
+    """after_request hook: encode JSON bodies and streams the client can decode."""
+    if (response.status_code < 200 or response.status_code in (204, 304)
+            or "Content-Encoding" in response.headers):
+        return response
+    encoding = negotiate(request.headers.get("Accept-Encoding", ""))
+    if encoding is None:
+        return response
+    response.vary.add("Accept-Encoding")
+
+    if response.is_streamed:
+        chunks = response.response
+        process, finish = _stream_compressor(encoding)
+
+        def encoded():
+            for chunk in chunks:
+                out = process(chunk if isinstance(chunk, bytes) else chunk.encode())
+                if out:
+                    yield out
+            yield finish()
+
+        response.response = encoded()
+        response.headers.pop("Content-Length", None)
+    elif response.mimetype == "application/json" and not response.direct_passthrough:
+        body = response.get_data()
+        if len(body) < MIN_COMPRESS_BYTES:
+            return response
+        response.set_data(compress(body, encoding))
+    else:
+        return response
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def stream_rows(df, fmt: str, chunk_rows: int = STREAM_CHUNK_ROWS):
+    """Yield a frame as CSV (header first) or NDJSON, `chunk_rows` rows per chunk."""
+    cols = list(df.columns)
+    if fmt == "csv":
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator="\n")
+        writer.writerow(cols)
+    for start in range(0, len(df), chunk_rows):
+        block = df.iloc[start:start + chunk_rows]
+        if fmt == "csv":
+            writer.writerows(block.itertuples(index=False, name=None))
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+        else:
+            lines = block.to_json(orient="records", lines=True, date_format="iso", double_precision=15)
+            yield lines if lines.endswith("\n") else lines + "\n"
+    if fmt == "csv" and buf.tell():
+        yield buf.getvalue()                     # header of an empty frame
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+loadtest.py
+
+Offline load test for the Flask API (app.py / serve_async.py).
+
+Builds a realistic request mix from the NFCS sample profiles written by
+`profiles.py numeric` and the picks file, drives a local server with a fixed
+number of closed-loop clients (each sends its next request as soon as the
+previous answer arrives) and reports, per concurrency level and endpoint,
+throughput and p50 / p95 / p99 latency as JSON.
+
+    python profiles.py numeric --n 200 --replace       # request profiles
+    python loadtest.py --start async --concurrency 1,8,32,128 --duration 20
+    python loadtest.py --url http://127.0.0.1:5050 --mix predict=1 --out predict.json
+
+--start spawns `cli.py serve` (sync Werkzeug or --async) on --port and stops
+it afterwards; --url targets a server that is already running.  The server's
+/api/metrics snapshot is attached after every level.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+# PARAMETERS
+PROFILES_FILE = "sample_profiles_numeric.csv"     # profiles.py numeric
+PICKS_FILE    = "top_n_per_category.csv"
+MIX           = "predict=5,dashboard=3,simulate=2"
+CONCURRENCY   = "1,8,32"
+DURATION_S    = 15.0
+WARMUP_S      = 2.0
+PORT          = 5099
+STARTUP_S     = 120.0          # model loading can take a while
+TIMEOUT_S     = 30.0
+PERCENTILES   = (50, 95, 99)
+RISK_LEVELS   = ["Low", "Medium", "High"]
+HERE          = os.path.dirname(os.path.abspath(__file__))
+
+
+# ─── Request mix ──────────────────────────────────────────────────────────────
+def load_profiles(path: str = PROFILES_FILE) -> list:
+    """Numeric NFCS profiles as form dicts (duplicated header columns collapse)."""
+    if not os.path.exists(path):
+        raise SystemExit(f"⚠️  {path} not found; run `python profiles.py numeric --n 200 --replace`")
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    for r in rows:
+        r.pop("risk_level", None)
+    return rows
+
+
+def load_picks(path: str = PICKS_FILE) -> dict:
+    """{bucket: [(ticker, pred_return), …]} best first."""
+    picks = {b: [] for b in RISK_LEVELS}
+    with open(path, encoding="utf-8", newline="") as f:
+        for r in csv.DictReader(f):
+            if r.get("risk_label") in picks:
+                picks[r["risk_label"]].append((r["ticker"], float(r["pred_return"])))
+    return {b: sorted(p, key=lambda t: -t[1])[:5] for b, p in picks.items() if p}
+
+
+def register_users(url: str, profiles: list, n: int, seed: int = 0) -> dict:
+    """Create n throwaway users through /api/users → {username: token}."""
+    rng = random.Random(seed)
+    run_id = time.strftime("%Y%m%d%H%M%S")
+    tokens = {}
+    for i in range(n):
+        username = f"loadtest-{run_id}-{i}"
+        body = urllib.parse.urlencode(dict(rng.choice(profiles), username=username)).encode()
+        req = urllib.request.Request(url + "/api/users", data=body)
+        with urllib.request.urlopen(req, timeout=TIMEOUT_S) as resp:
+            tokens[username] = json.load(resp)["user_token"]
+    return tokens
+
+
+class RequestMix:
+    """Weighted random stream of (endpoint, method, path, form fields, headers)."""
+
+    def __init__(self, weights: dict, profiles: list, picks: dict, seed: int = 0):
+        self.names = [n for n, w in weights.items() if w > 0]
+        self.weights = [weights[n] for n in self.names]
+        self.profiles, self.picks = profiles, picks
+        self.tokens = {}                              # register_users(); empty = anonymous
+        self.rng = random.Random(seed)
+
+    def _user(self):
+        if not self.tokens:
+            return [], {}
+        username = self.rng.choice(list(self.tokens))
+        return [("username", username)], {"X-User-Token": self.tokens[username]}
+
+    def next(self):
+        name = self.rng.choices(self.names, self.weights)[0]
+        bucket = self.rng.choice(list(self.picks))
+        if name == "predict":
+            user, headers = self._user()
+            form = list(self.rng.choice(self.profiles).items()) + user
+            return name, "POST", "/api/predict", form, headers
+        if name == "dashboard":
+            user, headers = self._user()
+            query = urllib.parse.urlencode([("risk_bucket", bucket)] + user)
+            return name, "GET", f"/api/dashboard?{query}", [], headers
+        if name == "simulate":
+            form = [("risk", bucket), ("amount", "10000"),
+                    ("days", str(self.rng.choice([30, 90, 180, 365]))),
+                    ("method", self.rng.choice(["equal", "min_variance", "max_sharpe", "risk_parity"]))]
+            for ticker, ret in self.picks[bucket]:
+                form += [("ticker", ticker), ("pred_return", repr(ret))]
+            return name, "POST", "/api/simulate", form, {}
+        if name == "download":
+            return name, "GET", f"/api/download/{bucket}", [], {}
+        raise ValueError(f"unknown endpoint {name!r}")
+
+
+def parse_mix(spec: str) -> dict:
+    weights = {}
+    for part in spec.split(","):
+        name, _, w = part.partition("=")
+        weights[name.strip()] = float(w or 1)
+    return weights
+
+
+# ─── Driver ───────────────────────────────────────────────────────────────────
+async def _client(session, url, mix, stop_at, record_from, samples):
+    import aiohttp
+
+    while time.perf_counter() < stop_at:
+        name, method, path, form, headers = mix.next()
+        t0 = time.perf_counter()
+        try:
+            async with session.request(method, url + path, headers=headers,
+                                       data=aiohttp.FormData(form) if form else None) as resp:
+                await resp.read()
+                status = resp.status
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            status = type(e).__name__
+        t1 = time.perf_counter()
+        if t0 >= record_from:
+            samples.append((name, status, t1 - t0))
+
+
+async def run_level(url, mix, concurrency, duration, warmup) -> dict:
+    import aiohttp
+
+    samples = []
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=TIMEOUT_S)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        start = time.perf_counter()
+        record_from, stop_at = start + warmup, start + warmup + duration
+        await asyncio.gather(*[_client(session, url, mix, stop_at, record_from, samples)
+                               for _ in range(concurrency)])
+        elapsed = time.perf_counter() - record_from
+    return summarize(samples, elapsed, concurrency)
+
+
+def _percentile(sorted_ms, q):
+    """Nearest-rank percentile."""
+    if not sorted_ms:
+        return None
+    return round(sorted_ms[max(math.ceil(q / 100 * len(sorted_ms)) - 1, 0)], 3)
+
+
+def _stats(samples, elapsed):
+    ms = sorted(1000 * s[2] for s in samples)
+    status = {}
+    for s in samples:
+        status[str(s[1])] = status.get(str(s[1]), 0) + 1
+    ok = sum(n for code, n in status.items() if code.isdigit() and int(code) < 400)
+    out = {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 2),
+        "ok_rps": round(ok / elapsed, 2),
+        "errors": len(samples) - ok,
+        "status": status,
+        "mean_ms": round(sum(ms) / len(ms), 3) if ms else None,
+    }
+    out.update({f"p{q}_ms": _percentile(ms, q) for q in PERCENTILES})
+    out["max_ms"] = round(ms[-1], 3) if ms else None
+    return out
+
+
+def summarize(samples, elapsed, concurrency) -> dict:
+    names = sorted({s[0] for s in samples})
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        "overall": _stats(samples, elapsed),
+        "endpoints": {n: _stats([s for s in samples if s[0] == n], elapsed) for n in names},
+    }
+
+
+def server_metrics(url):
+    try:
+        with urllib.request.urlopen(url + "/api/metrics", timeout=5) as resp:
+            return json.load(resp)
+    except (OSError, ValueError):
+        return None
+
+
+# ─── Local server ─────────────────────────────────────────────────────────────
+def start_server(mode: str, port: int):
+    cmd = [sys.executable, os.path.join(HERE, "cli.py"), "serve", "--port", str(port)]
+    if mode == "async":
+        cmd.append("--async")
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + STARTUP_S
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"⚠️  server exited with code {proc.returncode}: {' '.join(cmd)}")
+        if server_metrics(url) is not None:
+            return proc, url
+        time.sleep(0.5)
+    proc.terminate()
+    raise SystemExit(f"⚠️  server not ready after {STARTUP_S:.0f}s")
+
+
+# ─── Entry points ─────────────────────────────────────────────────────────────
+def add_arguments(parser: argparse.ArgumentParser):
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="Running server, e.g. http://127.0.0.1:5050")
+    target.add_argument("--start", choices=["sync", "async"], default="async",
+                        help="Start `cli.py serve` locally (default async) and stop it afterwards")
+    parser.add_argument("--port", type=int, default=PORT, help="Port for --start")
+    parser.add_argument("--concurrency", default=CONCURRENCY,
+                        help="Comma-separated client counts, one level each (default %(default)s)")
+    parser.add_argument("--duration", type=float, default=DURATION_S, help="Measured seconds per level")
+    parser.add_argument("--warmup", type=float, default=WARMUP_S, help="Unrecorded seconds per level")
+    parser.add_argument("--mix", default=MIX,
+                        help="endpoint=weight list over predict, dashboard, simulate, download")
+    parser.add_argument("--users", type=int, default=0,
+                        help="Create this many users and send their usernames and tokens "
+                             "(exercises the user cache)")
+    parser.add_argument("--profiles", default=PROFILES_FILE)
+    parser.add_argument("--picks", default=PICKS_FILE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Also write the JSON report here")
+
+
+def run(args) -> dict:
+    profiles = load_profiles(args.profiles)
+    mix = RequestMix(parse_mix(args.mix), profiles, load_picks(args.picks), seed=args.seed)
+    proc = None
+    if args.url:
+        url = args.url.rstrip("/")
+    else:
+        proc, url = start_server(args.start, args.port)
+    try:
+        if args.users:
+            mix.tokens = register_users(url, profiles, args.users, args.seed)
+        levels = []
+        for c in (int(x) for x in args.concurrency.split(",")):
+            level = asyncio.run(run_level(url, mix, c, args.duration, args.warmup))
+            level["server_metrics"] = server_metrics(url)
+            o = level["overall"]
+            print(f"c={c:<4} {o['throughput_rps']:>9.1f} req/s  p50 {o['p50_ms']} ms  "
+                  f"p95 {o['p95_ms']} ms  p99 {o['p99_ms']} ms  errors {o['errors']}",
+                  file=sys.stderr)
+            levels.append(level)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    report = {
+        "target": url,
+        "server": args.start if proc is not None else "external",
+        "mix": parse_mix(args.mix),
+        "duration_s": args.duration,
+        "warmup_s": args.warmup,
+        "users": args.users,
+        "seed": args.seed,
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "levels": levels,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the backend API")
+    add_arguments(parser)
+    run(parser.parse_args())
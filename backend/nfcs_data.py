@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+nfcs_data.py
+
+Shared loader for the NFCS risk-profiling workbook.
+
+Parsing `risk_profiling_data.xlsx` with openpyxl is the slowest step of every
+tool that reads it, so the workbook is converted once into a typed columnar
+cache (Parquet when pyarrow is installed, pickle otherwise) holding only the
+19 feature columns, `Take Risk` and the derived `risk_level`.
+
+The cache is keyed by the source file's mtime/size and SHA-256: a matching
+mtime is trusted as-is, a changed mtime triggers a hash check, and the cache
+is rebuilt only when the content actually differs.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# ─── Config & shared lists ────────────────────────────────────────────────────
+
+EXCEL_FILE = "risk_profiling_data.xlsx"
+CACHE_DIR  = ".nfcs_cache"
+
+NUMERIC_FEATS = [
+    "Age Group","Education Level",
+    "Financially dependent children","Annual Household Income",
+    "Spending vs Income Past Year","Difficulty covering expenses",
+    "Emergency fund to cover 3 Months expenses",
+    "Current financial condition satisfaction",
+    "Thinking about FC frequency","Account ownership check",
+    "Savings/Money market/CD account ownership",
+    "Employer-sponsored retirement plan ownership","Homeownership",
+    "Regular contribution to a retirement account",
+    "Non-retirement investments in stocks, bonds, mutual funds",
+    "Self-efficacy","Self-rated overall financial knowledge"
+]
+ONEHOT_FEATS = ["Ethnicity","Marital Status"]
+
+# Same order as the Flask form / profiles.py
+FEATURE_COLS = [
+    "Age Group","Ethnicity","Education Level","Marital Status",
+    "Financially dependent children","Annual Household Income",
+    "Spending vs Income Past Year","Difficulty covering expenses",
+    "Emergency fund to cover 3 Months expenses",
+    "Current financial condition satisfaction",
+    "Thinking about FC frequency","Account ownership check",
+    "Savings/Money market/CD account ownership",
+    "Employer-sponsored retirement plan ownership","Homeownership",
+    "Regular contribution to a retirement account",
+    "Non-retirement investments in stocks, bonds, mutual funds",
+    "Self-efficacy","Self-rated overall financial knowledge"
+]
+
+RISK_LEVELS = ["Low","Medium","High"]
+
+# ─── Bucket mapping ────────────────────────────────────────────────────────────
+def map_risk_series(take_risk: pd.Series) -> pd.Series:
+    """Vectorized Take Risk → Low (≤3) / Medium (≤7) / High."""
+    x = take_risk.to_numpy(dtype=float)
+    levels = np.where(x <= 3, "Low", np.where(x <= 7, "Medium", "High"))
+    return pd.Series(
+        pd.Categorical(levels, categories=RISK_LEVELS),
+        index=take_risk.index, name="risk_level"
+    )
+
+# ─── Cache helpers ─────────────────────────────────────────────────────────────
+def _file_sha256(path: str, chunk: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _cache_paths(excel_file: str, cache_dir: str):
+    stem = os.path.splitext(os.path.basename(excel_file))[0]
+    try:
+        import pyarrow  # noqa: F401
+        data = os.path.join(cache_dir, f"{stem}.parquet")
+    except ImportError:
+        data = os.path.join(cache_dir, f"{stem}.pkl")
+    return data, os.path.join(cache_dir, f"{stem}.meta.json")
+
+
+def _read_cache(path: str) -> pd.DataFrame:
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+
+def _write_cache(df: pd.DataFrame, path: str):
+    tmp = path + ".tmp"
+    if path.endswith(".parquet"):
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_pickle(tmp)
+    os.replace(tmp, path)
+
+
+def _parse_excel(excel_file: str) -> pd.DataFrame:
+    """The slow path: openpyxl parse, column selection, coercion and target."""
+    raw = pd.read_excel(excel_file, engine="openpyxl")
+    take_risk = pd.to_numeric(raw["Take Risk"], errors="coerce")
+    keep = take_risk.notnull()
+    raw, take_risk = raw[keep], take_risk[keep]
+
+    df = pd.DataFrame(index=raw.index)
+    for c in FEATURE_COLS:
+        df[c] = pd.to_numeric(raw[c], errors="coerce").astype("float32")
+    df["Take Risk"]  = take_risk
+    df["risk_level"] = map_risk_series(take_risk)
+    return df.reset_index(drop=True)
+
+# ─── Public loader ─────────────────────────────────────────────────────────────
+def ensure_cache(excel_file: str = EXCEL_FILE, cache_dir: str = CACHE_DIR,
+                 refresh: bool = False) -> str:
+    """Path of an up-to-date cache of the workbook, rebuilt only when it is stale."""
+    os.makedirs(cache_dir, exist_ok=True)
+    data_path, meta_path = _cache_paths(excel_file, cache_dir)
+    st = os.stat(excel_file)
+
+    if not refresh and os.path.exists(data_path) and os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("mtime_ns") == st.st_mtime_ns and meta.get("size") == st.st_size:
+            return data_path
+        # mtime changed (copy, touch, checkout) → fall back to content hash
+        digest = _file_sha256(excel_file)
+        if meta.get("sha256") == digest:
+            meta.update(mtime_ns=st.st_mtime_ns, size=st.st_size)
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            return data_path
+    else:
+        digest = _file_sha256(excel_file)
+
+    df = _parse_excel(excel_file)
+    _write_cache(df, data_path)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"mtime_ns": st.st_mtime_ns, "size": st.st_size,
+                   "sha256": digest, "rows": len(df)}, f)
+    return data_path
+
+
+def load_nfcs(excel_file: str = EXCEL_FILE, cache_dir: str = CACHE_DIR,
+              refresh: bool = False) -> pd.DataFrame:
+    """
+    Return the NFCS rows with a non-null `Take Risk`, features coerced to
+    float32 (NaN where unparsable) and `risk_level` already mapped.
+    """
+    return _read_cache(ensure_cache(excel_file, cache_dir, refresh))
+
+
+def iter_nfcs(chunk_rows: int, excel_file: str = EXCEL_FILE, cache_dir: str = CACHE_DIR):
+    """
+    load_nfcs in chunks of `chunk_rows` rows.  A Parquet cache is read one
+    record batch at a time; a pickle cache can only be loaded whole.
+    """
+    data_path = ensure_cache(excel_file, cache_dir)
+    if data_path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(data_path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+        return
+    df = _read_cache(data_path)
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Build / refresh the NFCS cache")
+    parser.add_argument("--excel", default=EXCEL_FILE)
+    parser.add_argument("--refresh", action="store_true",
+                        help="Ignore any existing cache and re-parse the workbook")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    df = load_nfcs(args.excel, refresh=args.refresh)
+    print(f"✅ {len(df)} rows loaded in {time.perf_counter() - t0:.3f}s")
+    print(df["risk_level"].value_counts().to_string())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+nfcs_schema.py
+
+One compiled schema for the 19 NFCS profile fields, shared by training
+(train_risk_model.py), sample extraction (profiles.py, extract_low_profiles.py)
+and serving (app.py).
+
+Every field is an integer code from the NFCS codebook, the same values the
+create / edit-form dropdowns send (98 = "Don't know", 99 = "Prefer not to say").
+The code lists are compiled once into per-field bounds and a
+(field × code) lookup table, so a whole batch is validated in a single NumPy
+pass that returns two uint32 bitmasks per row (bit i = FEATURE_COLS[i]):
+
+  * missing → empty / NaN
+  * invalid → present but unparsable, not an integer or not an allowed code
+
+    v = validate_frame(df)                  # or validate_records(form_dicts)
+    df = df[v.ok(allow_missing=True)]       # training: the imputer fills gaps
+    v.errors(0)                             # {"Age Group": "invalid", ...}
+"""
+
+from typing import List, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from nfcs_data import FEATURE_COLS
+
+# PARAMETERS
+YES_NO   = (1, 2, 98, 99)
+LIKERT7  = (1, 2, 3, 4, 5, 6, 7, 98, 99)
+SCALE10  = (1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 98, 99)
+
+FIELD_CODES = {
+    "Age Group":                                   (1, 2, 3, 4, 5, 6),
+    "Ethnicity":                                   (1, 2),
+    "Education Level":                             (1, 2, 3, 4, 5, 6, 7),
+    "Marital Status":                              (1, 2, 3, 4, 5, 99),
+    "Financially dependent children":              (1, 2, 3, 4, 5, 6, 99),
+    "Annual Household Income":                     SCALE10,
+    "Spending vs Income Past Year":                (1, 2, 3, 98, 99),
+    "Difficulty covering expenses":                (1, 2, 3, 98, 99),
+    "Emergency fund to cover 3 Months expenses":   YES_NO,
+    "Current financial condition satisfaction":    SCALE10,
+    "Thinking about FC frequency":                 (1, 2, 3, 4, 5, 6, 98, 99),
+    "Account ownership check":                     YES_NO,
+    "Savings/Money market/CD account ownership":   YES_NO,
+    "Employer-sponsored retirement plan ownership": YES_NO,
+    "Homeownership":                               YES_NO,
+    "Regular contribution to a retirement account": YES_NO,
+    "Non-retirement investments in stocks, bonds, mutual funds": YES_NO,
+    "Self-efficacy":                               LIKERT7,
+    "Self-rated overall financial knowledge":      LIKERT7,
+}
+
+
+class Validation(NamedTuple):
+    """Per-row violation bitmasks; bit i refers to columns[i]."""
+    missing: np.ndarray          # uint32 (n,)
+    invalid: np.ndarray          # uint32 (n,)
+    columns: List[str]
+
+    def ok(self, allow_missing: bool = False) -> np.ndarray:
+        bad = self.invalid if allow_missing else self.invalid | self.missing
+        return bad == 0
+
+    def errors(self, i: int) -> dict:
+        """{field: "missing" | "invalid"} for row i."""
+        out = {}
+        for bit, col in enumerate(self.columns):
+            if self.invalid[i] >> bit & 1:
+                out[col] = "invalid"
+            elif self.missing[i] >> bit & 1:
+                out[col] = "missing"
+        return out
+
+    def counts(self) -> pd.DataFrame:
+        """Rows violating each field, by kind (only fields with violations)."""
+        bits = np.uint32(1) << np.arange(len(self.columns), dtype=np.uint32)
+        df = pd.DataFrame({
+            "missing": ((self.missing[:, None] & bits) != 0).sum(axis=0),
+            "invalid": ((self.invalid[:, None] & bits) != 0).sum(axis=0),
+        }, index=pd.Index(self.columns, name="field"))
+        return df[df.any(axis=1)]
+
+
+class Schema:
+    """Field code lists compiled into bounds and a (field × code) lookup table."""
+
+    def __init__(self, field_codes: dict):
+        if len(field_codes) > 32:
+            raise ValueError("at most 32 fields fit in a uint32 bitmask")
+        self.columns = list(field_codes)
+        n_codes = max(max(c) for c in field_codes.values()) + 1
+        self.allowed = np.zeros((len(self.columns), n_codes), dtype=bool)
+        for j, codes in enumerate(field_codes.values()):
+            self.allowed[j, list(codes)] = True
+        self.lo = np.array([min(c) for c in field_codes.values()], dtype=np.float64)
+        self.hi = np.array([max(c) for c in field_codes.values()], dtype=np.float64)
+        self._field = np.arange(len(self.columns))
+        self._bits = np.uint32(1) << np.arange(len(self.columns), dtype=np.uint32)
+
+    def _mask(self, flags: np.ndarray) -> np.ndarray:
+        return (flags * self._bits).sum(axis=1, dtype=np.uint32)   # distinct bits: sum == OR
+
+    def validate(self, X: np.ndarray, unparsable: np.ndarray = None) -> Validation:
+        """X: float (n, fields) in `columns` order, NaN = missing."""
+        X = np.asarray(X, dtype=np.float64)
+        nan = np.isnan(X)
+        x = np.where(nan, self.lo, X)
+        in_range = (x >= self.lo) & (x <= self.hi)
+        code = np.where(in_range, x, 0).astype(np.intp)
+        good = in_range & (x == code) & self.allowed[self._field, code]
+        invalid = ~nan & ~good
+        if unparsable is not None:
+            invalid |= unparsable
+            nan &= ~unparsable
+        return Validation(self._mask(nan), self._mask(invalid), self.columns)
+
+    def validate_frame(self, df: pd.DataFrame) -> Validation:
+        """Numeric frame (e.g. load_nfcs()) with at least the schema columns."""
+        return self.validate(df[self.columns].to_numpy(dtype=np.float64, na_value=np.nan))
+
+    def coerce(self, records):
+        """Form dicts (strings) → (float (n, fields), unparsable bool (n, fields))."""
+        raw = np.array([[r.get(c) for c in self.columns] for r in records], dtype=object)
+        raw = raw.reshape(len(records), len(self.columns))
+        empty = np.vectorize(lambda v: v is None or str(v).strip() == "", otypes=[bool])(raw)
+        try:
+            X = np.where(empty, np.nan, raw).astype(np.float64)
+            return X, np.zeros_like(empty)
+        except (TypeError, ValueError):
+            X = np.column_stack([pd.to_numeric(pd.Series(raw[:, j]), errors="coerce")
+                                 .to_numpy(dtype=np.float64)
+                                 for j in range(raw.shape[1])]).reshape(raw.shape)
+            X[empty] = np.nan
+            return X, np.isnan(X) & ~empty
+
+    def validate_records(self, records) -> Validation:
+        X, unparsable = self.coerce(records)
+        return self.validate(X, unparsable)
+
+
+SCHEMA = Schema({col: FIELD_CODES[col] for col in FEATURE_COLS})     # bit order = form order
+
+validate_frame = SCHEMA.validate_frame
+validate_records = SCHEMA.validate_records
+
+
+if __name__ == "__main__":
+    import time
+
+    from nfcs_data import load_nfcs
+
+    df = load_nfcs()
+    t0 = time.perf_counter()
+    v = validate_frame(df)
+    ms = 1000 * (time.perf_counter() - t0)
+    print(f"{len(df)} rows validated in {ms:.2f} ms: "
+          f"{int(v.ok().sum())} clean, {int((v.invalid != 0).sum())} with invalid codes, "
+          f"{int((v.missing != 0).sum())} with missing fields")
+    counts = v.counts()
+    if len(counts):
+        print(counts.to_string())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+price_ingest.py
+
+Asyncio ingestion of daily Stooq bars for a whole ticker universe.
+
+The scripts used to fetch one symbol at a time with a 1 s sleep in between, so
+ingest time grew with the number of round-trips.  Here every symbol is a
+concurrent aiohttp request sharing one pooled connector, capped per host,
+with a per-request timeout and exponential-backoff retries.
+
+  * fetch_daily    → {symbol: OHLCV DataFrame}
+  * fetch_closes   → {symbol: Close Series}   (drop-in for the serial fetch_close loops)
+  * download_panel → wide frame with (symbol, field) columns, the same layout as
+                     yf.download(..., group_by="ticker")
+
+`stooq_standin.StooqStandIn` serves the same CSV format locally so the whole
+path can be exercised offline (see `python price_ingest.py --standin`).
+"""
+
+import asyncio
+import io
+import os
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+# PARAMETERS
+STOOQ_URL   = os.environ.get("STOOQ_URL", "https://stooq.com/q/d/l/")   # point at stooq_standin offline
+PER_HOST    = 8        # concurrent connections per host
+TIMEOUT_SEC = 20       # total timeout per request
+RETRIES     = 3        # extra attempts after the first
+BACKOFF_SEC = 0.5      # first retry delay, doubled each attempt
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def stooq_symbol(symbol: str) -> str:
+    """Same convention as pandas_datareader: bare US tickers get a .us suffix."""
+    s = symbol.lower()
+    return s if "." in s else f"{s}.us"
+
+
+def _parse_csv(text: str) -> pd.DataFrame:
+    if not text.startswith("Date"):
+        # Stooq answers unknown symbols / empty ranges with "No data"
+        return pd.DataFrame()
+    df = pd.read_csv(io.StringIO(text), index_col="Date", parse_dates=True)
+    return df.sort_index()
+
+
+async def _fetch_one(session, base_url, symbol, params, retries, backoff):
+    import aiohttp
+
+    for attempt in range(retries + 1):
+        try:
+            async with session.get(base_url, params=params) as resp:
+                if resp.status in RETRY_STATUS:
+                    raise aiohttp.ClientResponseError(
+                        resp.request_info, resp.history,
+                        status=resp.status, message=resp.reason or ""
+                    )
+                resp.raise_for_status()
+                text = await resp.text()
+            return _parse_csv(text)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == retries:
+                print(f"Fetch failed for {symbol}: {e!r}")
+                return pd.DataFrame()
+            await asyncio.sleep(backoff * 2 ** attempt)
+
+
+async def fetch_daily_async(symbols, start=None, end=None, base_url=STOOQ_URL,
+                            per_host=PER_HOST, timeout=TIMEOUT_SEC,
+                            retries=RETRIES, backoff=BACKOFF_SEC):
+    """Fetch daily OHLCV for every symbol concurrently → {symbol: DataFrame}."""
+    import aiohttp
+
+    base = {"i": "d"}
+    if start is not None:
+        base["d1"] = pd.Timestamp(start).strftime("%Y%m%d")
+    if end is not None:
+        base["d2"] = pd.Timestamp(end).strftime("%Y%m%d")
+
+    connector = aiohttp.TCPConnector(limit=0, limit_per_host=per_host)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+        symbols = list(dict.fromkeys(symbols))
+        frames = await asyncio.gather(*[
+            _fetch_one(session, base_url, sym, {**base, "s": stooq_symbol(sym)},
+                       retries, backoff)
+            for sym in symbols
+        ])
+    return dict(zip(symbols, frames))
+
+
+def fetch_daily(symbols, **kwargs):
+    """Blocking wrapper around fetch_daily_async for the script entry points."""
+    return asyncio.run(fetch_daily_async(symbols, **kwargs))
+
+
+def fetch_closes(symbols, **kwargs):
+    """{symbol: Close Series} for every symbol that returned data."""
+    return {
+        sym: df["Close"]
+        for sym, df in fetch_daily(symbols, **kwargs).items()
+        if not df.empty
+    }
+
+
+def download_panel(symbols, days=None, **kwargs) -> pd.DataFrame:
+    """
+    Concurrent replacement for yf.download(symbols, period=..., group_by="ticker"):
+    columns are a (symbol, field) MultiIndex over the union of trading dates.
+    Symbols without data are left out.
+    """
+    if days is not None:
+        kwargs.setdefault("start", date.today() - timedelta(days=days))
+    frames = {s: df for s, df in fetch_daily(symbols, **kwargs).items() if not df.empty}
+    if not frames:
+        return pd.DataFrame(columns=pd.MultiIndex.from_tuples([], names=["Ticker", "Price"]))
+    panel = pd.concat(frames, axis=1, names=["Ticker", "Price"])
+    return panel.sort_index()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark async Stooq ingestion")
+    parser.add_argument("symbols", nargs="*", help="Tickers (default: synthetic universe)")
+    parser.add_argument("--standin", action="store_true",
+                        help="Serve synthetic Stooq CSVs from a local stand-in server")
+    parser.add_argument("--universe", type=int, default=500,
+                        help="Synthetic universe size when no symbols are given")
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="Stand-in per-request latency in seconds")
+    parser.add_argument("--per-host", type=int, default=PER_HOST)
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    symbols = args.symbols or [f"SYM{i:04d}" for i in range(args.universe)]
+
+    def run(base_url):
+        t0 = time.perf_counter()
+        panel = download_panel(symbols, days=args.days, base_url=base_url,
+                               per_host=args.per_host)
+        dt = time.perf_counter() - t0
+        n = panel.columns.get_level_values(0).nunique()
+        print(f"✅ {n}/{len(symbols)} symbols, {len(panel)} dates in {dt:.2f}s "
+              f"({len(symbols) / dt:.0f} symbols/s, per_host={args.per_host})")
+
+    if args.standin:
+        from stooq_standin import StooqStandIn
+        with StooqStandIn(latency=args.latency) as server:
+            run(server.url)
+    else:
+        run(STOOQ_URL)
@@ -11,11 +11,12 @@ One-stop script to extract Low/edium/High examples from your NFCS data:
 
 import argparse
 import csv
-import pandas as pd
+from itertools import islice
+
+import numpy as np
 
 # ─── Config & shared lists ────────────────────────────────────────────────────
 
-EXCEL_FILE  = "risk_profiling_data.xlsx"
 CSV_MAPPED  = "sample_profiles_by_bucket.csv"
 CSV_NUMERIC = "sample_profiles_numeric.csv"
 
@@ -34,12 +35,6 @@ FEATURE_COLS = [
 ]
 NUMERIC_FEATS = FEATURE_COLS + ["Ethnicity","Marital Status"]
 
-# ─── Bucket mapping ────────────────────────────────────────────────────────────
-def map_risk(x):
-    if x <= 3:   return "Low"
-    if x <= 7:   return "Medium"
-    return "High"
-
 # ─── UI mapping dicts ──────────────────────────────────────────────────────────
 age_map       = {1:"18–24",2:"25–34",3:"35–44",4:"45–54",5:"55–64",6:"65+"}
 ethnicity_map = {1:"Hispanic",2:"Non-Hispanic White",3:"Non-Hispanic Black",
@@ -55,99 +50,138 @@ sat_map       = {1:"Very dissatisfied",2:"Somewhat dissatisfied",3:"Neutral",
 freq_map      = {1:"Never",2:"Yearly",3:"Quarterly",4:"Monthly"}
 yesno_map     = {0:"No",1:"Yes"}
 
+COLUMN_MAPS = {
+  "Age Group": age_map,
+  "Ethnicity": ethnicity_map,
+  "Education Level": education_map,
+  "Marital Status": marital_map,
+  "Spending vs Income Past Year": spend_map,
+  "Difficulty covering expenses": diff_map,
+  "Emergency fund to cover 3 Months expenses": emerg_map,
+  "Current financial condition satisfaction": sat_map,
+  "Thinking about FC frequency": freq_map,
+  "Homeownership": yesno_map,
+  "Regular contribution to a retirement account": yesno_map,
+  "Non-retirement investments in stocks, bonds, mutual funds": yesno_map
+}
+
+def _label_array(mapping):
+    """Dense code → label lookup; unmapped codes keep str(code)."""
+    labels = np.array([str(i) for i in range(max(mapping) + 1)], dtype=object)
+    for code, label in mapping.items():
+        labels[code] = label
+    return labels
+
+COLUMN_LABELS = {col: _label_array(m) for col, m in COLUMN_MAPS.items()}
+
+PREVIEW_N  = 5        # rows printed per bucket; the CSV always gets all of them
+CHUNK_ROWS = 50_000   # rows mapped & written per CSV chunk
+
 def map_value(col, code):
     """Map numeric code to the exact form string."""
     v = int(code)
-    mapping = {
-      "Age Group": age_map,
-      "Ethnicity": ethnicity_map,
-      "Education Level": education_map,
-      "Marital Status": marital_map,
-      "Spending vs Income Past Year": spend_map,
-      "Difficulty covering expenses": diff_map,
-      "Emergency fund to cover 3 Months expenses": emerg_map,
-      "Current financial condition satisfaction": sat_map,
-      "Thinking about FC frequency": freq_map,
-      "Homeownership": yesno_map,
-      "Regular contribution to a retirement account": yesno_map,
-      "Non-retirement investments in stocks, bonds, mutual funds": yesno_map
-    }.get(col)
+    mapping = COLUMN_MAPS.get(col)
     if mapping:
         return mapping.get(v, str(v))
     # numeric-only fields
     return str(v)
 
-# ─── 1) Extract & save UI-mapped examples ──────────────────────────────────────
-def extract_mapped(n=5):
-    df = pd.read_excel(EXCEL_FILE, engine="openpyxl")
-    df = df[df["Take Risk"].notnull()].copy()
-    df["risk_level"] = df["Take Risk"].apply(map_risk)
-
-    # coerce & drop missing
-    for c in FEATURE_COLS:
-        df[c] = pd.to_numeric(df[c], errors="coerce")
-    df = df.dropna(subset=FEATURE_COLS)
-
-    samples = []
-    print()
+def map_column(col, codes):
+    """Vectorized map_value: one label-array lookup for a whole column."""
+    v = np.asarray(codes).astype(np.int64)
+    out = v.astype(str).astype(object)
+    labels = COLUMN_LABELS.get(col)
+    if labels is not None:
+        hit = (v >= 0) & (v < len(labels))
+        out[hit] = labels[v[hit]]
+    return out
+
+# ─── Sampling & streamed CSV output ────────────────────────────────────────────
+def sample_by_bucket(df, n, replace=False):
+    """Yield (bucket, rows): n per risk bucket, or the whole bucket if smaller.
+
+    With replace=True every non-empty bucket yields exactly n rows, which is
+    how QA / load-test sets larger than the survey itself are produced.
+    """
     for bucket in ["Low","Medium","High"]:
         sub = df[df["risk_level"] == bucket]
-        sample = sub.sample(n, random_state=42) if len(sub) >= n else sub
-        print(f"=== {bucket.upper()}-RISK EXAMPLES ({len(sample)}) ===")
-        for _, r in sample.iterrows():
-            example = {c: map_value(c, r[c]) for c in FEATURE_COLS}
-            print(example)
-            example["risk_level"] = bucket
-            samples.append(example)
+        if replace and len(sub):
+            yield bucket, sub.sample(n, replace=True, random_state=42)
+        else:
+            yield bucket, sub.sample(n, random_state=42) if len(sub) >= n else sub
+
+def _stream_samples(df, n, replace, cols, to_columns, label):
+    """Map each bucket sample chunk-wise, print a preview, yield column arrays."""
+    print()
+    for bucket, sample in sample_by_bucket(df, n, replace):
+        print(f"=== {bucket.upper()}-RISK {label} ({len(sample)}) ===")
+        for start in range(0, len(sample), CHUNK_ROWS):
+            part = to_columns(sample.iloc[start:start + CHUNK_ROWS])
+            if start == 0:
+                for row in islice(zip(*part), PREVIEW_N):
+                    print(dict(zip(cols, row)))
+                if len(sample) > PREVIEW_N:
+                    print(f"... {len(sample) - PREVIEW_N} more")
+            part.append([bucket] * len(part[0]))
+            yield part
         print()
 
+def _write_csv(path, header, chunks):
+    """Write column-array chunks to a UTF-8 CSV; returns the row count."""
+    total = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for part in chunks:
+            writer.writerows(zip(*part))
+            total += len(part[0])
+    return total
+
+# ─── 1) Extract & save UI-mapped examples ──────────────────────────────────────
+def extract_mapped(n=5, replace=False):
+    from nfcs_data import load_nfcs     # pandas: only paid by the extract modes
+    from nfcs_schema import validate_frame
+
+    # cached frame: numerics coerced, risk_level mapped → keep rows the form accepts
+    df = load_nfcs()
+    df = df[validate_frame(df).ok()]
+
+    def to_columns(part):
+        return [map_column(c, part[c].to_numpy()) for c in FEATURE_COLS]
+
     # write UTF-8 CSV so later reads work without special encoding
-    cols = FEATURE_COLS + ["risk_level"]
-    with open(CSV_MAPPED, "w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=cols)
-        writer.writeheader()
-        writer.writerows(samples)
-    print(f"✅ Mapped samples written to {CSV_MAPPED}\n")
+    chunks = _stream_samples(df, n, replace, FEATURE_COLS, to_columns, "EXAMPLES")
+    total = _write_csv(CSV_MAPPED, FEATURE_COLS + ["risk_level"], chunks)
+    print(f"✅ {total} mapped samples written to {CSV_MAPPED}\n")
 
 # ─── 2) Show pretty Field: Value from the mapped CSV ─────────────────────────
 def show_profiles():
-    df = pd.read_csv(CSV_MAPPED)  # now UTF-8, so no encoding arg needed
+    with open(CSV_MAPPED, encoding="utf-8", newline="") as f:  # csv module, no pandas import
+        rows = list(csv.DictReader(f))
     print()
-    for idx, row in df.iterrows():
+    for idx, row in enumerate(rows):
         print(f"=== {row['risk_level'].upper()}-RISK EXAMPLE #{idx+1} ===")
         for col in FEATURE_COLS:
             print(f"{col}: {row[col]}")
         print()
 
 # ─── 3) Extract & save raw numeric examples ──────────────────────────────────
-def extract_numeric(n=5):
-    df = pd.read_excel(EXCEL_FILE, engine="openpyxl")
-    df = df[df["Take Risk"].notnull()].copy()
-    df["risk_level"] = df["Take Risk"].apply(map_risk)
+def extract_numeric(n=5, replace=False):
+    from nfcs_data import load_nfcs
+    from nfcs_schema import validate_frame
 
-    for c in NUMERIC_FEATS:
-        df[c] = pd.to_numeric(df[c], errors="coerce")
-    df = df.dropna(subset=NUMERIC_FEATS)
+    # cached frame: numerics coerced, risk_level mapped → keep rows the form accepts
+    df = load_nfcs()
+    df = df[validate_frame(df).ok()]
+    uniq = list(dict.fromkeys(NUMERIC_FEATS))
 
-    samples = []
-    print()
-    for bucket in ["Low","Medium","High"]:
-        sub = df[df["risk_level"] == bucket]
-        sample = sub.sample(n, random_state=42) if len(sub) >= n else sub
-        print(f"=== {bucket.upper()}-RISK NUMERIC ({len(sample)}) ===")
-        for _, r in sample.iterrows():
-            d = {c: int(r[c]) for c in NUMERIC_FEATS}
-            print(d)
-            d["risk_level"] = bucket
-            samples.append(d)
-        print()
+    def to_columns(part):
+        ints = {c: part[c].to_numpy().astype(np.int64).tolist() for c in uniq}
+        return [ints[c] for c in NUMERIC_FEATS]
 
-    cols = NUMERIC_FEATS + ["risk_level"]
-    with open(CSV_NUMERIC, "w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=cols)
-        writer.writeheader()
-        writer.writerows(samples)
-    print(f"✅ Numeric samples written to {CSV_NUMERIC}\n")
+    chunks = _stream_samples(df, n, replace, NUMERIC_FEATS, to_columns, "NUMERIC")
+    total = _write_csv(CSV_NUMERIC, NUMERIC_FEATS + ["risk_level"], chunks)
+    print(f"✅ {total} numeric samples written to {CSV_NUMERIC}\n")
 
 # ─── CLI ───────────────────────────────────────────────────────────────────────
 if __name__ == "__main__":
@@ -166,12 +200,18 @@ if __name__ == "__main__":
         default=5,
         help="How many per bucket (default 5)"
     )
+    parser.add_argument(
+        "--replace",
+        action="store_true",
+        help="Sample with replacement so every bucket gets exactly --n rows"
+    )
     args = parser.parse_args()
 
     if args.mode == "show":
         show_profiles()
     elif args.mode == "numeric":
-        extract_numeric(n=args.n)
+        extract_numeric(n=args.n, replace=args.replace)
     else:
-        extract_mapped(n=args.n)
-        show_profiles()
+        extract_mapped(n=args.n, replace=args.replace)
+        if args.n <= PREVIEW_N:
+            show_profiles()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+refresh_daemon.py
+
+Keeps top_n_per_category.csv fresh without rerunning top_n_stocks_final.py
+end to end.  After each US market close it:
+
+  1) ingest   → fetches only the bars after the last cached date and appends
+                them to the local close panel (PRICE_CACHE)
+  2) features → recomputes the trailing rows whose features or forward-return
+                targets changed and writes them into the feature store
+  3) model    → full refit of imputer / scaler / model every RETRAIN_EVERY_DAYS
+                (or when artifacts are missing); in between, a warm-start
+                update of a forest that falls back to a refit on drift.  The
+                saved model's engine is kept unless --engine names another
+  4) score    → re-scores the universe with top_n_stocks_final.select_top_n
+  5) publish  → writes picks_history/top_n_per_category.<stamp>.csv and swaps
+                it into top_n_per_category.csv with an atomic rename
+  6) signal   → POSTs to the Flask app's /api/reload so it re-reads the picks
+
+Stages with nothing to do (no new bars, retrain not due, app not running)
+are logged as skipped; every run logs the duration of each stage.
+
+    python refresh_daemon.py            # loop forever
+    python refresh_daemon.py --once     # one run now
+    python refresh_daemon.py --engine hist_gb
+"""
+
+import json
+import logging
+import os
+import shutil
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+import top_n_stocks_final as tn
+from engines import ENGINES
+from feature_store import FeatureStore
+from features import lookback
+from price_ingest import fetch_closes
+from return_scorer import ARTIFACTS, MODEL_FEATURES
+
+# PARAMETERS
+MARKET_TZ          = ZoneInfo("America/New_York")
+RUN_AT             = "16:30"                          # local market time, Mon–Fri
+RETRAIN_EVERY_DAYS = 7
+PRICE_CACHE        = "price_cache.pkl"                # close panel incl. SPY
+STATE_FILE         = "refresh_state.json"
+PICKS_DIR          = "picks_history"
+PICKS_KEEP         = 30
+RELOAD_URL         = os.environ.get("RELOAD_URL", "http://127.0.0.1:5050/api/reload")
+
+log = logging.getLogger("refresh")
+
+
+# ─── State ─────────────────────────────────────────────────────────────────────
+def load_state() -> dict:
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(state: dict):
+    tmp = STATE_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, STATE_FILE)
+
+
+def next_run(now: datetime) -> datetime:
+    """Next weekday RUN_AT in market time strictly after `now`."""
+    hh, mm = map(int, RUN_AT.split(":"))
+    local = now.astimezone(MARKET_TZ)
+    cand = local.replace(hour=hh, minute=mm, second=0, microsecond=0)
+    if cand <= local:
+        cand += timedelta(days=1)
+    while cand.weekday() >= 5:
+        cand += timedelta(days=1)
+    return cand
+
+
+# ─── Stages ────────────────────────────────────────────────────────────────────
+def ingest(df0: pd.DataFrame):
+    """→ (close panel with SPY, number of new dates)."""
+    if not os.path.exists(PRICE_CACHE):
+        close, spy = tn.load_price_panel(df0)
+        panel = close.assign(SPY=spy.reindex(close.index))
+        panel.to_pickle(PRICE_CACHE)
+        return panel, len(panel)
+
+    panel = pd.read_pickle(PRICE_CACHE)
+    start = panel.index[-1] + timedelta(days=1)
+    closes = fetch_closes(list(panel.columns), start=start)
+    if not closes:
+        return panel, 0
+    new = pd.DataFrame(closes).reindex(columns=panel.columns)
+    new = new[new.index > panel.index[-1]].sort_index()
+    if new.empty:
+        return panel, 0
+    panel = pd.concat([panel, new])
+    tmp = PRICE_CACHE + ".tmp"
+    panel.to_pickle(tmp)
+    os.replace(tmp, PRICE_CACHE)
+    return panel, len(new)
+
+
+def update_features(panel: pd.DataFrame, n_new: int, full: bool) -> FeatureStore:
+    close, spy = panel.drop(columns="SPY"), panel["SPY"]
+    if full or not os.path.exists(tn.FEATURE_STORE):
+        return FeatureStore.from_panels(tn.FEATURE_STORE, tn.feature_panels(close, spy))
+
+    store = FeatureStore(tn.FEATURE_STORE, mode="r+")
+    if n_new == 0:
+        return store
+    in_sync = (n_new < len(close) and list(store.tickers) == list(close.columns)
+               and store.dates[-1] == close.index[-n_new - 1].to_datetime64().astype("datetime64[D]"))
+    if not in_sync:
+        log.info("feature store out of sync with %s; rebuilding", PRICE_CACHE)
+        return FeatureStore.from_panels(tn.FEATURE_STORE, tn.feature_panels(close, spy))
+    store = store.extend(close.index[-n_new:])
+
+    # rows whose target just became known, or that are brand new …
+    first_dirty = len(close) - n_new - max(tn.HORIZONS)
+    # … plus the history their rolling features need
+    start = max(first_dirty - lookback(MODEL_FEATURES) - 1, 0)
+    panels = tn.feature_panels(close.iloc[start:], spy.iloc[start:])
+    write_from = close.index[max(first_dirty, 0)]
+    store.write({name: p.loc[write_from:] for name, p in panels.items()})
+    return store
+
+
+def retrain_due(state: dict, force: bool) -> bool:
+    if force or not all(os.path.exists(p) for p in ARTIFACTS) or "last_retrain" not in state:
+        return True
+    last = datetime.fromisoformat(state["last_retrain"])
+    return datetime.now(MARKET_TZ) - last >= timedelta(days=RETRAIN_EVERY_DAYS)
+
+
+def maintain(store: FeatureStore, df0: pd.DataFrame, full: bool):
+    """Full refit when due, otherwise a warm-start update (which may itself refit on drift)."""
+    tm = tn.build_training_matrix(store, df0)
+    return tn.maintain_model(tm, force_full=full)
+
+
+def publish(store: FeatureStore, df0: pd.DataFrame, artifacts, stamp: str) -> str:
+    os.makedirs(PICKS_DIR, exist_ok=True)
+    root, ext = os.path.splitext(os.path.basename(tn.OUTPUT_FILE))
+    versioned = os.path.join(PICKS_DIR, f"{root}.{stamp}{ext}")
+    imp, scaler, model = artifacts
+    tn.select_top_n(store, df0, model, imp, scaler, output_file=versioned + ".tmp")
+    os.replace(versioned + ".tmp", versioned)
+
+    # same-filesystem copy + rename so readers never see a half-written CSV
+    shutil.copyfile(versioned, tn.OUTPUT_FILE + ".tmp")
+    os.replace(tn.OUTPUT_FILE + ".tmp", tn.OUTPUT_FILE)
+
+    history = sorted(f for f in os.listdir(PICKS_DIR) if f.startswith(root + "."))
+    for old in history[:-PICKS_KEEP]:
+        os.remove(os.path.join(PICKS_DIR, old))
+    return versioned
+
+
+def signal_app(version: str) -> bool:
+    req = urllib.request.Request(RELOAD_URL, data=json.dumps({"version": version}).encode(),
+                                 headers={"Content-Type": "application/json"}, method="POST")
+    try:
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            return resp.status == 200
+    except (urllib.error.URLError, OSError) as e:
+        log.warning("reload signal failed (%s): %s", RELOAD_URL, e)
+        return False
+
+
+# ─── Run ───────────────────────────────────────────────────────────────────────
+def run_once(force_retrain: bool = False, full: bool = False) -> dict:
+    state = load_state()
+    df0 = pd.read_csv(tn.INPUT_FILE, index_col="ticker")
+    stamp = datetime.now(MARKET_TZ).strftime("%Y%m%d-%H%M%S")
+    timings, skipped = {}, []
+    t_run = time.perf_counter()
+
+    def timed(name, fn, *args):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        timings[name] = round(time.perf_counter() - t0, 3)
+        log.info("%-8s %.2fs", name, timings[name])
+        return out
+
+    panel, n_new = timed("ingest", ingest, df0)
+    if n_new == 0 and not (force_retrain or full):
+        skipped += ["features", "retrain", "score", "publish", "signal"]
+        log.info("no new bars after %s; skipped %s", panel.index[-1].date(), ", ".join(skipped))
+    else:
+        store = timed("features", update_features, panel, n_new, full)
+        due = retrain_due(state, force_retrain)
+        *artifacts, action = timed("model", maintain, store, df0, due)
+        log.info("model    %s", action)
+        state["model_action"] = action
+        if action == "update":
+            skipped.append("retrain")
+            log.info("retrain  skipped (last %s, every %d days)",
+                     state["last_retrain"], RETRAIN_EVERY_DAYS)
+        else:
+            state["last_retrain"] = datetime.now(MARKET_TZ).isoformat()
+        versioned = timed("publish", publish, store, df0, artifacts, stamp)
+        state["picks_version"] = versioned
+        if not timed("signal", signal_app, versioned):
+            skipped.append("signal")
+
+    state.update({
+        "last_run": datetime.now(MARKET_TZ).isoformat(),
+        "last_bar": panel.index[-1].strftime("%Y-%m-%d"),
+        "new_bars": int(n_new),
+        "timings": timings,
+        "skipped": skipped,
+    })
+    save_state(state)
+    log.info("run finished in %.2fs (%d new bars, skipped: %s)",
+             time.perf_counter() - t_run, n_new, ", ".join(skipped) or "none")
+    return state
+
+
+def main(once: bool = False, force_retrain: bool = False, full: bool = False):
+    if once:
+        run_once(force_retrain, full)
+        return
+    while True:
+        at = next_run(datetime.now(MARKET_TZ))
+        log.info("next refresh at %s", at.isoformat())
+        time.sleep(max((at - datetime.now(MARKET_TZ)).total_seconds(), 0))
+        try:
+            run_once()
+        except Exception:
+            log.exception("refresh failed; keeping the previous picks")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Incremental after-close refresh of the picks")
+    parser.add_argument("--once", action="store_true", help="Run one refresh now and exit")
+    parser.add_argument("--force-retrain", action="store_true", help="Retrain even if not due")
+    parser.add_argument("--full", action="store_true", help="Rebuild the feature store from scratch")
+    parser.add_argument("--retrain-every", type=int, default=RETRAIN_EVERY_DAYS,
+                        help="Days between model retrains")
+    parser.add_argument("--engine", choices=ENGINES,
+                        help="Return model engine (default: keep the saved model's, else forest)")
+    args = parser.parse_args()
+
+    RETRAIN_EVERY_DAYS = args.retrain_every
+    tn.ENGINE = args.engine
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    main(args.once, args.force_retrain, args.full)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+return_scorer.py
+
+Online scoring with the artifacts exported by top_n_stocks_final.save_artifacts.
+
+The latest complete feature row of every ticker comes from the feature store
+(feature_store.py); a request's tickers are scored with one
+imputer → scaler → forest call and the result is memoised per
+(ticker, feature date), so each ticker is scored at most once per trading day
+(build a new ReturnScorer to pick up a refreshed store or new artifacts).
+
+    scorer = ReturnScorer()
+    results, missing = scorer.score(["AAPL", "MSFT"])
+"""
+
+import os
+import threading
+
+import joblib
+import pandas as pd
+
+from feature_store import FeatureStore, STORE_DIR, INDEX_FILE
+
+# PARAMETERS
+MODEL_FEATURES = ["vol30", "mom30", "beta60"]
+HORIZONS       = [30, 60, 90, 180]                        # forward-return targets, trading days
+LOOKAHEAD_DAYS = 90                                       # primary horizon → pred_return
+RISK_FILE      = "stock_risk_kmeans_robust.csv"           # index=ticker, risk_label2
+ARTIFACTS      = ("imputer.joblib", "scaler.joblib", "topreturn_model.joblib")
+RISK_LEVELS    = ["Low", "Medium", "High"]
+
+
+def target_name(h: int) -> str:
+    return f"future_return_{h}"
+
+
+def pred_column(h: int) -> str:
+    """Picks-file column holding the h-day prediction (the primary one keeps its old name)."""
+    return "pred_return" if h == LOOKAHEAD_DAYS else f"pred_return_{h}"
+
+
+TARGETS = [target_name(h) for h in HORIZONS]
+
+
+def horizon_predictions(model, X) -> pd.DataFrame:
+    """model.predict as one column per horizon (a single-output model is the primary horizon)."""
+    pred = model.predict(X)
+    horizons = HORIZONS if pred.ndim == 2 else [LOOKAHEAD_DAYS]
+    return pd.DataFrame(pred.reshape(len(pred), -1), columns=horizons)
+
+
+def remap_risk_labels(vol30: pd.Series, risk_label2: pd.Series) -> pd.Series:
+    """KMeans cluster labels → Low/Medium/High by each cluster's median vol30."""
+    medians = vol30.groupby(risk_label2).median().sort_values()
+    mapping = {orig: new for orig, new in zip(medians.index, RISK_LEVELS)}
+    return risk_label2.map(mapping)
+
+
+def artifacts_available(store_path: str = STORE_DIR) -> bool:
+    return all(os.path.exists(p) for p in ARTIFACTS) and \
+        os.path.exists(os.path.join(store_path, INDEX_FILE))
+
+
+class ReturnScorer:
+    """Batched pred_return / risk label lookups over the feature store."""
+
+    def __init__(self, store_path: str = STORE_DIR, risk_file: str = RISK_FILE):
+        self.imputer, self.scaler, self.model = (joblib.load(p) for p in ARTIFACTS)
+
+        latest = FeatureStore(store_path).latest(MODEL_FEATURES)
+        self.as_of = {t: d.strftime("%Y-%m-%d") for t, d in latest.index}
+        self.features = latest.droplevel("date")
+
+        if os.path.exists(risk_file):
+            labels = pd.read_csv(risk_file, index_col="ticker")["risk_label2"]
+            labels = labels.reindex(self.features.index)
+            self.risk = remap_risk_labels(self.features["vol30"], labels)
+        else:
+            self.risk = pd.Series(index=self.features.index, dtype=object)
+
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def predict(self, X: pd.DataFrame) -> pd.DataFrame:
+        """imputer → scaler → forest on a (n, MODEL_FEATURES) frame → one column per horizon."""
+        return horizon_predictions(self.model, self.scaler.transform(self.imputer.transform(X)))
+
+    def score(self, tickers):
+        """
+        → (results, missing).  results keep the request order; each entry has
+        ticker, pred_return (LOOKAHEAD_DAYS), per-horizon predictions, risk_label,
+        as_of and whether it came from the memo.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        known = [t for t in tickers if t in self.as_of]
+        missing = [t for t in tickers if t not in self.as_of]
+
+        with self._lock:
+            todo = [t for t in known if (t, self.as_of[t]) not in self._memo]
+        if todo:
+            preds = self.predict(self.features.loc[todo, MODEL_FEATURES])
+            with self._lock:
+                for t, p in zip(todo, preds.itertuples(index=False)):
+                    risk = self.risk.get(t)
+                    by_h = dict(zip(preds.columns, map(float, p)))
+                    self._memo[(t, self.as_of[t])] = {
+                        "ticker": t,
+                        "pred_return": by_h[LOOKAHEAD_DAYS],
+                        "horizons": {str(h): v for h, v in by_h.items()},
+                        "risk_label": risk if isinstance(risk, str) else None,
+                        "as_of": self.as_of[t],
+                    }
+
+        fresh = set(todo)
+        results = [dict(self._memo[(t, self.as_of[t])], cached=t not in fresh) for t in known]
+        return results, missing
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Score tickers with the exported return model")
+    parser.add_argument("tickers", nargs="*", help="Tickers (default: every ticker in the store)")
+    args = parser.parse_args()
+
+    scorer = ReturnScorer()
+    tickers = args.tickers or list(scorer.features.index)
+    for label in ("cold", "memoised"):
+        t0 = time.perf_counter()
+        results, missing = scorer.score(tickers)
+        print(f"{label}: {len(results)} tickers in {1000 * (time.perf_counter() - t0):.2f} ms")
+    print(pd.DataFrame(results).drop(columns="cached").to_string(index=False))
+    if missing:
+        print(f"⚠️  Not in feature store: {missing}")
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+sampling.py
+
+Training-set reduction for the return model.
+
+Consecutive days of one ticker produce samples whose forward-return targets
+overlap almost entirely (two neighbouring 90-day windows share 89 days), so
+the full training matrix is large and highly redundant.  Strategies:
+
+  * "all"             → every sample, unweighted (the original behaviour)
+  * "stride"          → every STRIDE-th trading day
+  * "non_overlapping" → every `horizon`-th trading day, so no two samples of a
+                        ticker share a day of their target window
+  * "uniqueness"      → every sample, weighted by its average uniqueness
+                        (mean over its target window of 1 / number of that
+                        ticker's windows covering the day); each tree
+                        bootstraps only the mean-uniqueness fraction of rows
+
+Strides are taken on the shared trading calendar, so every ticker is sampled
+on the same dates.
+
+    plan = sample_plan(tm.ticker_codes, tm.dates, "uniqueness", horizon=90)
+    model.set_params(max_samples=plan.max_samples)
+    model.fit(X[plan.mask], y[plan.mask], sample_weight=plan.weight)
+"""
+
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+# PARAMETERS
+STRATEGIES = ("all", "stride", "non_overlapping", "uniqueness")
+STRIDE     = 10                                     # trading days between "stride" samples
+
+
+class SamplePlan(NamedTuple):
+    """Rows to keep, their fit weights and the per-tree bootstrap fraction."""
+    mask:        np.ndarray             # bool (n,)
+    weight:      Optional[np.ndarray]   # float (mask.sum(),) or None
+    max_samples: Optional[float]        # RandomForest max_samples, None = all rows
+
+
+def day_index(dates: np.ndarray) -> np.ndarray:
+    """Position of every sample date on the calendar of distinct sample dates."""
+    return np.unique(dates, return_inverse=True)[1].reshape(-1)
+
+
+def stride_mask(dates: np.ndarray, stride: int) -> np.ndarray:
+    return day_index(dates) % stride == 0
+
+
+def uniqueness(ticker_codes: np.ndarray, dates: np.ndarray, horizon: int) -> np.ndarray:
+    """
+    Average uniqueness of each sample's [t, t + horizon) label window among
+    the windows of the same ticker, in (0, 1].  Vectorised over all tickers:
+    each ticker gets its own block of the calendar so concurrency counts
+    never leak across tickers.
+    """
+    day = day_index(dates)
+    span = int(day.max()) + 1 + horizon
+    key = ticker_codes.astype(np.int64) * span + day
+    size = (int(ticker_codes.max()) + 1) * span
+    # windows covering each day: +1 at the start, −1 after the last day
+    concurrent = np.cumsum(np.bincount(key, minlength=size)
+                           - np.bincount(key + horizon, minlength=size))
+    inv = np.divide(1.0, concurrent, out=np.zeros(size), where=concurrent > 0)
+    cum = np.concatenate([[0.0], np.cumsum(inv)])
+    return (cum[key + horizon] - cum[key]) / horizon
+
+
+def sample_plan(ticker_codes: np.ndarray, dates: np.ndarray, strategy: str,
+                horizon: int, stride: int = STRIDE) -> SamplePlan:
+    if strategy == "all":
+        return SamplePlan(np.ones(len(dates), dtype=bool), None, None)
+    if strategy == "stride":
+        return SamplePlan(stride_mask(dates, stride), None, None)
+    if strategy == "non_overlapping":
+        return SamplePlan(stride_mask(dates, horizon), None, None)
+    if strategy == "uniqueness":
+        u = uniqueness(ticker_codes, dates, horizon)
+        return SamplePlan(np.ones(len(dates), dtype=bool), u / u.mean(), float(u.mean()))
+    raise ValueError(f"sampling strategy must be one of {STRATEGIES}, got {strategy!r}")
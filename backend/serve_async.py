@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+serve_async.py
+
+Async serving mode for the Flask app (app.py) on aiohttp's event loop.
+
+`python app.py` runs the Werkzeug dev server; here one event loop accepts
+connections and reads request bodies, and every route of the same Flask app
+runs as a WSGI call on a sized thread pool (HTTP_WORKERS), so a slow request
+never blocks the accept loop and concurrent /api/predict calls reach the
+micro-batcher (batcher.py) together instead of one after another.
+
+Backpressure: at most MAX_INFLIGHT requests are admitted at once; beyond
+that the server answers 503 + Retry-After without touching the app.  The
+counters (in flight, waiting for a thread, rejected) are added to
+/api/metrics next to the predict queue depth.
+
+    python serve_async.py --port 5050 --workers 32
+"""
+
+import asyncio
+import io
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote
+
+from aiohttp import web
+
+# PARAMETERS
+HOST          = "127.0.0.1"
+PORT          = 5050
+HTTP_WORKERS  = 32             # threads running Flask handlers
+MAX_INFLIGHT  = 128            # admitted requests (running + waiting for a thread)
+MAX_BODY      = 16 * 2**20
+
+
+class AsyncServer:
+    """aiohttp handler that runs a WSGI app on a thread pool with admission control."""
+
+    def __init__(self, wsgi_app, host: str = HOST, port: int = PORT,
+                 workers: int = HTTP_WORKERS, max_inflight: int = MAX_INFLIGHT):
+        self.wsgi_app = wsgi_app
+        self.host, self.port = host, port
+        self.workers, self.max_inflight = workers, max_inflight
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="wsgi")
+        self._lock = threading.Lock()
+        self._in_flight = self._running = 0
+        self._stats = dict(served=0, rejected=0, errors=0, disconnects=0, max_in_flight=0)
+        self._started = time.time()
+
+    def stats(self) -> dict:
+        with self._lock:
+            running, in_flight = self._running, self._in_flight
+        return dict(self._stats, in_flight=in_flight, running=running,
+                    waiting=max(in_flight - running, 0), workers=self.workers,
+                    max_inflight=self.max_inflight,
+                    uptime_s=round(time.time() - self._started, 1))
+
+    # ─── WSGI bridge ──────────────────────────────────────────────────────────
+    def _environ(self, request: web.Request, body: bytes) -> dict:
+        path, _, query = request.raw_path.partition("?")
+        environ = {
+            "REQUEST_METHOD":    request.method,
+            "SCRIPT_NAME":       "",
+            "PATH_INFO":         unquote(path, encoding="latin-1"),
+            "QUERY_STRING":      query,
+            "SERVER_NAME":       self.host,
+            "SERVER_PORT":       str(self.port),
+            "SERVER_PROTOCOL":   "HTTP/%d.%d" % tuple(request.version),
+            "REMOTE_ADDR":       request.remote or "",
+            "CONTENT_TYPE":      request.headers.get("Content-Type", ""),
+            "CONTENT_LENGTH":    str(len(body)),
+            "wsgi.version":      (1, 0),
+            "wsgi.url_scheme":   request.scheme,
+            "wsgi.input":        io.BytesIO(body),
+            "wsgi.errors":       sys.stderr,
+            "wsgi.multithread":  True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once":     False,
+        }
+        for key, value in request.headers.items():
+            name = "HTTP_" + key.upper().replace("-", "_")
+            if name in ("HTTP_CONTENT_TYPE", "HTTP_CONTENT_LENGTH"):
+                continue
+            environ[name] = f"{environ[name]},{value}" if name in environ else value
+        return environ
+
+    def _call(self, environ):
+        """Worker thread: run the app → (status, headers, body iterable)."""
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started["status"], started["headers"] = status, headers
+            return lambda data: None          # legacy write() is not used by Flask
+
+        with self._lock:
+            self._running += 1
+        try:
+            body = self.wsgi_app(environ, start_response)
+        finally:
+            with self._lock:
+                self._running -= 1
+        return started["status"], started["headers"], body
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        with self._lock:
+            if self._in_flight >= self.max_inflight:
+                self._stats["rejected"] += 1
+                return web.json_response(
+                    {"error": "server busy", "reason": f"{self._in_flight} requests in flight"},
+                    status=503, headers={"Retry-After": "1"})
+            self._in_flight += 1
+            self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._in_flight)
+
+        loop = asyncio.get_running_loop()
+        body = resp = None
+        try:
+            environ = self._environ(request, await request.read())
+            status, headers, body = await loop.run_in_executor(self._pool, self._call, environ)
+            code, _, reason = status.partition(" ")
+            resp = web.StreamResponse(status=int(code), reason=reason or None)
+            for key, value in headers:
+                resp.headers.add(key, value)
+            await resp.prepare(request)
+            # streamed downloads are pulled chunk by chunk off the event loop
+            chunks = iter(body)
+            while True:
+                chunk = await loop.run_in_executor(self._pool, next, chunks, None)
+                if chunk is None:
+                    break
+                if chunk:
+                    await resp.write(chunk)
+            await resp.write_eof()
+            self._stats["served"] += 1
+            return resp
+        except ConnectionResetError:
+            if resp is None:
+                raise
+            self._stats["disconnects"] += 1          # client went away mid-response
+            return resp
+        except Exception:
+            self._stats["errors"] += 1
+            raise
+        finally:
+            if hasattr(body, "close"):
+                await loop.run_in_executor(self._pool, body.close)
+            with self._lock:
+                self._in_flight -= 1
+
+
+def make_app(wsgi_app, **kwargs) -> web.Application:
+    server = AsyncServer(wsgi_app, **kwargs)
+    if hasattr(wsgi_app, "extensions"):
+        wsgi_app.extensions["serve_async"] = server     # picked up by /api/metrics
+    aio = web.Application(client_max_size=MAX_BODY)
+    aio.router.add_route("*", "/{tail:.*}", server.handle)
+    return aio
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve app.py on an asyncio event loop")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=HTTP_WORKERS,
+                        help="Threads running Flask handlers")
+    parser.add_argument("--max-inflight", type=int, default=MAX_INFLIGHT,
+                        help="Requests admitted at once; more get 503 + Retry-After")
+    args = parser.parse_args()
+
+    from app import app                      # loads the models and picks
+
+    web.run_app(make_app(app, host=args.host, port=args.port, workers=args.workers,
+                         max_inflight=args.max_inflight),
+                host=args.host, port=args.port)
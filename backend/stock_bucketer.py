@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+stock_bucketer.py
+
+Low / Medium / High risk bucket for any ticker, without rerunning the KMeans
+classifier scripts (stock_risk_level_classifier.py / stock_classifier_kmeans.py).
+
+Both scripts save their fitted RobustScaler and KMeans in
+stock_classifier.joblib.  Here the centroids are read once, ordered by their
+unscaled vol30_log exactly as the scripts map clusters (lowest → Low), and a
+ticker is assigned to the nearest centroid in RobustScaler space, which is
+what KMeans.predict does.
+
+Features (vol30_log, mom30, beta60 via features.FeatureEngine) come from the
+close panel refresh_daemon.py keeps in price_cache.pkl: every cached ticker
+is featurised and bucketed in one vectorised pass when the bucketer is
+built, so a lookup is a dict hit.  Tickers outside the cache can be fetched
+from Stooq (price_ingest) on request and memoised until the next rebuild
+(the app builds a new bucketer on /api/reload).
+
+    bucketer = StockBucketer()
+    results, missing = bucketer.bucket(["AAPL", "NVDA"], fetch=True)
+"""
+
+import os
+import threading
+from datetime import date, timedelta
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from features import FeatureEngine
+
+# PARAMETERS
+CLASSIFIER_FILE = "stock_classifier.joblib"
+PRICE_CACHE     = "price_cache.pkl"             # refresh_daemon.py: close panel incl. SPY
+MARKET          = "SPY"
+FEAT_COLS       = ["vol30_log", "mom30", "beta60"]
+FETCH_DAYS      = 150                           # calendar days ≥ beta60's 61 trading rows
+RISK_LEVELS     = ["Low", "Medium", "High"]
+
+
+def available(classifier_file: str = CLASSIFIER_FILE) -> bool:
+    return os.path.exists(classifier_file)
+
+
+class StockBucketer:
+    """Nearest-centroid risk buckets from the saved RobustScaler + KMeans."""
+
+    def __init__(self, classifier_file: str = CLASSIFIER_FILE, price_cache: str = PRICE_CACHE):
+        pipe = joblib.load(classifier_file)
+        scaler, km = pipe.named_steps["robust_scaler"], pipe.named_steps["kmeans"]
+        # RobustScaler as plain arrays (centering / scaling may be switched off)
+        self.center = scaler.center_ if scaler.center_ is not None else np.zeros(len(FEAT_COLS))
+        self.scale = scaler.scale_ if scaler.scale_ is not None else np.ones(len(FEAT_COLS))
+        self.centroids = km.cluster_centers_                    # scaled space, (k, 3)
+        raw = self.centroids * self.scale + self.center
+        order = np.argsort(raw[:, FEAT_COLS.index("vol30_log")], kind="stable")
+        labels = np.empty(len(order), dtype=object)
+        labels[order] = RISK_LEVELS[:len(order)]
+        self.cluster_labels = labels                            # cluster id → Low/Medium/High
+
+        self.market = None
+        self._memo = {}
+        self._lock = threading.Lock()
+        if os.path.exists(price_cache):
+            panel = pd.read_pickle(price_cache)
+            self.market = panel[MARKET] if MARKET in panel else None
+            self._memo.update(self._featurise(panel.drop(columns=MARKET, errors="ignore")))
+
+    @property
+    def tickers(self) -> list:
+        """Tickers with a bucket so far (cached panel + fetched)."""
+        with self._lock:
+            return list(self._memo)
+
+    # ─── Classification ───────────────────────────────────────────────────────
+    def classify(self, X: np.ndarray):
+        """(n, FEAT_COLS) raw features → (bucket labels, distance to the chosen centroid)."""
+        Xs = (np.asarray(X, dtype=np.float64) - self.center) / self.scale
+        d2 = ((Xs[:, None, :] - self.centroids[None, :, :]) ** 2).sum(axis=2)
+        cluster = d2.argmin(axis=1)
+        return self.cluster_labels[cluster], np.sqrt(d2[np.arange(len(Xs)), cluster])
+
+    def _featurise(self, close: pd.DataFrame) -> dict:
+        """Latest complete feature row of every ticker in a close panel → memo entries."""
+        if self.market is None or close.empty:
+            return {}
+        engine = FeatureEngine(close, market=self.market)
+        latest = engine.frame(["vol30"] + FEAT_COLS).dropna()
+        latest = latest.groupby(level="ticker").tail(1)
+        if latest.empty:
+            return {}
+        labels, dist = self.classify(latest[FEAT_COLS].to_numpy())
+        out = {}
+        for (ticker, day), row, label, d in zip(latest.index, latest.itertuples(index=False),
+                                                 labels, dist):
+            out[ticker] = {
+                "ticker": ticker,
+                "risk_label": label,
+                "vol30": float(row.vol30),
+                "mom30": float(row.mom30),
+                "beta60": float(row.beta60),
+                "distance": float(d),
+                "as_of": day.strftime("%Y-%m-%d"),
+            }
+        return out
+
+    def _fetch(self, tickers):
+        from price_ingest import fetch_closes
+
+        start = date.today() - timedelta(days=FETCH_DAYS)
+        closes = fetch_closes(list(tickers) + ([MARKET] if self.market is None else []),
+                              start=start)
+        if self.market is None and MARKET in closes:
+            self.market = closes.pop(MARKET)
+        if not closes:
+            return {}
+        return self._featurise(pd.DataFrame(closes).sort_index())
+
+    # ─── Lookup ───────────────────────────────────────────────────────────────
+    def bucket(self, tickers, fetch: bool = False):
+        """
+        → (results, missing).  results keep the request order; `fetch` pulls
+        prices for tickers outside the cache (one concurrent Stooq batch).
+        """
+        tickers = list(dict.fromkeys(tickers))
+        with self._lock:
+            todo = [t for t in tickers if t not in self._memo]
+        fetched = set()
+        if fetch and todo:
+            new = self._fetch(todo)
+            fetched = set(new)
+            with self._lock:
+                self._memo.update(new)
+        results, missing = [], []
+        for t in tickers:
+            entry = self._memo.get(t)
+            if entry is None:
+                missing.append(t)
+            else:
+                results.append(dict(entry, fetched=t in fetched))
+        return results, missing
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Risk bucket for tickers by nearest KMeans centroid")
+    parser.add_argument("tickers", nargs="*", help="Tickers (default: every cached ticker)")
+    parser.add_argument("--fetch", action="store_true", help="Fetch prices for uncached tickers")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    bucketer = StockBucketer()
+    print(f"✅ {len(bucketer.tickers)} cached tickers bucketed in "
+          f"{1000 * (time.perf_counter() - t0):.1f} ms")
+    tickers = args.tickers or bucketer.tickers
+    t0 = time.perf_counter()
+    results, missing = bucketer.bucket(tickers, fetch=args.fetch)
+    print(f"{len(results)} lookups in {1000 * (time.perf_counter() - t0):.2f} ms")
+    print(pd.DataFrame(results).set_index("ticker").to_string() if results else "no results")
+    if missing:
+        print(f"⚠️  no features for: {', '.join(missing)}")
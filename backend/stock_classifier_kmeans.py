@@ -9,54 +9,39 @@ from sklearn.preprocessing import StandardScaler, RobustScaler
 from sklearn.pipeline import Pipeline
 from sklearn.impute import SimpleImputer
 
+from features import FeatureEngine
+from universe import close_panel, field_panel, load_panel, select_universe
+
+# "yfinance" (bulk yf.download) or "stooq" (concurrent async reads via price_ingest)
+INGEST = "yfinance"
+
+# Universe: top N by average daily volume, after optional liquidity floors (universe.py)
+TOP_N             = 100
+MIN_AVG_VOLUME    = None      # shares / day
+MIN_DOLLAR_VOLUME = None      # Close × Volume / day
+
 # 1) Get S&P 500 tickers from Wikipedia
 wiki_url = "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
 sp500    = pd.read_html(wiki_url, header=0)[0]
 symbols  = sp500["Symbol"].str.replace(r"\.", "-", regex=True).tolist()
 
-# 2) Top 100 by avg daily volume over last 60 days
-vol_data = yf.download(symbols, period="60d", group_by="ticker", auto_adjust=True)
-avg_vol = {
-    sym: vol_data[sym]["Volume"].mean()
-    for sym in symbols
-    if sym in vol_data.columns.levels[0]
-}
-top100 = sorted(avg_vol, key=avg_vol.get, reverse=True)[:100]
-print(f"Using top 100 by volume: {top100}\n")
-
-# 3) Download 1 year of daily price data for these 100 stocks
-prices = yf.download(
-    tickers=top100,
-    period="1y",
-    auto_adjust=True,
-    group_by="ticker",
-    threads=True
-)
+# 2) One year of daily bars for every symbol + SPY, downloaded once
+#    (reused from universe_panel.pkl for the rest of the day)
+panel = load_panel(symbols + ["SPY"], ingest=INGEST)
 
-# 4) Fetch SPY for beta calculation
-spy = (
-    yf.download("SPY", period="1y", auto_adjust=True)["Close"]
-    .pct_change()
-    .dropna()
-)
-spy.name = "SPY"
-
-# 5) Build price‐based features
-feat_list = []
-for sym in top100:
-    df = prices[sym]["Close"].pct_change().to_frame("ret").dropna()
-    df["vol30"] = df["ret"].rolling(30).std()
-    df["mom30"] = prices[sym]["Close"].pct_change(30)
-    comb       = pd.concat([df["ret"], spy], axis=1, join="inner").dropna()
-    cov        = comb["ret"].rolling(60).cov(comb["SPY"])
-    var        = comb["SPY"].rolling(60).var()
-    df["beta60"] = (cov / var).reindex(df.index)
-
-    last = df.dropna().iloc[-1].to_dict()
-    last["ticker"] = sym
-    feat_list.append(last)
-
-features_df = pd.DataFrame(feat_list).set_index("ticker")
+# 3) Top N by avg daily volume over the last 60 trading days (universe.VOLUME_DAYS rows
+#    of the same panel, one vectorised reduction)
+top100 = select_universe(panel, top_n=TOP_N, min_avg_volume=MIN_AVG_VOLUME,
+                         min_dollar_volume=MIN_DOLLAR_VOLUME)
+print(f"Using top {len(top100)} by volume: {top100}\n")
+
+# 4) SPY for beta calculation
+spy_close = field_panel(panel, "Close")["SPY"].dropna()
+
+# 5) Build price‐based features (latest complete row per ticker)
+close  = close_panel(panel, top100)
+engine = FeatureEngine(close, market=spy_close)
+features_df = engine.latest(["ret", "vol30", "mom30", "beta60"])
 print("Price-based features:\n", features_df.head().to_string(), "\n")
 
 # 6) Build fundamental features
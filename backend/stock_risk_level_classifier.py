@@ -15,6 +15,17 @@ from sklearn.metrics import (
     davies_bouldin_score
 )
 
+from features import FeatureEngine
+from universe import field_panel, load_panel, select_universe
+
+# "yfinance" (bulk yf.download) or "stooq" (concurrent async reads via price_ingest)
+INGEST = "yfinance"
+
+# Universe: top N by average daily volume, after optional liquidity floors (universe.py)
+TOP_N             = 100
+MIN_AVG_VOLUME    = None      # shares / day
+MIN_DOLLAR_VOLUME = None      # Close × Volume / day
+
 # ─── 1) Get S&P 500 tickers ────────────────────────────────────────────────────
 wiki_url = "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
 sp500    = pd.read_html(wiki_url, header=0)[0]
@@ -24,63 +35,29 @@ symbols  = (
     .tolist()
 )
 
-# ─── 2) Pick top 100 by avg daily volume over last 60 days ───────────────────
-vol_data = yf.download(
-    symbols, period="60d", group_by="ticker", auto_adjust=True
-)
-avg_vol = {
-    sym: vol_data[sym]["Volume"].mean()
-    for sym in symbols
-    if sym in vol_data.columns.get_level_values(0)
-}
-top100 = sorted(avg_vol, key=avg_vol.get, reverse=True)[:100]
-print(f"Using top 100 by volume: {top100}\n")
-
-# ─── 3) Download 1 year of daily price data for these 100 stocks ─────────────
-prices = yf.download(
-    tickers=top100,
-    period="1y",
-    auto_adjust=True,
-    group_by="ticker",
-    threads=True
-)
+# ─── 2) One year of daily bars for every symbol + SPY, downloaded once ───────
+#        (reused from universe_panel.pkl for the rest of the day)
+panel = load_panel(symbols + ["SPY"], ingest=INGEST)
+
+# ─── 3) Pick top N by avg daily volume over the last 60 trading days (same panel) ─
+top100 = select_universe(panel, top_n=TOP_N, min_avg_volume=MIN_AVG_VOLUME,
+                         min_dollar_volume=MIN_DOLLAR_VOLUME)
+print(f"Using top {len(top100)} by volume: {top100}\n")
 
-# ─── 4) Fetch SPY for beta calculation ───────────────────────────────────────
-df_spy = yf.download("SPY", period="1y", auto_adjust=True)
-spy    = df_spy["Close"].pct_change().dropna()
-spy.name = "SPY"
+# ─── 4) SPY for beta calculation ─────────────────────────────────────────────
+spy_close = field_panel(panel, "Close")["SPY"].dropna()
 
 # ─── 5) Build price‐based features (ret, mom30, vol30, beta60) ──────────────
-feat_list = []
+close = field_panel(panel, "Close")
 for sym in top100:
-    try:
-        series = prices[sym]["Close"]
-    except Exception:
+    if sym not in close.columns:
         print(f"⚠️  Missing price series for {sym}, skipping.")
-        continue
-
-    df = pd.DataFrame({
-        "ret":   series.pct_change(),
-        "mom30": series.pct_change(30),
-    })
-    df["vol30"]     = df["ret"].rolling(30).std()
-    df["vol30_log"] = np.log1p(df["vol30"])
-
-    comb = pd.concat([df["ret"], spy], axis=1, join="inner").dropna()
-    cov  = comb["ret"].rolling(60).cov(comb["SPY"])
-    var  = comb["SPY"].rolling(60).var()
-    df["beta60"] = cov.div(var).reindex(df.index)
-
-    df_clean = df.dropna()
-    if df_clean.empty:
-        print(f"⚠️  {sym} has insufficient history, skipping.")
-        continue
-
-    last = df_clean.iloc[-1].to_dict()
-    last["ticker"] = sym
-    feat_list.append(last)
+close = close.reindex(columns=[s for s in top100 if s in close.columns])
 
-features_df = pd.DataFrame(feat_list).set_index("ticker")
+engine = FeatureEngine(close, market=spy_close)
+features_df = engine.latest(["ret", "mom30", "vol30", "vol30_log", "beta60"])
+for sym in close.columns.difference(features_df.index):
+    print(f"⚠️  {sym} has insufficient history, skipping.")
 print("Price-based features:\n", features_df.head(), "\n")
 
 # ─── 6) Build fundamental features (PE, PB, dividend yield) ────────────────
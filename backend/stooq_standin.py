@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+stooq_standin.py
+
+Local HTTP stand-in for Stooq's daily CSV endpoint (/q/d/l/?s=<sym>.us&i=d).
+
+Serves `<data_dir>/<symbol>.csv` when present and otherwise a deterministic
+synthetic random walk seeded from the symbol name, honours the d1/d2 date
+range, answers "No data" for symbols listed in `missing`, and can add a fixed
+per-request latency to mimic real round-trips.
+
+    with StooqStandIn(latency=0.05) as server:
+        frames = price_ingest.fetch_daily(["AAPL", "SPY"], base_url=server.url)
+
+Run standalone with `python stooq_standin.py --port 8765`.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+HISTORY_DAYS = 1500    # business days of synthetic history per symbol
+LAST_DATE    = None    # defaults to today
+
+
+@lru_cache(maxsize=8)
+def _bday_index(end: pd.Timestamp, days: int) -> pd.DatetimeIndex:
+    # bdate_range is slow enough to dominate a request; every symbol shares it
+    return pd.bdate_range(end=end, periods=days, name="Date")
+
+
+def synthetic_bars(symbol: str, days: int = HISTORY_DAYS, last_date=LAST_DATE) -> pd.DataFrame:
+    """Deterministic GBM-style OHLCV bars for one symbol."""
+    seed = int(hashlib.md5(symbol.upper().encode()).hexdigest()[:8], 16)
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp(last_date or pd.Timestamp.today()).normalize()
+    idx = _bday_index(end, days)
+
+    vol = rng.uniform(0.008, 0.035)
+    drift = rng.normal(0.0003, 0.0004)
+    close = rng.uniform(20, 400) * np.exp(np.cumsum(rng.normal(drift, vol, days)))
+    spread = np.abs(rng.normal(0, vol, days))
+    return pd.DataFrame({
+        "Open":   close * (1 + rng.normal(0, vol / 2, days)),
+        "High":   close * (1 + spread),
+        "Low":    close * (1 - spread),
+        "Close":  close,
+        "Volume": rng.lognormal(14 + rng.uniform(0, 3), 0.3, days).astype(np.int64),
+    }, index=idx).round(4)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "StooqStandIn/1.0"
+    protocol_version = "HTTP/1.1"   # keep-alive, so the client's pool is exercised
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+    def do_GET(self):
+        srv = self.server
+        if srv.latency:
+            time.sleep(srv.latency)
+        url = urlparse(self.path)
+        q = {k: v[0] for k, v in parse_qs(url.query).items()}
+        sym = q.get("s", "").lower()
+        sym = sym[:-3] if sym.endswith(".us") else sym
+
+        if not url.path.rstrip("/").endswith("/q/d/l") or not sym or sym in srv.missing:
+            body = b"No data"
+        else:
+            dates, header, rows = srv.bars(sym)
+            lo = np.searchsorted(dates, np.datetime64(pd.Timestamp(q["d1"]))) if "d1" in q else 0
+            hi = (np.searchsorted(dates, np.datetime64(pd.Timestamp(q["d2"])), side="right")
+                  if "d2" in q else len(rows))
+            body = header + b"".join(rows[lo:hi]) if hi > lo else b"No data"
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, data_dir, latency, missing):
+        super().__init__(addr, _Handler)
+        self.data_dir = data_dir
+        self.latency = latency
+        self.missing = {m.lower() for m in missing}
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def bars(self, sym: str):
+        """(sorted dates, CSV header, pre-rendered CSV rows) for one symbol."""
+        with self._lock:
+            cached = self._cache.get(sym)
+        if cached is None:
+            path = os.path.join(self.data_dir, f"{sym}.csv") if self.data_dir else None
+            if path and os.path.exists(path):
+                with open(path, "rb") as f:
+                    lines = f.read().splitlines(keepends=True)
+                header, rows = lines[0], sorted(lines[1:])    # ISO dates sort lexically
+                dates = pd.to_datetime([r.split(b",", 1)[0].decode() for r in rows]).values
+            else:
+                df = synthetic_bars(sym)
+                header = b"Date,Open,High,Low,Close,Volume\n"
+                rows = [
+                    f"{d},{o:.4f},{h:.4f},{l:.4f},{c:.4f},{v}\n".encode()
+                    for d, o, h, l, c, v in zip(
+                        df.index.strftime("%Y-%m-%d"), df["Open"], df["High"],
+                        df["Low"], df["Close"], df["Volume"]
+                    )
+                ]
+                dates = df.index.values
+            cached = (dates, header, rows)
+            with self._lock:
+                self._cache[sym] = cached
+        return cached
+
+
+class StooqStandIn:
+    """Context manager running the stand-in on a background thread."""
+
+    def __init__(self, host="127.0.0.1", port=0, data_dir=None, latency=0.0, missing=()):
+        self._server = _Server((host, port), data_dir, latency, missing)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/q/d/l/"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve Stooq-format CSVs locally")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--data-dir", help="Directory of <symbol>.csv files to serve")
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    with StooqStandIn(port=args.port, data_dir=args.data_dir, latency=args.latency) as s:
+        print(f"Stooq stand-in listening on {s.url}  (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
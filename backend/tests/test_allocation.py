@@ -0,0 +1,52 @@
+"""allocation: long-only, fully invested, capped weights — finite even for degenerate Σ."""
+
+import numpy as np
+import pytest
+
+from allocation import METHODS, allocate, floor_variances, risk_parity
+
+MU = np.array([0.05, 0.10, 0.02])
+COV = np.array([[0.040, 0.006, 0.002],
+                [0.006, 0.090, 0.004],
+                [0.002, 0.004, 0.010]]) / 252
+
+
+def check_weights(w, n, cap=1.0):
+    assert w.shape == (n,)
+    assert np.isfinite(w).all()
+    assert w.sum() == pytest.approx(1.0)
+    assert (w >= -1e-12).all() and (w <= cap + 1e-9).all()
+
+
+@pytest.mark.parametrize("method", METHODS)
+@pytest.mark.parametrize("cap", [1.0, 0.5])
+def test_weights_are_a_capped_simplex_point(method, cap):
+    check_weights(allocate(method, MU, COV, max_weight=cap), len(MU), cap)
+
+
+def test_risk_parity_equalises_risk_contributions():
+    w = risk_parity(COV)
+    contrib = w * (COV @ w)
+    assert contrib == pytest.approx(np.full(len(w), contrib.mean()), rel=1e-6)
+
+
+@pytest.mark.parametrize("method", METHODS)
+@pytest.mark.parametrize("cov", [np.diag([0.0, 0.01]), np.zeros((2, 2))], ids=["one-zero", "all-zero"])
+@pytest.mark.parametrize("cap", [1.0, 0.6])
+def test_zero_variance_gives_finite_weights(method, cov, cap):
+    check_weights(allocate(method, [0.1, 0.1], cov, max_weight=cap), 2, cap)
+
+
+def test_risk_parity_zero_variance_edge_cases():
+    # a riskless name takes the whole budget up to the cap; all riskless → equal weights
+    assert allocate("risk_parity", [0.1, 0.1], np.diag([0.0, 0.01])) == pytest.approx([1.0, 0.0], abs=1e-6)
+    assert allocate("risk_parity", [0.1, 0.1], np.diag([0.0, 0.01]), max_weight=0.6) == pytest.approx([0.6, 0.4])
+    assert allocate("risk_parity", [0.1, 0.1], np.zeros((2, 2))) == pytest.approx([0.5, 0.5])
+
+
+def test_floor_variances_only_touches_the_diagonal():
+    cov = np.array([[0.0, 0.001], [0.001, 0.02]])
+    floored = floor_variances(cov)
+
+    assert floored[0, 0] > 0 and floored[1, 1] == 0.02 and floored[0, 1] == 0.001
+    assert cov[0, 0] == 0.0                          # input left unchanged
@@ -0,0 +1,45 @@
+"""cli.py stays import-light: --help within the budget, no heavy imports, choice lists in sync."""
+
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import cli
+
+BACKEND = os.path.dirname(os.path.abspath(cli.__file__))
+# `cli.py check-startup --budget` passes its budget down through the environment
+BUDGET_S = float(os.environ.get("CLI_HELP_BUDGET_S", cli.HELP_BUDGET_S))
+RUNS = 3                        # best of: the first run may still be compiling .pyc files
+
+
+@pytest.mark.parametrize("command", [[]] + [[name] for name in cli.COMMANDS],
+                         ids=lambda c: " ".join(c + ["--help"]))
+def test_help_within_budget(command):
+    times = []
+    for _ in range(RUNS):
+        t0 = time.perf_counter()
+        proc = subprocess.run([sys.executable, cli.__file__, *command, "--help"],
+                              capture_output=True, cwd=BACKEND)
+        times.append(time.perf_counter() - t0)
+        assert proc.returncode == 0, proc.stderr.decode()
+    assert min(times) < BUDGET_S, f"cli.py {' '.join(command)} --help took {min(times):.3f}s"
+
+
+def test_parser_imports_no_heavy_modules():
+    probe = ("import sys, cli; cli.build_parser(); "
+             f"print(','.join(m for m in {cli.HEAVY_MODULES!r} if m in sys.modules))")
+    proc = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True,
+                          cwd=BACKEND)
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip() == ""
+
+
+def test_choice_lists_match_their_modules():
+    import engines
+    import sampling
+
+    assert tuple(cli.ENGINES) == tuple(engines.ENGINES)
+    assert tuple(cli.STRATEGIES) == tuple(sampling.STRATEGIES)
@@ -0,0 +1,42 @@
+"""FeatureStore rebuilds swap a new tensor in; readers of the old one are never rewritten."""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from feature_store import FeatureStore
+
+DATES = pd.bdate_range("2024-01-01", periods=50)
+
+
+def panels(n_dates: int, tickers=("X", "Y"), value=None) -> dict:
+    data = (np.arange(n_dates * len(tickers), dtype=float).reshape(n_dates, len(tickers))
+            if value is None else np.full((n_dates, len(tickers)), value))
+    return {"a": pd.DataFrame(data, index=DATES[:n_dates], columns=list(tickers))}
+
+
+def test_rebuild_leaves_open_readers_intact(tmp_path):
+    path = str(tmp_path / "fs")
+    FeatureStore.from_panels(path, panels(50))
+    reader = FeatureStore(path)                     # e.g. a training run sharing the store
+    before = reader.values.copy()
+
+    rebuilt = FeatureStore.from_panels(path, panels(30, ("X",), value=1.0))   # smaller shape
+
+    assert np.array_equal(reader.values, before)
+    assert rebuilt.values.shape == (1, 30, 1) and (rebuilt.values == 1.0).all()
+    assert FeatureStore(path).values.shape == (1, 30, 1)
+    assert sorted(os.listdir(tmp_path)) == ["fs"]   # no .next / .old left behind
+
+
+def test_extend_appends_nan_dates(tmp_path):
+    store = FeatureStore.from_panels(str(tmp_path / "fs"), panels(30))
+    old = store.values.copy()
+
+    extended = store.extend(DATES[25:40])
+
+    assert extended.values.shape == (2, 40, 1)
+    assert np.array_equal(extended.values[:, :30], old)
+    assert np.isnan(extended.values[:, 30:]).all()
+    assert np.array_equal(store.values, old)
@@ -0,0 +1,69 @@
+"""update_incremental on a synthetic TrainingMatrix: every horizon's forest is maintained."""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import top_n_stocks_final as tn
+from engines import per_output
+
+N_DAYS, N_TICKERS = 420, 4
+DAYS = pd.bdate_range("2020-01-01", periods=N_DAYS).values.astype("datetime64[ns]").view(np.int64)
+
+
+def training_matrix(today: int) -> tn.TrainingMatrix:
+    """Samples as of trading day `today`: the h-day target of day t is known once t + h ≤ today."""
+    rng = np.random.default_rng(0)
+    t = np.repeat(np.arange(today - min(tn.HORIZONS) + 1), N_TICKERS)
+    X = rng.normal(size=(len(t), len(tn.MODEL_FEATURES))).astype(np.float32)
+    y = (X[:, :1] * 0.1 + rng.normal(scale=0.05, size=(len(t), len(tn.HORIZONS)))).astype(np.float32)
+    y[t[:, None] + np.asarray(tn.HORIZONS)[None, :] > today] = np.nan
+    return tn.TrainingMatrix(X, y, np.tile(np.arange(N_TICKERS, dtype=np.int32), len(t) // N_TICKERS),
+                             np.zeros(len(t), dtype=np.int8), DAYS[t],
+                             [f"T{i}" for i in range(N_TICKERS)], ["Low"])
+
+
+@pytest.fixture
+def fitted(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(tn, "N_TREES", 8)
+    monkeypatch.setattr(tn, "NEW_TREES", 3)
+    tm = training_matrix(N_DAYS - 10)
+    X, imp, scaler = tn.preprocess_features(pd.DataFrame(tm.X, columns=tn.MODEL_FEATURES))
+    model = tn._new_model(engine="forest").fit(X, tm.y)
+    state = {"baseline_mse": 1.0, "baseline_by_horizon": [1.0] * len(tn.HORIZONS), "errors": [],
+             "last_label": int(tm.dates.max()), "last_label_by_horizon": tn._last_labels(tm),
+             "updates": 0}
+    return tm, imp, scaler, model, state
+
+
+def trees(model):
+    return [list(forest.estimators_) for forest in per_output(model)]
+
+
+def test_every_horizon_forest_is_updated(fitted):
+    tm, imp, scaler, model, state = fitted
+    before = trees(model)                  # holds the old trees, so ids are not reused
+
+    tm_next = training_matrix(N_DAYS - 5)
+    updated = tn.update_incremental(tm_next, imp, scaler, model, state)
+
+    assert updated is model
+    for h, old, new in zip(tn.HORIZONS, before, trees(updated)):
+        assert len(new) == tn.N_TREES, h
+        assert not {id(t) for t in new[-tn.NEW_TREES:]} & {id(t) for t in old}, \
+            f"{h}d forest not updated"
+    saved = json.load(open(tn.ONLINE_STATE))
+    assert saved["last_label_by_horizon"] == tn._last_labels(tm_next)
+    assert all(b > a for a, b in zip(tn._last_labels(tm), saved["last_label_by_horizon"]))
+
+
+def test_no_new_labels_leaves_model_unchanged(fitted):
+    tm, imp, scaler, model, state = fitted
+    before = trees(model)
+
+    assert tn.update_incremental(tm, imp, scaler, model, state) is model
+    assert all(a == b for a, b in zip(trees(model), before))
+    assert state["updates"] == 0
@@ -0,0 +1,96 @@
+"""nfcs_schema: the checks every /api/predict, /api/users and /api/explain/profile call goes through."""
+
+import numpy as np
+import pandas as pd
+
+from nfcs_data import FEATURE_COLS
+from nfcs_schema import FIELD_CODES, SCHEMA, validate_records
+
+# the frontend's own names for two fields (create / edit-form profileData)
+FRONTEND_KEYS = {
+    "Spending vs Income Past Year": "spending_vs_income",
+    "Difficulty covering expenses": "difficulty_covering_expenses",
+}
+
+
+def profile(**overrides) -> dict:
+    """A valid form submission: the first allowed code of every field, as strings."""
+    form = {col: str(FIELD_CODES[col][0]) for col in FEATURE_COLS}
+    form.update(overrides)
+    return form
+
+
+def edit_form_profile() -> dict:
+    """profileData as the edit form keeps it in localStorage."""
+    form = profile()
+    for col, key in FRONTEND_KEYS.items():
+        form[key] = form.pop(col)
+    form["risk_tolerance"] = "5"
+    return form
+
+
+def test_valid_profile_passes():
+    v = validate_records([profile(), profile(**{"Marital Status": "99", "Self-efficacy": "98"})])
+
+    assert v.ok().tolist() == [True, True]
+    assert v.errors(0) == {}
+
+
+def test_coerce_returns_float_codes():
+    X, unparsable = SCHEMA.coerce([profile(**{"Age Group": " 3 "})])
+
+    assert X.dtype == np.float64 and X.shape == (1, len(FEATURE_COLS))
+    assert X[0, FEATURE_COLS.index("Age Group")] == 3.0
+    assert not unparsable.any()
+
+
+def test_missing_fields():
+    form = profile(**{"Ethnicity": ""})
+    del form["Homeownership"]
+    v = validate_records([form])
+
+    assert not v.ok()[0]
+    assert v.ok(allow_missing=True)[0]
+    assert v.errors(0) == {"Ethnicity": "missing", "Homeownership": "missing"}
+
+
+def test_codes_outside_the_codebook_are_invalid():
+    v = validate_records([profile(**{"Age Group": "7", "Ethnicity": "98", "Self-efficacy": "0"})])
+
+    assert not v.ok(allow_missing=True)[0]
+    assert v.errors(0) == {"Age Group": "invalid", "Ethnicity": "invalid", "Self-efficacy": "invalid"}
+
+
+def test_non_integer_and_unparsable_values_are_invalid():
+    v = validate_records([profile(**{"Age Group": "2.5", "Education Level": "abc",
+                                     "Homeownership": "nan?"})])
+
+    assert v.errors(0) == {"Age Group": "invalid", "Education Level": "invalid",
+                           "Homeownership": "invalid"}
+
+
+def test_bitmasks_are_per_row():
+    v = validate_records([profile(), profile(**{"Ethnicity": "x"}), profile(**{"Ethnicity": ""})])
+
+    bit = np.uint32(1) << FEATURE_COLS.index("Ethnicity")
+    assert v.invalid.tolist() == [0, bit, 0]
+    assert v.missing.tolist() == [0, 0, bit]
+    assert v.counts().loc["Ethnicity"].tolist() == [1, 1]
+
+
+def test_edit_form_keys_must_be_mapped():
+    form = edit_form_profile()
+    assert validate_records([form]).errors(0) == {col: "missing" for col in FRONTEND_KEYS}
+
+    # what edit-form/page.tsx sends: the Flask names added next to the frontend ones
+    form.update({col: form[key] for col, key in FRONTEND_KEYS.items()})
+    assert validate_records([form]).ok()[0]
+
+
+def test_validate_frame_matches_records():
+    forms = [profile(), profile(**{"Age Group": "9"}), profile(**{"Homeownership": ""})]
+    X, _ = SCHEMA.coerce(forms)
+    v = SCHEMA.validate_frame(pd.DataFrame(X, columns=FEATURE_COLS))
+
+    assert v.ok(allow_missing=True).tolist() == [True, False, True]
+    assert v.ok().tolist() == [True, False, False]
@@ -0,0 +1,73 @@
+"""price_ingest against the local Stooq stand-in (no network)."""
+
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("aiohttp")
+
+import price_ingest
+from stooq_standin import StooqStandIn
+
+
+@pytest.fixture(scope="module")
+def stooq():
+    with StooqStandIn(missing=["NODATA"]) as server:
+        yield server.url
+
+
+def test_fetch_daily_returns_ohlcv_per_symbol(stooq):
+    frames = price_ingest.fetch_daily(["AAPL", "SPY", "NODATA"], base_url=stooq)
+
+    assert list(frames) == ["AAPL", "SPY", "NODATA"]
+    for sym in ("AAPL", "SPY"):
+        df = frames[sym]
+        assert list(df.columns) == ["Open", "High", "Low", "Close", "Volume"]
+        assert isinstance(df.index, pd.DatetimeIndex) and df.index.is_monotonic_increasing
+        assert len(df) > 1000
+    assert frames["NODATA"].empty
+
+
+def test_fetch_daily_honours_start_and_end(stooq):
+    start, end = date.today() - timedelta(days=120), date.today() - timedelta(days=30)
+    df = price_ingest.fetch_daily(["MSFT"], start=start, end=end, base_url=stooq)["MSFT"]
+
+    assert not df.empty
+    assert df.index[0] >= pd.Timestamp(start) and df.index[-1] <= pd.Timestamp(end)
+
+
+def test_fetch_closes_skips_symbols_without_data(stooq):
+    closes = price_ingest.fetch_closes(["AAPL", "NODATA"], base_url=stooq)
+
+    assert list(closes) == ["AAPL"]
+    assert closes["AAPL"].name == "Close"
+
+
+def test_download_panel_matches_yfinance_layout(stooq):
+    panel = price_ingest.download_panel(["AAPL", "NVDA", "NODATA"], days=60, base_url=stooq)
+
+    assert panel.columns.names == ["Ticker", "Price"]
+    assert set(panel.columns.get_level_values("Ticker")) == {"AAPL", "NVDA"}
+    assert set(panel["AAPL"].columns) == {"Open", "High", "Low", "Close", "Volume"}
+    assert panel.index[0] >= pd.Timestamp(date.today() - timedelta(days=60))
+    assert panel.index.is_monotonic_increasing
+
+
+def test_download_panel_without_data_is_empty(stooq):
+    panel = price_ingest.download_panel(["NODATA"], base_url=stooq)
+
+    assert panel.empty
+    assert panel.columns.names == ["Ticker", "Price"]
+
+
+def test_fetch_universe_keeps_the_datareader_window(stooq, monkeypatch):
+    tn = pytest.importorskip("top_n_stocks_final")
+    monkeypatch.setattr(tn, "ASYNC_INGEST", True)
+    monkeypatch.setattr(tn, "fetch_closes", lambda symbols, **kwargs:
+                        price_ingest.fetch_closes(symbols, base_url=stooq, **kwargs))
+    spy, closes = tn.fetch_universe(["AAPL"])
+
+    first = pd.Timestamp(date.today() - timedelta(days=365 * tn.HISTORY_YEARS))
+    assert spy.index[0] >= first and closes["AAPL"].index[0] >= first
+    assert len(spy) > 1000                       # ~5 years of trading days, not fewer
@@ -5,13 +5,16 @@ full_pipeline.py
 
 2) Retrieve End of Day(Stooq) price data for the listed tickers along with SPY.
 
-3) Create sliding-window samples for volume 30, momentum, 30 day beta, and future return.
+3) Create sliding-window samples for volume 30, momentum, 30 day beta, and future returns
+   over every horizon in HORIZONS (one multi-output model is trained on all of them).
 
 4) Median impute and scale to standard metrics.
 
 5) Split in train/test + 5-fold CV and report MSE, then retrain on full data.
+   ENGINE picks the model: Random Forest, or histogram gradient boosting
+   (engines.py); --compare-engines reports both on one out-of-sample split.
 
-6) Export the imputer, scaler and Random Forest model as joblib.
+6) Export the imputer, scaler and model as joblib.
 
 7) Predict on each ticker’s most recent features ensuring TOP_N selections by bucket with ordinal rank (positives first).
 
@@ -19,23 +22,60 @@ full_pipeline.py
 
 
 """
+import json
+import os
 import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from typing import List, NamedTuple
+
 import pandas as pd
 import numpy as np
 from pandas_datareader import data as pdr
 from sklearn.impute import SimpleImputer
 from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.base import clone
+from sklearn.model_selection import KFold, train_test_split
 import joblib
 
+from features import FeatureEngine
+from feature_store import FeatureStore
+from return_scorer import (
+    ARTIFACTS, HORIZONS, LOOKAHEAD_DAYS, MODEL_FEATURES, TARGETS,
+    horizon_predictions, pred_column, remap_risk_labels, target_name,
+)
+from price_ingest import fetch_closes
+from sampling import STRATEGIES, sample_plan
+from engines import ENGINES, engine_of, make_regressor, model_mb, per_output, rows_per_second
+
 # PARAMETERS
 INPUT_FILE     = "stock_risk_kmeans_robust.csv"   # columns: index=ticker, risk_label2
-LOOKAHEAD_DAYS = 90
 MIN_HIST_DAYS  = 60
 TOP_N          = 5
 SLEEP_SEC      = 1
+ASYNC_INGEST   = True                              # concurrent Stooq reads (price_ingest)
+HISTORY_YEARS  = 5                                 # Stooq history; pandas_datareader's default start
 OUTPUT_FILE    = "top_n_per_category.csv"
+FEATURE_STORE  = "feature_store"                 # mmap (ticker × date × feature), see feature_store.py
+N_TREES        = 100
+
+# Model engine (engines.py): forest | hist_gb; None = the saved model's engine
+# (recorded in ONLINE_STATE), forest for a first fit
+ENGINE         = None
+HGB_PARAMS     = dict(max_iter=200, learning_rate=0.05, max_leaf_nodes=31,
+                      min_samples_leaf=50, early_stopping=False)
+
+# Training-set reduction for overlapping target windows (sampling.py)
+SAMPLING       = "all"                             # all | stride | non_overlapping | uniqueness
+SAMPLE_HORIZON = LOOKAHEAD_DAYS                    # window length that defines overlap
+TEST_FRACTION  = 0.2                               # held-out tail of the calendar (compare_sampling)
+
+# Incremental maintenance (maintain_model)
+NEW_TREES      = 10                                # trees grown per update, oldest retired
+RECENT_DAYS    = 60                                # trading days of samples new trees see
+DRIFT_WINDOW   = 5                                 # updates in the rolling validation error
+DRIFT_RATIO    = 1.5                               # rolling MSE / baseline > ratio → full refit
+ONLINE_STATE   = "topreturn_online.json"
 RANDOM_STATE   = 42
 
 
@@ -49,54 +89,132 @@ def fetch_close(symbol: str) -> pd.Series:
         return pd.Series(dtype=float)
 
 
-def build_feature_df(df0: pd.DataFrame) -> pd.DataFrame:
-    """Generate sliding-window features and target returns."""
-    tickers = df0.index.tolist()
-    spy = fetch_close("SPY").pct_change().dropna().rename("SPY")
+def fetch_universe(tickers):
+    """SPY Close plus {ticker: Close} for the universe."""
+    if ASYNC_INGEST:
+        # same window as DataReader(symbol, "stooq"), which starts 5 years back by default
+        start = date.today() - timedelta(days=365 * HISTORY_YEARS)
+        closes = fetch_closes(tickers + ["SPY"], start=start)
+        return closes.get("SPY", pd.Series(dtype=float)), closes
+
+    spy = fetch_close("SPY")
     time.sleep(SLEEP_SEC)
+    closes = {}
+    for sym in tickers:
+        closes[sym] = fetch_close(sym)
+        time.sleep(SLEEP_SEC)
+    return spy, closes
+
+
+def load_price_panel(df0: pd.DataFrame):
+    """(Close panel dates × tickers with enough history, SPY Close)."""
+    tickers = df0.index.tolist()
+    spy, closes = fetch_universe(tickers)
 
     price_hist = {}
     for sym in tickers:
-        series = fetch_close(sym).sort_index()
-        if len(series) > MIN_HIST_DAYS + LOOKAHEAD_DAYS:
+        series = closes.get(sym, pd.Series(dtype=float)).sort_index()
+        if len(series) > MIN_HIST_DAYS + max(HORIZONS):
             price_hist[sym] = series
         else:
             print(f"{sym}: insufficient history, skipping")
-        time.sleep(SLEEP_SEC)
+    return pd.DataFrame(price_hist).sort_index(), spy
 
-    rows = []
-    for sym, price in price_hist.items():
-        ret = price.pct_change().dropna()
-        n = len(price)
-        start = max(30, MIN_HIST_DAYS)
-        end = n - LOOKAHEAD_DAYS
-        for i in range(start, end):
-            vol30 = ret.iloc[i-29:i+1].std()
-            mom30 = price.iloc[i] / price.iloc[i-30] - 1
-            if i >= MIN_HIST_DAYS:
-                spy_a = spy.reindex(ret.index)
-                w_ret = ret.iloc[i-59:i+1].values
-                w_spy = spy_a.iloc[i-59:i+1].values
-                cov = np.cov(w_ret, w_spy, ddof=0)[0,1]
-                var = np.var(w_spy, ddof=0)
-                beta60 = cov/var if var > 0 else np.nan
-            else:
-                beta60 = np.nan
-            future_price = price.iloc[i + LOOKAHEAD_DAYS]
-            future_ret   = future_price / price.iloc[i] - 1
-            rows.append({
-                "ticker":        sym,
-                "date":          price.index[i],
-                "vol30":         vol30,
-                "mom30":         mom30,
-                "beta60":        beta60,
-                "future_return": future_ret,
-                "risk_label2":   df0.loc[sym, "risk_label2"]
-            })
-    feat_df = pd.DataFrame(rows).set_index(["ticker", "date"])
-    if feat_df.empty:
+
+def feature_panels(close: pd.DataFrame, spy: pd.Series) -> dict:
+    """Model features + one forward-return target per horizon as (dates × tickers) panels."""
+    engine = FeatureEngine(close, market=spy)
+    for h in HORIZONS:
+        engine.add(target_name(h), close.shift(-h) / close - 1)
+    return engine.compute(MODEL_FEATURES + TARGETS)
+
+
+def build_feature_df(df0: pd.DataFrame) -> FeatureStore:
+    """Generate sliding-window features and target returns into the feature store."""
+    close, spy = load_price_panel(df0)
+    return FeatureStore.from_panels(FEATURE_STORE, feature_panels(close, spy))
+
+
+class TrainingMatrix(NamedTuple):
+    """Contiguous training arrays; ticker/risk columns are categorical codes."""
+    X:            np.ndarray     # float32 (n, n_features)
+    y:            np.ndarray     # float32 (n, len(HORIZONS))
+    ticker_codes: np.ndarray     # int32   → tickers
+    risk_codes:   np.ndarray     # int8    → risk_labels
+    dates:        np.ndarray     # int64   ns since epoch
+    tickers:      List[str]
+    risk_labels:  List[str]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.X, self.y, self.ticker_codes, self.risk_codes, self.dates))
+
+    def subset(self, mask: np.ndarray) -> "TrainingMatrix":
+        return self._replace(X=self.X[mask], y=self.y[mask], ticker_codes=self.ticker_codes[mask],
+                             risk_codes=self.risk_codes[mask], dates=self.dates[mask])
+
+
+def _rss_mb():
+    """Max RSS in MB, or None where `resource` is missing (Windows); tracemalloc is portable."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def build_training_matrix(store: FeatureStore, df0: pd.DataFrame) -> TrainingMatrix:
+    """
+    Copy every sample with all features and at least one horizon target from
+    the store into preallocated arrays, ticker by ticker, without intermediate
+    row objects.  Targets not known yet stay NaN in y: each horizon is fitted
+    on its own finite rows (engines.MaskedMultiOutputRegressor), so the newest
+    dates still train the short horizons.
+    """
+    rss0 = _rss_mb()
+    tracemalloc.start()
+    fidx = store.feature_idx(MODEL_FEATURES)
+    tidx = store.feature_idx(TARGETS)
+    valid = np.stack([                                          # (tickers, dates) bool
+        np.isfinite(store.values[t][:, fidx]).all(axis=1)
+        & np.isfinite(store.values[t][:, tidx]).any(axis=1)
+        for t in range(len(store.tickers))
+    ])
+    counts = valid.sum(axis=1)
+    n, f = int(counts.sum()), len(MODEL_FEATURES)
+    if n == 0:
         raise RuntimeError("No valid data to build features/targets!")
-    return feat_df
+
+    risk = pd.Categorical(df0["risk_label2"].reindex(store.tickers))
+    X = np.empty((n, f), dtype=np.float32)
+    y = np.empty((n, len(TARGETS)), dtype=np.float32)
+    ticker_codes = np.empty(n, dtype=np.int32)
+    risk_codes = np.empty(n, dtype=np.int8)
+    dates = np.empty(n, dtype=np.int64)
+    day_ns = store.dates.astype("datetime64[ns]").view(np.int64)
+
+    pos = 0
+    for t in np.flatnonzero(counts):
+        rows, hist = valid[t], store.values[t]                  # hist: (dates, features) mmap view
+        end = pos + counts[t]
+        np.compress(rows, hist[:, fidx], axis=0, out=X[pos:end])
+        np.compress(rows, hist[:, tidx], axis=0, out=y[pos:end])
+        np.compress(rows, day_ns, out=dates[pos:end])
+        ticker_codes[pos:end] = t
+        risk_codes[pos:end] = risk.codes[t]
+        pos = end
+
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    tm = TrainingMatrix(X, y, ticker_codes, risk_codes, dates,
+                        list(store.tickers), [str(c) for c in risk.categories])
+    labelled = ", ".join(f"{h}d {c}" for h, c in zip(HORIZONS, np.isfinite(y).sum(axis=0)))
+    rss = "" if rss0 is None else f"; max RSS {rss0:.0f} → {_rss_mb():.0f} MB"
+    print(f"Training matrix: {n} samples × {f} features × {len(TARGETS)} horizons "
+          f"(labelled: {labelled}), {tm.nbytes / 1e6:.1f} MB "
+          f"(peak Python allocations {peak / 1e6:.1f} MB{rss})")
+    return tm
 
 
 def preprocess_features(X: pd.DataFrame):
@@ -108,22 +226,79 @@ def preprocess_features(X: pd.DataFrame):
     return X_scaled, imputer, scaler
 
 
-def train_and_evaluate(X: np.ndarray, y: pd.Series) -> RandomForestRegressor:
-    """Train/test split, CV MSE report, then retrain on full data."""
-    X_tr, X_ts, y_tr, y_ts = train_test_split(
-        X, y, test_size=0.2, random_state=RANDOM_STATE
-    )
-    model = RandomForestRegressor(n_estimators=100, random_state=RANDOM_STATE)
-    cv_scores = cross_val_score(
-        model, X_tr, y_tr, cv=5, scoring="neg_mean_squared_error"
+def _fit_target(y: np.ndarray) -> np.ndarray:
+    """(n, 1) → (n,) so a single horizon trains a plain single-output forest."""
+    return y[:, 0] if y.ndim == 2 and y.shape[1] == 1 else y
+
+
+def horizon_mse(pred: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Per-horizon MSE over the rows where that horizon's target is known."""
+    err = (np.asarray(pred, dtype=np.float64).reshape(len(y), -1)
+           - np.asarray(y, dtype=np.float64).reshape(len(y), -1)) ** 2
+    known = np.isfinite(err)
+    return np.where(known, err, 0.0).sum(axis=0) / np.maximum(known.sum(axis=0), 1)
+
+
+def current_engine() -> str:
+    """ENGINE when set, else the engine of the saved model, else "forest"."""
+    if ENGINE:
+        return ENGINE
+    if os.path.exists(ONLINE_STATE):
+        with open(ONLINE_STATE) as f:
+            engine = json.load(f).get("engine")
+        if engine:
+            return engine
+    if os.path.exists(ARTIFACTS[2]):                    # state written before "engine" was
+        return engine_of(joblib.load(ARTIFACTS[2]))
+    return "forest"
+
+
+def _new_model(max_samples=None, engine: str = None):
+    """
+    Unfitted regressor covering every horizon (engine defaults to current_engine()).
+    max_samples (the sampling plan's per-tree bootstrap fraction) only applies to
+    the forest; boosting fits every row and relies on the plan's sample weights.
+    """
+    engine = engine or current_engine()
+    if engine == "forest":
+        return make_regressor(engine, n_outputs=len(HORIZONS), n_estimators=N_TREES,
+                              max_samples=max_samples,
+                              random_state=RANDOM_STATE)
+    return make_regressor(engine, n_outputs=len(HORIZONS), random_state=RANDOM_STATE,
+                          **HGB_PARAMS)
+
+
+def train_and_evaluate(X: np.ndarray, y: np.ndarray, sample_weight=None, max_samples=None,
+                       engine: str = None):
+    """
+    Train/test split, CV MSE report, then retrain on full data → (model, test MSE
+    per horizon).
+    With several horizons y is (n, H), NaN where a target is not known yet, and
+    each horizon's model sees its own labelled rows; MSEs are averaged over
+    horizons.  sample_weight / max_samples come from the
+    sampling plan (see sampling.py).
+    """
+    y = _fit_target(y)
+    w = np.ones(len(y)) if sample_weight is None else sample_weight
+    X_tr, X_ts, y_tr, y_ts, w_tr, _ = train_test_split(
+        X, y, w, test_size=0.2, random_state=RANDOM_STATE
     )
-    print(f"CV MSE: {-cv_scores.mean():.4f} ± {cv_scores.std():.4f}")
-    model.fit(X_tr, y_tr)
-    test_mse = np.mean((model.predict(X_ts) - y_ts)**2)
+    model = _new_model(max_samples, engine)
+    cv_mse = []
+    for tr, va in KFold(n_splits=5).split(X_tr):
+        fold = clone(model).fit(X_tr[tr], y_tr[tr], sample_weight=w_tr[tr])
+        cv_mse.append(horizon_mse(fold.predict(X_tr[va]), y_tr[va]).mean())
+    print(f"CV MSE: {np.mean(cv_mse):.4f} ± {np.std(cv_mse):.4f}")
+    model.fit(X_tr, y_tr, sample_weight=w_tr)
+    per_horizon = horizon_mse(model.predict(X_ts), y_ts)
+    test_mse = per_horizon.mean()
     print(f"Test MSE: {test_mse:.4f}")
-    final_model = RandomForestRegressor(n_estimators=100, random_state=RANDOM_STATE)
-    final_model.fit(X, y)
-    return final_model
+    if len(per_horizon) > 1:
+        print("  by horizon: " + ", ".join(
+            f"{h}d {m:.4f}" for h, m in zip(HORIZONS, per_horizon)))
+    final_model = _new_model(max_samples, engine)
+    final_model.fit(X, y, sample_weight=w)
+    return final_model, per_horizon
 
 
 def save_artifacts(imputer, scaler, model):
@@ -134,18 +309,286 @@ def save_artifacts(imputer, scaler, model):
     print("Saved artifacts: imputer.joblib, scaler.joblib, topreturn_model.joblib")
 
 
-def select_top_n(feat_df: pd.DataFrame, model, imputer, scaler, top_n: int = TOP_N) -> pd.DataFrame:
+def _save_online_state(state: dict):
+    tmp = ONLINE_STATE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, ONLINE_STATE)
+
+
+def drift_baseline(tm: TrainingMatrix, sampling: str, engine: str):
+    """
+    Per-horizon MSE on the embargoed out-of-sample tail (_embargoed_split) of a
+    model fitted the way fit_full fits → drift baseline.  A random split puts
+    rows of the same days on both sides, so its MSE is too optimistic to
+    compare later, genuinely unseen labels against.
+    """
+    train, test, test_from = _embargoed_split(tm)
+    plan = sample_plan(train.ticker_codes, train.dates, sampling, SAMPLE_HORIZON)
+    sub = train.subset(plan.mask)
+    X_scaled, imp, scaler = preprocess_features(pd.DataFrame(sub.X, columns=MODEL_FEATURES))
+    model = _new_model(plan.max_samples, engine).fit(X_scaled, _fit_target(sub.y),
+                                                     sample_weight=plan.weight)
+    X_test = scaler.transform(imp.transform(pd.DataFrame(test.X, columns=MODEL_FEATURES)))
+    per_horizon = horizon_mse(model.predict(X_test), _fit_target(test.y))
+    print(f"Drift baseline (test from {test_from}): MSE {per_horizon.mean():.4f}")
+    return per_horizon
+
+
+def fit_full(tm: TrainingMatrix, sampling: str = None, engine: str = None):
+    """
+    Full refit; the embargoed out-of-sample MSE (drift_baseline) becomes the
+    drift baseline for later updates and its engine is recorded so later runs
+    keep it (see current_engine).
+    """
+    sampling = sampling or SAMPLING
+    engine = engine or current_engine()
+    plan = sample_plan(tm.ticker_codes, tm.dates, sampling, SAMPLE_HORIZON)
+    sub = tm.subset(plan.mask)
+    bootstrap = plan.max_samples if engine == "forest" else None
+    print(f"Engine '{engine}', sampling '{sampling}': {len(sub.X)} of {len(tm.X)} samples"
+          + (f", {bootstrap:.1%} bootstrapped per tree" if bootstrap else ""))
+    X = pd.DataFrame(sub.X, columns=MODEL_FEATURES, copy=False)
+    X_scaled, imp, scaler = preprocess_features(X)
+    model, test_mse = train_and_evaluate(X_scaled, sub.y, plan.weight, plan.max_samples, engine)
+    try:
+        test_mse = drift_baseline(tm, sampling, engine)
+    except RuntimeError as e:
+        print(f"⚠️  {e}: drift baseline from the random test split")
+    save_artifacts(imp, scaler, model)
+    _save_online_state({
+        "engine": engine,
+        "baseline_mse": float(test_mse.mean()),
+        "baseline_by_horizon": test_mse.tolist(),
+        "errors": [],
+        "last_label": int(tm.dates.max()),
+        "last_label_by_horizon": _last_labels(tm),
+        "updates": 0,
+        "full_refit_at": datetime.now().isoformat(timespec="seconds"),
+    })
+    return imp, scaler, model
+
+
+def _last_labels(tm: TrainingMatrix) -> list:
+    """Per horizon: the newest sample date whose target is known (ns, -1 if none)."""
+    y = tm.y.reshape(len(tm.y), -1)
+    return [int(tm.dates[np.isfinite(y[:, k])].max(initial=-1)) for k in range(y.shape[1])]
+
+
+def update_incremental(tm: TrainingMatrix, imputer, scaler, model, state: dict):
+    """
+    Test-then-train update on samples labelled since the last update, per
+    horizon: a sample dated T gets its h-day target only at T + h, so each
+    horizon has its own "last labelled" date.  The newly labelled samples are
+    scored with the current forests (rolling validation error, as a ratio to
+    the baseline MSE of the horizons with new labels), then every horizon with
+    new labels grows NEW_TREES trees with warm_start on its last RECENT_DAYS
+    labelled dates and retires the oldest so its forest stays at N_TREES.
+    Returns the updated model, or None when the rolling error signals drift.
+    """
+    y = tm.y.reshape(len(tm.y), -1)
+    labelled = np.isfinite(y)
+    # state from before per-horizon labels: every horizon was labelled up to last_label
+    last = np.asarray(state.get("last_label_by_horizon", [state["last_label"]] * y.shape[1]))
+    new_k = labelled & (tm.dates[:, None] > last[None, :])      # (n, horizons)
+    new = new_k.any(axis=1)
+    if not new.any():
+        print("No newly labelled samples; model unchanged")
+        return model
+
+    def transform(mask):
+        X = pd.DataFrame(tm.X[mask], columns=MODEL_FEATURES)
+        return scaler.transform(imputer.transform(X))
+
+    # each horizon is compared with its own baseline, on its own newly labelled rows
+    mse = horizon_mse(model.predict(transform(new)), np.where(new_k[new], y[new], np.nan))
+    known = new_k.any(axis=0)
+    if "baseline_by_horizon" not in state:              # state from before per-horizon baselines
+        state["baseline_by_horizon"] = [state["baseline_mse"]] * len(mse)
+        state["errors"] = []
+    ratio = float((mse[known] / np.asarray(state["baseline_by_horizon"])[known]).mean())
+    state["errors"] = (state["errors"] + [ratio])[-DRIFT_WINDOW:]
+    rolling = float(np.mean(state["errors"]))
+    print(f"Validation MSE on {int(new.sum())} new samples "
+          f"({', '.join(f'{h}d {c}' for h, c in zip(HORIZONS, new_k.sum(axis=0)))}): "
+          f"{float(mse[known].mean()):.4f} = {ratio:.2f}× baseline (rolling {rolling:.2f}×)")
+    if rolling > DRIFT_RATIO:
+        print(f"⚠️  Rolling error above {DRIFT_RATIO}× baseline → full refit")
+        return None
+
+    state["updates"] += 1
+    # one forest per horizon; each grows on the last RECENT_DAYS dates its target is known for
+    for k, forest in enumerate(per_output(model)):
+        if not known[k]:
+            continue
+        days = np.unique(tm.dates[labelled[:, k]])
+        rows = labelled[:, k] & (tm.dates >= days[-RECENT_DAYS:][0])
+        # a fresh seed per update, otherwise re-grown positions repeat their bootstrap draws;
+        # the RECENT_DAYS window is small, so new trees bootstrap all of it
+        max_samples = forest.max_samples
+        forest.set_params(warm_start=True, n_estimators=len(forest.estimators_) + NEW_TREES,
+                          random_state=RANDOM_STATE + state["updates"], max_samples=None)
+        forest.fit(transform(rows), y[rows, k])
+        forest.estimators_ = forest.estimators_[-N_TREES:]
+        forest.set_params(warm_start=False, n_estimators=len(forest.estimators_),
+                          max_samples=max_samples)
+
+    state["last_label"] = int(tm.dates.max())
+    state["last_label_by_horizon"] = _last_labels(tm)
+    _save_online_state(state)
+    return model
+
+
+def _embargoed_split(tm: TrainingMatrix, test_fraction: float = TEST_FRACTION):
+    """
+    Out-of-sample tail for experiments: the last `test_fraction` of trading
+    days, with an embargo of max(HORIZONS) days before it so no training
+    target overlaps the test period → (train, test, first test day).
+    """
+    days = np.unique(tm.dates)
+    cut = int(len(days) * (1 - test_fraction))
+    train = tm.subset(tm.dates < days[max(cut - max(HORIZONS), 0)])
+    test = tm.subset(tm.dates >= days[cut])
+    if not len(train.X) or not len(test.X):
+        raise RuntimeError("Not enough history for an embargoed train/test split")
+    return train, test, pd.Timestamp(days[cut]).date()
+
+
+def compare_sampling(tm: TrainingMatrix, strategies=STRATEGIES,
+                     test_fraction: float = TEST_FRACTION) -> pd.DataFrame:
+    """
+    Fit one current_engine() model per sampling strategy and score all of them
+    on the same embargoed out-of-sample tail (_embargoed_split).  Reports fit
+    time, memory and test MSE per strategy.
+    """
+    engine = current_engine()
+    train, test, test_from = _embargoed_split(tm, test_fraction)
+    X_test = pd.DataFrame(test.X, columns=MODEL_FEATURES, copy=False)
+    y_test = _fit_target(test.y)
+    print(f"Sampling experiment: {len(train.X)} train / {len(test.X)} test samples, "
+          f"test from {test_from}")
+
+    rows = []
+    for strategy in strategies:
+        plan = sample_plan(train.ticker_codes, train.dates, strategy, SAMPLE_HORIZON)
+        sub = train.subset(plan.mask)
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        X_scaled, imp, scaler = preprocess_features(pd.DataFrame(sub.X, columns=MODEL_FEATURES))
+        model = _new_model(plan.max_samples, engine).fit(X_scaled, _fit_target(sub.y),
+                                                         sample_weight=plan.weight)
+        fit_s = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        pred = model.predict(scaler.transform(imp.transform(X_test)))
+        per_horizon = horizon_mse(pred, y_test)
+        row = {
+            "strategy":  strategy,
+            "samples":   len(sub.X),
+            "rows/tree": int(round(len(sub.X) * (plan.max_samples or 1.0))),
+            "fit_s":     round(fit_s, 2),
+            "train_mb":  round((sub.X.nbytes + sub.y.nbytes) / 1e6, 2),
+            "peak_mb":   round(peak / 1e6, 1),
+            "model_mb":  round(model_mb(model), 1),
+            "test_mse":  round(float(per_horizon.mean()), 5),
+        }
+        if len(per_horizon) > 1:
+            row.update({f"mse_{h}d": round(float(m), 5) for h, m in zip(HORIZONS, per_horizon)})
+        rows.append(row)
+        print(f"  {strategy:<16} {row['fit_s']:>8.2f}s  test MSE {row['test_mse']:.5f}")
+
+    report = pd.DataFrame(rows).set_index("strategy")
+    print(report.to_string())
+    return report
+
+
+def compare_engines(tm: TrainingMatrix, engines=ENGINES, sampling: str = None,
+                    test_fraction: float = TEST_FRACTION) -> pd.DataFrame:
+    """
+    Fit every engine on the same sampled training rows and score them on the
+    same embargoed tail: fit time, batch predict throughput, pickled size and
+    test MSE (per horizon too).
+    """
+    sampling = sampling or SAMPLING
+    train, test, test_from = _embargoed_split(tm, test_fraction)
+    plan = sample_plan(train.ticker_codes, train.dates, sampling, SAMPLE_HORIZON)
+    sub = train.subset(plan.mask)
+    X_scaled, imp, scaler = preprocess_features(pd.DataFrame(sub.X, columns=MODEL_FEATURES))
+    X_test = scaler.transform(imp.transform(pd.DataFrame(test.X, columns=MODEL_FEATURES)))
+    y_fit, y_test = _fit_target(sub.y), _fit_target(test.y)
+    print(f"Engine comparison ('{sampling}' sampling): {len(sub.X)} train / {len(test.X)} "
+          f"test samples, test from {test_from}")
+
+    rows = []
+    for engine in engines:
+        t0 = time.perf_counter()
+        model = _new_model(plan.max_samples, engine).fit(X_scaled, y_fit, sample_weight=plan.weight)
+        fit_s = time.perf_counter() - t0
+        per_horizon = horizon_mse(model.predict(X_test), y_test)
+        row = {
+            "engine":         engine,
+            "fit_s":          round(fit_s, 2),
+            "predict_rows_s": round(rows_per_second(model.predict, X_test)),
+            "model_mb":       round(model_mb(model), 2),
+            "test_mse":       round(float(per_horizon.mean()), 5),
+        }
+        if len(per_horizon) > 1:
+            row.update({f"mse_{h}d": round(float(m), 5) for h, m in zip(HORIZONS, per_horizon)})
+        rows.append(row)
+        print(f"  {engine:<8} {row['fit_s']:>8.2f}s  test MSE {row['test_mse']:.5f}")
+
+    report = pd.DataFrame(rows).set_index("engine")
+    print(report.to_string())
+    return report
+
+
+def maintain_model(tm: TrainingMatrix, force_full: bool = False):
+    """
+    Incremental update when possible, full refit otherwise → (imputer, scaler,
+    model, action).  The saved model's engine is kept unless ENGINE asks for
+    another one.
+    """
+    if not force_full and os.path.exists(ONLINE_STATE) and all(os.path.exists(p) for p in ARTIFACTS):
+        with open(ONLINE_STATE) as f:
+            state = json.load(f)
+        imp, scaler, model = (joblib.load(p) for p in ARTIFACTS)
+        saved, engine = engine_of(model), ENGINE or engine_of(model)
+        if saved != "forest" or engine != saved:
+            # only forests can grow and retire trees; boosting (or an engine switch) refits
+            print(f"Saved model is '{saved}', engine '{engine}': full refit")
+            imp, scaler, model = fit_full(tm, engine=engine)
+            return imp, scaler, model, "full"
+        t0 = time.perf_counter()
+        updated = update_incremental(tm, imp, scaler, model, state)
+        if updated is not None:
+            save_artifacts(imp, scaler, updated)
+            print(f"Incremental update in {time.perf_counter() - t0:.2f}s")
+            return imp, scaler, updated, "update"
+        imp, scaler, model = fit_full(tm)
+        return imp, scaler, model, "drift-refit"
+    imp, scaler, model = fit_full(tm)
+    return imp, scaler, model, "full"
+
+
+def select_top_n(store: FeatureStore, df0: pd.DataFrame, model, imputer, scaler,
+                 top_n: int = TOP_N, output_file: str = OUTPUT_FILE) -> pd.DataFrame:
     """Predict returns, ensure TOP_N picks per bucket (positives first), and save."""
-    latest = feat_df.groupby(level=0).tail(1).copy()
-    X_raw = latest[["vol30","mom30","beta60"]]
+    # newest row with every feature, like return_scorer.ReturnScorer; requiring the
+    # target too would score features LOOKAHEAD_DAYS old
+    latest = store.latest(MODEL_FEATURES)
+    latest["risk_label2"] = df0["risk_label2"].reindex(
+        latest.index.get_level_values("ticker")
+    ).to_numpy()
+    X_raw = latest[MODEL_FEATURES]
     X_imp = imputer.transform(X_raw)
     X_scaled = scaler.transform(X_imp)
-    latest["pred_return"] = model.predict(X_scaled)
+    preds = horizon_predictions(model, X_scaled)
+    for h in preds.columns:
+        latest[pred_column(h)] = preds[h].to_numpy()
 
     # Re-map risk_label2 to Low/Medium/High by vol30 median
-    medians = latest.groupby("risk_label2")["vol30"].median().sort_values()
-    mapping = {orig: new for orig, new in zip(medians.index, ["Low","Medium","High"]) }
-    latest["risk_label"] = latest["risk_label2"].map(mapping)
+    latest["risk_label"] = remap_risk_labels(latest["vol30"], latest["risk_label2"])
 
     picks = []
     for label in ["Low","Medium","High"]:
@@ -161,23 +604,53 @@ def select_top_n(feat_df: pd.DataFrame, model, imputer, scaler, top_n: int = TOP
 
     final_df = pd.concat(picks)
     final_df.to_csv(
-        OUTPUT_FILE,
+        output_file,
         columns=["vol30","mom30","beta60","pred_return","risk_label"]
+                + [pred_column(h) for h in preds.columns if h != LOOKAHEAD_DAYS]
     )
-    print(f"Top {top_n} picks per bucket → '{OUTPUT_FILE}'")
+    print(f"Top {top_n} picks per bucket → '{output_file}'")
     return final_df
 
 
-def main():
+def main(incremental: bool = False, compare: bool = False, compare_models: bool = False):
     df0     = pd.read_csv(INPUT_FILE, index_col="ticker")
-    feat_df = build_feature_df(df0)
-    X = feat_df[["vol30","mom30","beta60"]]
-    y = feat_df["future_return"]
-    X_scaled, imp, scaler = preprocess_features(X)
-    model = train_and_evaluate(X_scaled, y)
-    save_artifacts(imp, scaler, model)
-    select_top_n(feat_df, model, imp, scaler)
+    if compare or compare_models:
+        # experiment only: reuse the store when there is one, export nothing
+        store = (FeatureStore(FEATURE_STORE) if os.path.exists(FEATURE_STORE)
+                 else build_feature_df(df0))
+        tm = build_training_matrix(store, df0)
+        if compare:
+            compare_sampling(tm)
+        if compare_models:
+            compare_engines(tm)
+        return
+    store   = build_feature_df(df0)
+    tm      = build_training_matrix(store, df0)
+    if incremental:
+        imp, scaler, model, _ = maintain_model(tm)
+    else:
+        imp, scaler, model = fit_full(tm)
+    select_top_n(store, df0, model, imp, scaler)
 
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train the return model and export top-N picks")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Update the saved forest with new samples instead of refitting "
+                             "(falls back to a full refit on drift)")
+    parser.add_argument("--sampling", choices=STRATEGIES, default=SAMPLING,
+                        help="Training-set reduction for overlapping target windows")
+    parser.add_argument("--compare-sampling", action="store_true",
+                        help="Report fit time, memory and out-of-sample MSE of every "
+                             "sampling strategy instead of training")
+    parser.add_argument("--engine", choices=ENGINES, default=ENGINE,
+                        help="Return model engine (default: the saved model's, else forest)")
+    parser.add_argument("--compare-engines", action="store_true",
+                        help="Report fit time, predict throughput, size and out-of-sample MSE "
+                             "of every engine instead of training")
+    args = parser.parse_args()
 
+    SAMPLING = args.sampling
+    ENGINE = args.engine
+    main(args.incremental, args.compare_sampling, args.compare_engines)
@@ -2,20 +2,42 @@
 """
 train_risk_model.py
 
-Loads the cleaned NFCS risk‐profiling dataset, builds a preprocessing + RandomForest pipeline
-(with OneHotEncoder(handle_unknown='ignore')), evaluates, and saves it.
+Loads the cleaned NFCS risk‐profiling dataset (cached by nfcs_data.load_nfcs),
+builds a preprocessing + RandomForest pipeline (with OneHotEncoder(handle_unknown='ignore')),
+evaluates, and saves it.  ENGINE (or --engine) swaps the forest for
+HistGradientBoostingClassifier (engines.py); --compare-engines fits every
+engine on the same split and reports fit time, predict throughput, artifact
+size and held-out accuracy.
+
+Run with --tune to search the engine's hyper-parameters across cores instead;
+the preprocessor is cached per CV fold (Pipeline(memory=...)) so it is not
+refitted for every candidate, and each candidate's fit time, balanced accuracy
+and predict latency are written to a results table.
 """
 
-import pandas as pd
+import argparse
+import shutil
+import tempfile
+import time
+
 import joblib
+import numpy as np
+import pandas as pd
 
 from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import OneHotEncoder, LabelEncoder
 from sklearn.impute import SimpleImputer
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report, balanced_accuracy_score, confusion_matrix
+from sklearn.model_selection import train_test_split, StratifiedKFold, RandomizedSearchCV
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import HalvingRandomSearchCV
+from sklearn.metrics import (classification_report, balanced_accuracy_score, confusion_matrix,
+                             accuracy_score, log_loss)
+
+from engines import ENGINES, engine_of, make_classifier, model_mb, rows_per_second
+
+from nfcs_data import load_nfcs
+from nfcs_schema import validate_frame
 
 # 1) Define your feature sets
 numeric_feats = [
@@ -43,29 +65,87 @@ onehot_feats = [
     'Marital Status'
 ]
 
-def map_risk(x):
-    if x <= 3:
-        return 'Low'
-    elif x <= 7:
-        return 'Medium'
-    else:
-        return 'High'
+# Model engine for the saved pipeline: forest | hist_gb (engines.py)
+ENGINE = 'forest'
 
-def main():
-    # --- LOAD ---
-    df = pd.read_excel('risk_profiling_data.xlsx', engine='openpyxl')
-    df = df[df['Take Risk'].notnull()].copy()
+# Forest defaults used for the saved pipeline
+CLF_PARAMS = dict(
+    n_estimators=200,
+    max_depth=10,
+    min_samples_leaf=1,
+    class_weight='balanced',
+    random_state=42
+)
+
+# Histogram gradient boosting defaults (ENGINE = 'hist_gb')
+HGB_CLF_PARAMS = dict(
+    max_iter=200,
+    learning_rate=0.05,
+    max_leaf_nodes=31,
+    min_samples_leaf=20,
+    class_weight='balanced',
+    early_stopping=False,
+    random_state=42
+)
+
+# Search space for --tune
+PARAM_DISTRIBUTIONS = {
+    'clf__n_estimators':     [50, 100, 200, 400],
+    'clf__max_depth':        [None, 6, 8, 10, 14, 20],
+    'clf__min_samples_leaf': [1, 2, 5, 10],
+    'clf__max_features':     ['sqrt', 0.5, None],
+}
+HGB_PARAM_DISTRIBUTIONS = {
+    'clf__max_iter':          [100, 200, 400],
+    'clf__learning_rate':     [0.02, 0.05, 0.1, 0.2],
+    'clf__max_leaf_nodes':    [15, 31, 63],
+    'clf__min_samples_leaf':  [10, 20, 50],
+    'clf__l2_regularization': [0.0, 0.1, 1.0],
+}
+ENGINE_PARAMS = {'forest': (CLF_PARAMS, PARAM_DISTRIBUTIONS),
+                 'hist_gb': (HGB_CLF_PARAMS, HGB_PARAM_DISTRIBUTIONS)}
+TUNE_RESULTS = 'risk_tuning_results.csv'
+
+def build_preprocessor():
+    return ColumnTransformer([
+        # 1) Median‐impute numeric columns
+        ('num', SimpleImputer(strategy='median'), numeric_feats),
+
+        # 2) One‐hot encode Ethnicity & Marital Status, ignore unseen categories
+        ('ohe',
+         OneHotEncoder(
+             drop='first',
+             sparse_output=False,
+             handle_unknown='ignore'
+         ),
+         onehot_feats),
+    ], remainder='drop')
+
+def build_pipeline(memory=None, engine=None, **clf_params):
+    engine = engine or ENGINE
+    params = {**ENGINE_PARAMS[engine][0], **clf_params}
+    return Pipeline([
+        ('prep', build_preprocessor()),
+        ('clf', make_classifier(engine, **params))
+    ], memory=memory)
+
+def load_split():
+    # --- LOAD (numerics already coerced, risk_level already mapped) ---
+    df = load_nfcs()
+
+    # --- VALIDATE (unknown codes dropped; missing answers are left to the imputer) ---
+    v = validate_frame(df)
+    keep = v.ok(allow_missing=True)
+    if not keep.all():
+        print(f"Dropping {int((~keep).sum())} rows with invalid codes:")
+        print(v.counts()["invalid"].loc[lambda s: s > 0].to_string())
+        df = df[keep].reset_index(drop=True)
 
     # --- TARGET ---
-    df['risk_level'] = df['Take Risk'].apply(map_risk)
     le = LabelEncoder()
-    df['risk_label'] = le.fit_transform(df['risk_level'])
+    df['risk_label'] = le.fit_transform(df['risk_level'].astype(str))
     print("Classes:", le.classes_)
 
-    # --- COERCE NUMERICS ---
-    for col in numeric_feats:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-
     # --- TRAIN/TEST SPLIT ---
     X = df[numeric_feats + onehot_feats]
     y = df['risk_label']
@@ -76,32 +156,116 @@ def main():
         stratify=y
     )
     print(f"Train/Test samples: {len(X_train)} / {len(X_test)}")
+    return X_train, X_test, y_train, y_test, le
 
-    # --- PIPELINE ---
-    preprocessor = ColumnTransformer([
-        # 1) Median‐impute numeric columns
-        ('num', SimpleImputer(strategy='median'), numeric_feats),
+def predict_latency_ms(pipeline, X, repeats=50):
+    """Median wall time of a single-row predict, as the Flask endpoint does it."""
+    row = X.iloc[[0]]
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        pipeline.predict(row)
+        times.append(time.perf_counter() - t0)
+    return 1000 * float(np.median(times))
 
-        # 2) One‐hot encode Ethnicity & Marital Status, ignore unseen categories
-        ('ohe',
-         OneHotEncoder(
-             drop='first',
-             sparse_output=False,
-             handle_unknown='ignore'
-         ),
-         onehot_feats),
-    ], remainder='drop')
+def tune(search='halving', n_iter=30, n_jobs=-1, top_k=5):
+    """Hyper-parameter search over ENGINE's space; writes one row per candidate to TUNE_RESULTS."""
+    X_train, X_test, y_train, y_test, _ = load_split()
+    cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
 
-    pipeline = Pipeline([
-        ('prep', preprocessor),
-        ('clf', RandomForestClassifier(
-            n_estimators=200,
-            max_depth=10,
-            min_samples_leaf=1,
-            class_weight='balanced',
-            random_state=42
-        ))
-    ])
+    # Fitted ColumnTransformers are memoized per fold, so candidates only pay for the forest
+    cache_dir = tempfile.mkdtemp(prefix='risk_prep_')
+    try:
+        pipe = build_pipeline(memory=cache_dir)
+        distributions = ENGINE_PARAMS[ENGINE][1]
+        common = dict(scoring='balanced_accuracy', cv=cv, n_jobs=n_jobs,
+                      random_state=42, refit=False)
+        if search == 'halving':
+            searcher = HalvingRandomSearchCV(
+                pipe, distributions, n_candidates=n_iter, factor=3,
+                min_resources='exhaust', **common
+            )
+        else:
+            searcher = RandomizedSearchCV(
+                pipe, distributions, n_iter=n_iter, **common
+            )
+
+        t0 = time.perf_counter()
+        searcher.fit(X_train, y_train)
+        search_time = time.perf_counter() - t0
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    res = pd.DataFrame(searcher.cv_results_)
+    if 'iter' in res:
+        # halving: keep each candidate's last round; survivors of later rounds rank first
+        res = res.sort_values('iter').groupby(res['params'].astype(str)).tail(1)
+        res = res.sort_values(['iter', 'mean_test_score'], ascending=False, kind='stable')
+        n_rows = res['n_resources']
+    else:
+        res = res.sort_values('mean_test_score', ascending=False, kind='stable')
+        n_rows = pd.Series(len(X_train), index=res.index)
+    res, n_rows = res.reset_index(drop=True), n_rows.reset_index(drop=True)
+    # validation rows scored per fold (halving rounds use a subsample of X_train)
+    fold_rows = n_rows / cv.get_n_splits()
+    table = pd.DataFrame({
+        'params':           res['params'].astype(str),
+        'n_train':          n_rows,
+        'cv_bal_acc':       res['mean_test_score'],
+        'cv_bal_acc_std':   res['std_test_score'],
+        'fit_time_s':       res['mean_fit_time'],
+        'score_us_per_row': 1e6 * res['mean_score_time'] / fold_rows,
+        'test_bal_acc':     np.nan,
+        'predict_ms':       np.nan,
+    })
+
+    # Refit the leaders on the full train split for held-out accuracy & 1-row latency
+    for i, params in enumerate(res['params'].head(top_k)):
+        model = build_pipeline(**{k.split('__', 1)[1]: v for k, v in params.items()})
+        model.fit(X_train, y_train)
+        table.loc[i, 'test_bal_acc'] = balanced_accuracy_score(y_test, model.predict(X_test))
+        table.loc[i, 'predict_ms'] = predict_latency_ms(model, X_test)
+
+    table.to_csv(TUNE_RESULTS, index=False)
+    print(f"\nSearch ({search}, {ENGINE}) over {len(table)} candidates took {search_time:.1f}s\n")
+    with pd.option_context('display.max_colwidth', 120, 'display.width', 200):
+        print(table.head(max(top_k, 10)).to_string())
+    print(f"\n✅ Tuning results → {TUNE_RESULTS}")
+    return table
+
+def compare_engines(engines=ENGINES):
+    """Fit each engine's default pipeline on the same split; one report row per engine."""
+    X_train, X_test, y_train, y_test, _ = load_split()
+    rows = []
+    for engine in engines:
+        pipeline = build_pipeline(engine=engine)
+        t0 = time.perf_counter()
+        pipeline.fit(X_train, y_train)
+        fit_s = time.perf_counter() - t0
+        y_pred = pipeline.predict(X_test)
+        rows.append({
+            'engine':         engine,
+            'fit_s':          round(fit_s, 2),
+            'predict_rows_s': round(rows_per_second(pipeline.predict_proba, X_test)),
+            'predict_ms':     round(predict_latency_ms(pipeline, X_test), 3),
+            'model_mb':       round(model_mb(pipeline), 2),
+            'test_acc':       round(accuracy_score(y_test, y_pred), 4),
+            'test_bal_acc':   round(balanced_accuracy_score(y_test, y_pred), 4),
+            'test_log_loss':  round(log_loss(y_test, pipeline.predict_proba(X_test)), 4),
+        })
+        print(f"  {engine:<8} fit {fit_s:.2f}s  balanced accuracy {rows[-1]['test_bal_acc']:.3f}")
+
+    report = pd.DataFrame(rows).set_index('engine')
+    print(f"\nEngines on {len(X_train)} train / {len(X_test)} test rows:\n")
+    print(report.to_string())
+    return report
+
+def main():
+    X_train, X_test, y_train, y_test, le = load_split()
+
+    # --- PIPELINE ---
+    pipeline = build_pipeline()
+    print(f"Engine: {engine_of(pipeline)}")
 
     # --- TRAIN ---
     pipeline.fit(X_train, y_train)
@@ -122,4 +286,22 @@ def main():
     print("✅ Saved label encoder → risk_label_encoder.joblib")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Train (or tune) the NFCS risk classifier")
+    parser.add_argument("--tune", action="store_true",
+                        help="Run a hyper-parameter search instead of training the default model")
+    parser.add_argument("--search", choices=["halving", "random"], default="halving")
+    parser.add_argument("--n-iter", type=int, default=30, help="Candidates to sample (default 30)")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Parallel CV workers (default all cores)")
+    parser.add_argument("--engine", choices=ENGINES, default=ENGINE,
+                        help="Classifier engine for training / tuning (default %(default)s)")
+    parser.add_argument("--compare-engines", action="store_true",
+                        help="Report fit time, predict throughput, size and accuracy of every engine")
+    args = parser.parse_args()
+
+    ENGINE = args.engine
+    if args.compare_engines:
+        compare_engines()
+    elif args.tune:
+        tune(search=args.search, n_iter=args.n_iter, n_jobs=args.n_jobs)
+    else:
+        main()
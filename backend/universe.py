@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+universe.py
+
+Universe selection for the KMeans stock classifiers
+(stock_classifier_kmeans.py, stock_risk_level_classifier.py).
+
+One bulk download (yf.download or price_ingest.download_panel) of a year of
+daily bars for every candidate plus the market proxy serves both stages:
+
+  * selection → average daily volume (and dollar volume) over the last
+                VOLUME_DAYS trading days (rows, like yf.download(period="60d")),
+                computed for all symbols with one
+                column-wise reduction over the (dates × symbols) Volume panel,
+                then liquidity thresholds and a top-N cut
+  * features  → the same panel's Close columns for the selected names
+
+The panel is kept in PANEL_CACHE and reused for the rest of the day, so
+running both classifiers (or rerunning one) downloads once.
+
+    panel = load_panel(symbols + ["SPY"], ingest="yfinance")
+    top = select_universe(panel, top_n=100, min_dollar_volume=50e6)
+    close = close_panel(panel, top)
+"""
+
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# PARAMETERS
+PANEL_DAYS        = 365            # history downloaded once for selection + features
+VOLUME_DAYS       = 60             # trading days (panel rows) averaged for liquidity
+TOP_N             = 100
+MIN_AVG_VOLUME    = None           # shares / day; None = no floor
+MIN_DOLLAR_VOLUME = None           # Close × Volume / day; None = no floor
+PANEL_CACHE       = "universe_panel.pkl"
+
+
+# ─── Panel ─────────────────────────────────────────────────────────────────────
+def download(symbols, ingest: str = "yfinance", days: int = PANEL_DAYS) -> pd.DataFrame:
+    """(Ticker, Price) MultiIndex panel of daily bars, one request batch for all symbols."""
+    if ingest == "stooq":
+        from price_ingest import download_panel
+        return download_panel(symbols, days=days)
+    import yfinance as yf
+    return yf.download(symbols, period="1y" if days == 365 else f"{days}d",
+                       group_by="ticker", auto_adjust=True, threads=True)
+
+
+def load_panel(symbols, ingest: str = "yfinance", days: int = PANEL_DAYS,
+               cache: str = PANEL_CACHE, refresh: bool = False) -> pd.DataFrame:
+    """
+    Today's cached panel when it covers `symbols`, otherwise one fresh
+    download (written back to the cache).
+    """
+    symbols = list(dict.fromkeys(symbols))
+    if not refresh and cache and os.path.exists(cache) and \
+            date.fromtimestamp(os.path.getmtime(cache)) == date.today():
+        panel = pd.read_pickle(cache)
+        if set(symbols) <= set(panel.attrs.get("requested", [])):
+            print(f"✅ Reusing today's price panel from {cache}")
+            return panel
+    panel = download(symbols, ingest, days)
+    panel.attrs["requested"] = symbols      # symbols without data are absent from the columns
+    if cache:
+        tmp = cache + ".tmp"
+        panel.to_pickle(tmp)
+        os.replace(tmp, cache)
+    return panel
+
+
+def field_panel(panel: pd.DataFrame, field: str) -> pd.DataFrame:
+    """(dates × symbols) panel of one bar field, e.g. "Close" or "Volume"."""
+    return panel.xs(field, axis=1, level=1)
+
+
+def close_panel(panel: pd.DataFrame, tickers) -> pd.DataFrame:
+    return field_panel(panel, "Close").reindex(columns=list(tickers))
+
+
+# ─── Selection ─────────────────────────────────────────────────────────────────
+def liquidity(panel: pd.DataFrame, volume_days: int = VOLUME_DAYS) -> pd.DataFrame:
+    """Per symbol: avg_volume and avg_dollar_volume over the last `volume_days` trading days."""
+    volume, close = field_panel(panel, "Volume"), field_panel(panel, "Close")
+    v = volume.to_numpy(dtype=np.float64)[-volume_days:]
+    c = close.reindex(columns=volume.columns).to_numpy(dtype=np.float64)[-volume_days:]
+
+    def mean(x):                                        # NaN-skipping; all-NaN column → NaN
+        n = np.isfinite(x).sum(axis=0)
+        return np.where(n > 0, np.nansum(x, axis=0) / np.maximum(n, 1), np.nan)
+
+    stats = pd.DataFrame({"avg_volume": mean(v), "avg_dollar_volume": mean(v * c)},
+                         index=volume.columns)
+    return stats.dropna(subset=["avg_volume"])
+
+
+def select_universe(panel: pd.DataFrame, top_n: int = TOP_N, volume_days: int = VOLUME_DAYS,
+                    min_avg_volume: float = MIN_AVG_VOLUME,
+                    min_dollar_volume: float = MIN_DOLLAR_VOLUME, exclude=("SPY",)) -> list:
+    """Most liquid symbols, by average volume, after the optional liquidity floors."""
+    stats = liquidity(panel, volume_days).drop(index=list(exclude), errors="ignore")
+    keep = np.ones(len(stats), dtype=bool)
+    if min_avg_volume is not None:
+        keep &= stats["avg_volume"].to_numpy() >= min_avg_volume
+    if min_dollar_volume is not None:
+        keep &= stats["avg_dollar_volume"].to_numpy() >= min_dollar_volume
+    stats = stats[keep]
+    if top_n is not None:
+        stats = stats.nlargest(top_n, "avg_volume")
+    else:
+        stats = stats.sort_values("avg_volume", ascending=False)
+    return stats.index.tolist()
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Select the liquid universe from one price panel")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--ingest", choices=["yfinance", "stooq"], default="yfinance")
+    parser.add_argument("--top-n", type=int, default=TOP_N)
+    parser.add_argument("--min-volume", type=float, default=MIN_AVG_VOLUME)
+    parser.add_argument("--min-dollar-volume", type=float, default=MIN_DOLLAR_VOLUME)
+    parser.add_argument("--refresh", action="store_true", help="Ignore today's cached panel")
+    args = parser.parse_args()
+
+    panel = load_panel(args.symbols, args.ingest, refresh=args.refresh)
+    t0 = time.perf_counter()
+    top = select_universe(panel, args.top_n, min_avg_volume=args.min_volume,
+                          min_dollar_volume=args.min_dollar_volume)
+    print(f"{len(top)} symbols selected in {1000 * (time.perf_counter() - t0):.2f} ms")
+    print(liquidity(panel).loc[top].to_string())
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+user_store.py
+
+SQLite-backed per-user cache for the Flask API.
+
+One row per username holds the submitted NFCS profile, the risk bucket the
+classifier assigned to it, the model version that produced that bucket and
+the dashboard picks for it.  The bucket is recomputed only when the profile
+(hash) or the model version changes, and the picks only when the bucket or
+the picks file changes, so a repeat dashboard visit is one primary-key read.
+
+Rows are created once, by create() for a username that is not taken yet,
+which hands back a random token (only its SHA-256 is stored).  Later writes
+go through risk_bucket() / picks() and the API only calls them after
+authenticate(username, token), so nobody can overwrite another user's row.
+"""
+
+import hashlib
+import json
+import os
+import secrets
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+DB_FILE = "user_store.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username      TEXT PRIMARY KEY,
+    profile_json  TEXT NOT NULL,
+    profile_hash  TEXT NOT NULL,
+    risk_bucket   TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    picks_json    TEXT,
+    picks_version TEXT,
+    updated_at    TEXT NOT NULL,
+    token_hash    TEXT
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_users_bucket ON users(risk_bucket);
+CREATE INDEX IF NOT EXISTS idx_users_model  ON users(model_version);
+"""
+
+
+def file_version(*paths: str) -> str:
+    """Cheap version tag for artifacts on disk (name, size, mtime)."""
+    h = hashlib.sha1()
+    for p in paths:
+        st = os.stat(p)
+        h.update(f"{os.path.basename(p)}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return h.hexdigest()[:12]
+
+
+def profile_hash(profile: dict) -> str:
+    return hashlib.sha1(
+        json.dumps(profile, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class UserStore:
+    """Thread-safe (one connection per thread) wrapper around the users table."""
+
+    def __init__(self, path: str = DB_FILE):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        columns = {r["name"] for r in conn.execute("PRAGMA table_info(users)")}
+        if "token_hash" not in columns:                 # databases from before create()
+            conn.execute("ALTER TABLE users ADD COLUMN token_hash TEXT")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, username: str):
+        row = self._conn().execute(
+            "SELECT * FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def create(self, username: str, profile: dict, model_version: str, score):
+        """
+        Add a user → (bucket, token), or None when the username is taken.
+        Rows stored before tokens existed (token_hash NULL) can be claimed.
+        """
+        row = self.get(username)
+        if row and row["token_hash"] is not None:
+            return None
+
+        bucket = score(profile)
+        token = secrets.token_urlsafe(24)
+        conn = self._conn()
+        with conn:
+            cur = conn.execute(
+                """
+                INSERT INTO users (username, profile_json, profile_hash, risk_bucket,
+                                   model_version, picks_json, picks_version, updated_at,
+                                   token_hash)
+                VALUES (?, ?, ?, ?, ?, NULL, NULL, ?, ?)
+                ON CONFLICT(username) DO UPDATE SET
+                    profile_json  = excluded.profile_json,
+                    profile_hash  = excluded.profile_hash,
+                    risk_bucket   = excluded.risk_bucket,
+                    model_version = excluded.model_version,
+                    picks_json    = NULL,
+                    picks_version = NULL,
+                    updated_at    = excluded.updated_at,
+                    token_hash    = excluded.token_hash
+                WHERE users.token_hash IS NULL
+                """,
+                (username, json.dumps(profile, default=str), profile_hash(profile), bucket,
+                 model_version, _now(), token_hash(token)),
+            )
+        if cur.rowcount == 0:                           # claimed concurrently
+            return None
+        return bucket, token
+
+    def authenticate(self, username: str, token: str) -> bool:
+        if not username or not token:
+            return False
+        row = self._conn().execute(
+            "SELECT token_hash FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        return bool(row and row["token_hash"]) and \
+            secrets.compare_digest(row["token_hash"], token_hash(token))
+
+    def risk_bucket(self, username: str, profile: dict, model_version: str, score):
+        """
+        Return (bucket, cached) for an existing user (KeyError otherwise).
+        `score(profile)` is only called when the stored profile differs or
+        came from another model version; the cached picks are dropped then.
+        """
+        p_hash = profile_hash(profile)
+        row = self.get(username)
+        if row is None:
+            raise KeyError(f"unknown user {username!r}")
+        if row["profile_hash"] == p_hash and row["model_version"] == model_version:
+            return row["risk_bucket"], True
+
+        bucket = score(profile)
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                """
+                UPDATE users SET
+                    profile_json  = ?,
+                    profile_hash  = ?,
+                    risk_bucket   = ?,
+                    model_version = ?,
+                    picks_json    = NULL,
+                    picks_version = NULL,
+                    updated_at    = ?
+                WHERE username = ?
+                """,
+                (json.dumps(profile, default=str), p_hash, bucket, model_version, _now(),
+                 username),
+            )
+        return bucket, False
+
+    def picks(self, username: str, bucket: str, picks_version: str, compute):
+        """
+        Return (picks, cached) for a stored user.  `compute(bucket)` runs only
+        when no picks are cached for this bucket/picks file.  Returns
+        (None, False) for unknown users so callers can fall back.
+        """
+        row = self.get(username)
+        if row is None:
+            return None, False
+        if (row["picks_json"] is not None and row["risk_bucket"] == bucket
+                and row["picks_version"] == picks_version):
+            return json.loads(row["picks_json"]), True
+        if row["risk_bucket"] != bucket:
+            return None, False
+
+        recs = compute(bucket)
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "UPDATE users SET picks_json = ?, picks_version = ?, updated_at = ? "
+                "WHERE username = ?",
+                (json.dumps(recs), picks_version, _now(), username),
+            )
+        return recs, False
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
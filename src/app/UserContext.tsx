@@ -26,6 +26,7 @@ export const UserProvider = ({ children }: { children: ReactNode }) => {
     localStorage.removeItem("username");
     localStorage.removeItem("risk_bucket");
     localStorage.removeItem("profileData");
+    localStorage.removeItem("user_token");
     setUsername(null);
     window.location.href = "/"; 
   };
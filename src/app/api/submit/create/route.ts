@@ -3,6 +3,7 @@ import { writeFile, mkdir, readFile } from 'fs/promises';
 import path from 'path';
 
 const dataFilePath = path.join(process.cwd(), 'data', 'data.json');
+const flaskUrl = process.env.FLASK_URL ?? 'http://localhost:5050';
 
 export async function POST(request: Request) {
   try {
@@ -33,14 +34,37 @@ export async function POST(request: Request) {
       existing = [];
     }
 
+    if (existing.some((u) => u.username === formData.username || u.email === formData.email)) {
+      return NextResponse.json({ message: 'Username or email already registered' }, { status: 409 });
+    }
+
+    // 帳號確定可建立後才在 Flask 端建立使用者快取，並取得之後更新用的 token
+    const { features, ...user } = formData;
+    const registerResponse = await fetch(`${flaskUrl}/api/users`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/x-www-form-urlencoded' },
+      body: new URLSearchParams({ ...features, username: user.username }),
+    });
+    const registered = await registerResponse.json();
+    if (!registerResponse.ok) {
+      return NextResponse.json({ message: registered.error ?? 'Registration failed' },
+                               { status: registerResponse.status });
+    }
+
     existing.push({
-      ...formData,
+      ...user,
+      risk_bucket: registered.risk_bucket,
+      user_token: registered.user_token,
       submittedAt: new Date().toISOString(),
     });
 
     await writeFile(dataFilePath, JSON.stringify(existing, null, 2), 'utf-8');
 
-    return NextResponse.json({ message: 'Form saved to data.json' }, { status: 200 });
+    return NextResponse.json({
+      message: 'Form saved to data.json',
+      risk_bucket: registered.risk_bucket,
+      user_token: registered.user_token,
+    }, { status: 200 });
   } catch (error) {
     console.error('❌ Error saving form:', error);
     return NextResponse.json({ message: 'Failed to save form' }, { status: 500 });
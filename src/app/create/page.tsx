@@ -33,37 +33,28 @@ export default function CreateFormPage() {
       }
     
         try {
-          // 送出表單到 Flask 的 /api/predict 做風險預測
-          const predictResponse = await fetch("http://localhost:5050/api/predict", {
-            method: "POST",
-            headers: { "Content-Type": "application/x-www-form-urlencoded" },
-            body: new URLSearchParams({
-              "Age Group": formData["Age Group"],
-              "Ethnicity": formData["Ethnicity"],
-              "Education Level": formData["Education Level"],
-              "Marital Status": formData["Marital Status"],
-              "Financially dependent children": formData["Financially dependent children"],
-              "Annual Household Income": formData["Annual Household Income"],
-              "Spending vs Income Past Year": formData.spending_vs_income,
-              "Difficulty covering expenses": formData.difficulty_covering_expenses,
-              "Emergency fund to cover 3 Months expenses": formData["Emergency fund to cover 3 Months expenses"],
-              "Current financial condition satisfaction": formData["Current financial condition satisfaction"],
-              "Thinking about FC frequency": formData["Thinking about FC frequency"],
-              "Account ownership check": formData["Account ownership check"],
-              "Savings/Money market/CD account ownership": formData["Savings/Money market/CD account ownership"],
-              "Employer-sponsored retirement plan ownership": formData["Employer-sponsored retirement plan ownership"],
-              "Regular contribution to a retirement account": formData["Regular contribution to a retirement account"],
-              "Non-retirement investments in stocks, bonds, mutual funds": formData["Non-retirement investments in stocks, bonds, mutual funds"],
-              "Homeownership": formData["Homeownership"],
-              "Self-efficacy": formData["Self-efficacy"],
-              "Self-rated overall financial knowledge": formData["Self-rated overall financial knowledge"],
-            }),
-          });
-      
-          if (!predictResponse.ok) throw new Error("Prediction failed");
-      
-          const predictData = await predictResponse.json();
-          localStorage.setItem("risk_bucket", predictData.risk_bucket);
+          // Flask 的欄位名稱；/api/submit/create 確認帳號可用後才送去建立使用者並預測風險
+          const features = {
+            "Age Group": formData["Age Group"],
+            "Ethnicity": formData["Ethnicity"],
+            "Education Level": formData["Education Level"],
+            "Marital Status": formData["Marital Status"],
+            "Financially dependent children": formData["Financially dependent children"],
+            "Annual Household Income": formData["Annual Household Income"],
+            "Spending vs Income Past Year": formData.spending_vs_income,
+            "Difficulty covering expenses": formData.difficulty_covering_expenses,
+            "Emergency fund to cover 3 Months expenses": formData["Emergency fund to cover 3 Months expenses"],
+            "Current financial condition satisfaction": formData["Current financial condition satisfaction"],
+            "Thinking about FC frequency": formData["Thinking about FC frequency"],
+            "Account ownership check": formData["Account ownership check"],
+            "Savings/Money market/CD account ownership": formData["Savings/Money market/CD account ownership"],
+            "Employer-sponsored retirement plan ownership": formData["Employer-sponsored retirement plan ownership"],
+            "Regular contribution to a retirement account": formData["Regular contribution to a retirement account"],
+            "Non-retirement investments in stocks, bonds, mutual funds": formData["Non-retirement investments in stocks, bonds, mutual funds"],
+            "Homeownership": formData["Homeownership"],
+            "Self-efficacy": formData["Self-efficacy"],
+            "Self-rated overall financial knowledge": formData["Self-rated overall financial knowledge"],
+          };
           
           const submissionData = {
             email: formData.email,
@@ -90,7 +81,7 @@ export default function CreateFormPage() {
             "Thinking about FC frequency": formData["Thinking about FC frequency"],
             "Self-efficacy": formData["Self-efficacy"],
             "Self-rated overall financial knowledge": formData["Self-rated overall financial knowledge"]},
-            risk_bucket: predictData.risk_bucket
+            features
           };
           console.log("submissionData:", submissionData);
 
@@ -101,6 +92,9 @@ export default function CreateFormPage() {
           });
 
           if (!response.ok) throw new Error("User creation failed");
+          const created = await response.json();
+          localStorage.setItem("risk_bucket", created.risk_bucket);
+          localStorage.setItem("user_token", created.user_token);
           localStorage.setItem("username", formData.username);
           localStorage.setItem("profileData", JSON.stringify(submissionData.profile));
 
@@ -17,13 +17,32 @@ export default function DashboardPage() {
 
     setBucket(storedBucket);
 
-    fetch('http://localhost:5050/api/dashboard', {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/x-www-form-urlencoded' },
-      body: new URLSearchParams({ risk_bucket: storedBucket }),
-    })
-      .then((res) => res.json())
-      .then((data) => setPicks(data.picks))
+    // Revalidate cached picks with the server's ETag; 304 means they are unchanged
+    const cached = JSON.parse(localStorage.getItem('dashboard_cache') || 'null');
+    const headers: Record<string, string> = {
+      'X-User-Token': localStorage.getItem('user_token') ?? '',
+    };
+    if (cached && cached.bucket === storedBucket && cached.etag) {
+      headers['If-None-Match'] = cached.etag;
+    }
+
+    const query = new URLSearchParams({ risk_bucket: storedBucket, username });
+    fetch(`http://localhost:5050/api/dashboard?${query}`, { headers })
+      .then(async (res) => {
+        if (res.status === 304 && cached) {
+          setPicks(cached.picks);
+          return;
+        }
+        const data = await res.json();
+        setPicks(data.picks);
+        const etag = res.headers.get('ETag');
+        if (etag) {
+          localStorage.setItem(
+            'dashboard_cache',
+            JSON.stringify({ bucket: storedBucket, etag, picks: data.picks })
+          );
+        }
+      })
       .catch((err) => console.error('API error', err));
   }, []);
 
@@ -39,10 +39,19 @@ export default function EditFormPage() {
       }
     const username = localStorage.getItem("username");
   try {
+    // profileData 有兩欄用前端名稱，改成 Flask 的欄位名稱（與 create/page.tsx 的 features 相同）
+    const features = {
+      ...formData,
+      "Spending vs Income Past Year": formData.spending_vs_income ?? "",
+      "Difficulty covering expenses": formData.difficulty_covering_expenses ?? "",
+    };
     const predictResponse = await fetch("http://localhost:5050/api/predict", {
       method: "POST",
-      headers: { "Content-Type": "application/x-www-form-urlencoded" },
-      body: new URLSearchParams(formData),
+      headers: {
+        "Content-Type": "application/x-www-form-urlencoded",
+        "X-User-Token": localStorage.getItem("user_token") ?? "",
+      },
+      body: new URLSearchParams({ ...features, username: username ?? "" }),
     });
 
     if (!predictResponse.ok) throw new Error("Prediction failed");
@@ -133,6 +142,7 @@ export default function EditFormPage() {
                 value={formData["Marital Status"]}
                 onChange={handleChange}
                 className="w-full mb-4 p-2 border rounded"
+                required
                 >
                 <option value="">-- Please select an option --</option>
                 <option value="1">Married</option>
@@ -21,6 +21,7 @@ export default function CreateFormPage() {
             const data = await response.json();
             localStorage.setItem("risk_bucket", data.risk_bucket);
             localStorage.setItem("profileData", JSON.stringify(data.profile));
+            if (data.user_token) localStorage.setItem("user_token", data.user_token);
             login(data.username); 
             router.push('/dashboard');
           } catch (error) {